@@ -0,0 +1,198 @@
+"""
+Asyncio-based check engine.
+
+Runs the same staged verification (check_pipeline.py) as the threaded
+workers in main.py, but with non-blocking I/O so that thousands of lookups
+can be in flight at once:
+
+- WHOIS is spoken directly over TCP port 43 (whois_client.py)
+- DNS uses dnspython's dns.asyncresolver behind the shared cache (dns_cache.py)
+- HTTP liveness is a HEAD request (or a plain TCP connect) over asyncio
+  streams, https and http in parallel (http_probe.py)
+
+Every result is handed to a record_result callback as the same tuple
+that domain_checker_worker produces, so the CSV stage does not care which
+engine was used.
+"""
+import asyncio
+
+from dns_cache import resolver as caching_resolver
+from dns_probe import async_probe_dns
+from http_probe import async_probe_http
+from whois_client import async_whois_lookup, interpret_whois_result
+from metrics import metrics, timed
+from singleflight import checks_in_flight, lookup_key
+from check_pipeline import (DEFAULT_PIPELINE, FAILED_CHECK, new_state, stage_applicable, settle, result_tuple,
+                            decision_note)
+
+# Default number of checks kept in flight at the same time
+DEFAULT_CONCURRENCY = 500
+
+
+@timed('whois')
+async def async_whois_check(domain):
+    """
+    Non-blocking equivalent of advanced_whois_check.
+    Returns: (is_available, confidence_level, details)
+    """
+    result = await async_whois_lookup(domain)
+    return interpret_whois_result(result)
+
+
+@timed('dns')
+async def async_dns_check(domain, resolver, mode='full'):
+    """
+    Non-blocking equivalent of check_dns_exists.
+    Returns tuple: (has_dns, dns_details)
+    """
+    return await async_probe_dns(domain, resolver, mode)
+
+
+@timed('http')
+async def async_http_check(domain, mode='full'):
+    """
+    Non-blocking equivalent of check_http_response.
+    Any HTTP status line counts as a response, just like requests.head would.
+    """
+    return await async_probe_http(domain, mode)
+
+
+@timed('api')
+async def async_api_check(domain, api_submit):
+    """Wait for the batched Namecheap check of a domain without blocking the loop."""
+    return await asyncio.wrap_future(api_submit(domain))
+
+
+async def async_availability_check(domain, resolver, api_submit=None, dns_mode='full',
+                                   pipeline=None, min_confidence='HIGH', http_mode='full'):
+    """
+    Non-blocking equivalent of enhanced_availability_check.
+    Returns tuple: (whois_available, confidence, dns_active, dns_details, http_active, registrar_status, decision)
+
+    api_submit queues the domain for a batched Namecheap check and returns a
+    concurrent.futures.Future; it is only passed in when the API is configured.
+    Stages run in pipeline order with the same early-exit policy (check_pipeline.py).
+    """
+    state = new_state()
+
+    for stage in pipeline or DEFAULT_PIPELINE:
+        if not stage_applicable(stage, state, api_submit is not None):
+            continue
+
+        if stage == 'whois':
+            # WHOIS over port 43
+            state['whois_available'], state['confidence'], _ = await async_whois_check(domain)
+
+        elif stage == 'dns':
+            try:
+                state['dns_active'], state['dns_details'] = await async_dns_check(domain, resolver, dns_mode)
+            except Exception:
+                state['dns_active'], state['dns_details'] = False, {}
+
+        elif stage == 'http':
+            state['http_active'] = await async_http_check(domain, http_mode)
+
+        elif stage == 'api':
+            try:
+                state['registrar_status'] = await async_api_check(domain, api_submit)
+            except Exception:
+                state['registrar_status'] = 'API_ERROR'
+
+        if settle(stage, state, min_confidence):
+            break
+
+    return result_tuple(state)
+
+
+async def _run(tasks, record_result, determine_final_status, api_submit, concurrency, check_options, retry_policy,
+               skip):
+    """Feed tasks to a fixed pool of worker coroutines."""
+    pending = asyncio.Queue(maxsize=concurrency * 2)
+    resolver = caching_resolver
+    retries = set()   # checks waiting for their retry (see retry.py)
+    metrics.gauge('task_queue_depth', pending.qsize)
+    metrics.gauge('retries_pending', lambda: len(retries))
+
+    async def requeue(task, delay):
+        await asyncio.sleep(delay)
+        await pending.put(task)
+
+    async def worker():
+        while True:
+            task = await pending.get()
+            if task is None:
+                pending.task_done()
+                return
+            name, tld = task[0], task[1]
+            attempt = task[2] if len(task) > 2 else 1
+            full_domain = name.lower() + tld
+            metrics.check_started()
+            try:
+                skipped = skip(name, tld) if skip is not None and attempt == 1 else None
+                if skipped is not None:
+                    print(f"Skipping: {full_domain} ({skipped[11]})")
+                    record_result(skipped)
+                    continue
+                if attempt > 1:
+                    print(f"Retrying: {full_domain} (attempt {attempt}/{retry_policy.max_attempts})...")
+                else:
+                    print(f"Checking: {full_domain}...")
+                try:
+                    checked = await checks_in_flight.async_do(lookup_key(full_domain), async_availability_check,
+                                                              full_domain, resolver, api_submit, **check_options)
+                except Exception as e:
+                    print(f"  -> {full_domain} check failed: {type(e).__name__}")
+                    checked = FAILED_CHECK
+                whois_available, confidence, dns_active, dns_details, http_active, registrar_status, decision = checked
+                retry = None
+                if retry_policy is not None:
+                    retry = retry_policy.retry_delay(tld, confidence, registrar_status, attempt)
+                if retry is not None:
+                    reason, delay = retry
+                    print(f"  -> {full_domain} {reason.upper()} lookup failed - retrying in {delay:.0f}s")
+                    metrics.task_queued()
+                    retrying = asyncio.create_task(requeue((name, tld, attempt + 1), delay))
+                    retries.add(retrying)
+                    retrying.add_done_callback(retries.discard)
+                else:
+                    status, final_confidence = determine_final_status(
+                        full_domain, whois_available, confidence, dns_active, dns_details, http_active, registrar_status,
+                        decision
+                    )
+                    record_result((name, tld, whois_available, confidence, dns_active, dns_details, http_active, status, final_confidence, registrar_status, attempt,
+                                   decision_note(decision)))
+            except Exception as e:
+                print(f"  -> {full_domain} result could not be recorded: {type(e).__name__}")
+            finally:
+                metrics.check_finished()
+                pending.task_done()
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    for task in tasks:
+        await pending.put(task)
+    # Retries are created before task_done, so an empty queue with no
+    # outstanding retries means everything is checked
+    await pending.join()
+    while retries:
+        await asyncio.gather(*retries)
+        await pending.join()
+    for _ in workers:
+        await pending.put(None)
+    await asyncio.gather(*workers)
+
+
+def run_async_checks(tasks, record_result, determine_final_status, api_submit=None, concurrency=DEFAULT_CONCURRENCY,
+                     dns_mode='full', pipeline=None, min_confidence='HIGH', http_mode='full', retry_policy=None,
+                     skip=None):
+    """
+    Check every (name, tld) pair in tasks using the asyncio engine.
+    Blocks until all checks are done; each result tuple is passed to record_result.
+    With a retry_policy (retry.py), checks that failed for transient reasons
+    are re-queued after a backoff delay instead of being recorded.
+    skip(name, tld) may return a result tuple to record instead of checking
+    (see priority.StopTracker).
+    """
+    check_options = {'dns_mode': dns_mode, 'pipeline': pipeline, 'min_confidence': min_confidence,
+                     'http_mode': http_mode}
+    asyncio.run(_run(tasks, record_result, determine_final_status, api_submit, max(1, concurrency), check_options,
+                     retry_policy, skip))
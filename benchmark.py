@@ -0,0 +1,467 @@
+"""
+Offline benchmark of the domain checker.
+
+Runs main() against local stand-in servers on 127.0.0.1, so results do
+not depend on the network or on real registries:
+
+- a WHOIS server (port-43 protocol) with configurable latency and
+  "not found" ratio
+- a DNS server answering NS/SOA/A for registered names, NXDOMAIN otherwise
+- an HTTP target that answers every request
+- a Namecheap xml.response endpoint (domains.check)
+
+Every scenario runs in a fresh process (so peak memory is per scenario)
+with its own input/ and output/ folders in a temporary directory, and
+reports throughput, p50/p99 latency per check and per stage, and peak
+memory. Results are compared with the baselines in
+benchmark_baselines.json to make regressions visible:
+
+    python benchmark.py                       # run every scenario, compare with the baselines
+    python benchmark.py --scenario async      # just one scenario
+    python benchmark.py --repeat 3            # median of 3 runs per scenario
+    python benchmark.py --save-baseline       # store the results as the new baselines
+    python benchmark.py --fail-on-regression  # exit 1 if a scenario regressed
+
+Only throughput and peak memory count as regressions; the latency
+percentiles of the stand-in servers move by 20-50% between identical
+runs, so they are reported but not judged. Baselines are machine-specific:
+the committed file is a reference run, record your own on the main branch
+(with --repeat) before comparing changes.
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import resource
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baselines.json')
+
+# Allowed change of throughput / peak memory before it counts as a regression
+DEFAULT_TOLERANCE = 0.15
+
+BENCH_TLDS = ['.test', '.example', '.invalid']
+WHOIS_HOST = 'whois.bench.invalid'
+
+DEFAULT_OPTIONS = {
+    'mode': 'threaded',       # DOMAIN_CHECKER_MODE
+    'concurrency': 200,       # DOMAIN_CHECKER_CONCURRENCY (async mode)
+    'names': 200,
+    'tlds': 3,
+    'taken_ratio': 0.5,       # share of names that are registered
+    'whois_latency': 0.05,    # seconds (mean; actual is 0.5x-1.5x)
+    'dns_latency': 0.005,
+    'http_latency': 0.02,
+    'api_latency': 0.1,
+    'api': False,             # enable the Namecheap stage
+    'pipeline': '',           # DOMAIN_CHECKER_PIPELINE ('' = default)
+}
+
+SCENARIOS = {
+    'threaded': {},
+    'threaded-legacy-order': {'pipeline': 'legacy'},
+    'threaded-api': {'api': True},
+    'async': {'mode': 'async', 'names': 1000},
+    'async-api': {'mode': 'async', 'names': 1000, 'api': True},
+}
+
+
+def is_taken(domain, ratio):
+    """Stable per-domain choice shared by all stand-in servers."""
+    digest = hashlib.blake2b(domain.lower().rstrip('.').encode('utf-8'), digest_size=4).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 32 < ratio
+
+
+def jitter(seconds):
+    if seconds > 0:
+        time.sleep(seconds * random.uniform(0.5, 1.5))
+
+
+# --- stand-in servers ---
+
+# Large listen backlog: the default of 5 drops connections (1s SYN retries) at high concurrency
+class TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 4096
+
+
+class UDPServer(socketserver.ThreadingUDPServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        super().server_bind()
+
+
+class HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 4096
+
+
+def start_whois_server(options):
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            domain = self.rfile.readline().decode('utf-8', errors='replace').strip().lower()
+            jitter(options['whois_latency'])
+            if is_taken(domain, options['taken_ratio']):
+                response = (f"Domain Name: {domain.upper()}\r\nRegistrar: Bench Registrar\r\n"
+                            f"Creation Date: 2001-01-01T00:00:00Z\r\nRegistry Expiry Date: 2030-01-01T00:00:00Z\r\n"
+                            f"Name Server: NS1.{domain.upper()}\r\n")
+            else:
+                response = f'No match for "{domain.upper()}".\r\n'
+            self.wfile.write(response.encode('utf-8'))
+
+    server = TCPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_dns_server(options):
+    import dns.message
+    import dns.rcode
+    import dns.rdatatype
+    import dns.rrset
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            data, sock = self.request
+            query = dns.message.from_wire(data)
+            response = dns.message.make_response(query)
+            question = query.question[0]
+            name = question.name.to_text()
+            zone = name.split('.', 1)[1] if '.' in name.rstrip('.') else name
+            soa = dns.rrset.from_text(zone, 900, 'IN', 'SOA', f"ns.{zone} hostmaster.{zone} 1 7200 900 1209600 300")
+            jitter(options['dns_latency'])
+            if not is_taken(name, options['taken_ratio']):
+                response.set_rcode(dns.rcode.NXDOMAIN)
+                response.authority.append(soa)
+            elif question.rdtype == dns.rdatatype.NS:
+                response.answer.append(dns.rrset.from_text(name, 3600, 'IN', 'NS', f"ns1.{name}"))
+            elif question.rdtype == dns.rdatatype.A:
+                response.answer.append(dns.rrset.from_text(name, 3600, 'IN', 'A', '127.0.0.1'))
+            else:
+                response.authority.append(soa)  # NOERROR, no records of this type
+            sock.sendto(response.to_wire(), self.client_address)
+
+    server = UDPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_http_server(options):
+    class Handler(BaseHTTPRequestHandler):
+        def do_HEAD(self):
+            jitter(options['http_latency'])
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        do_GET = do_HEAD
+
+        def log_message(self, format, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_namecheap_server(options):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            params = parse_qs(urlparse(self.path).query)
+            domains = params.get('DomainList', [''])[0].split(',')
+            jitter(options['api_latency'])
+            results = ''.join(
+                f'<DomainCheckResult Domain="{d}" Available="{"false" if is_taken(d, options["taken_ratio"]) else "true"}" '
+                f'ErrorNo="0" IsPremiumName="false" />'
+                for d in domains if d
+            )
+            body = ('<?xml version="1.0" encoding="utf-8"?>'
+                    '<ApiResponse Status="OK" xmlns="http://api.namecheap.com/xml.response">'
+                    f'<CommandResponse Type="namecheap.domains.check">{results}</CommandResponse></ApiResponse>').encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/xml')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve_standins(options, conn):
+    """Run every stand-in server (in its own process) and send their ports back."""
+    servers = {
+        'whois': start_whois_server(options),
+        'dns': start_dns_server(options),
+        'http': start_http_server(options),
+    }
+    if options['api']:
+        servers['api'] = start_namecheap_server(options)
+    conn.send({name: server.server_address[1] for name, server in servers.items()})
+    conn.recv()  # block until the scenario is done
+
+
+def start_standins(options):
+    """
+    Start the stand-in servers in a separate process, so they don't compete
+    with the checker for the GIL or count towards its memory.
+    Returns (process, connection, ports).
+    """
+    parent_conn, child_conn = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=serve_standins, args=(options, child_conn), daemon=True)
+    process.start()
+    return process, parent_conn, parent_conn.recv()
+
+
+# --- one scenario (runs in a child process) ---
+
+def prepare_workdir(workdir, options):
+    """Write the input files of a scenario; the stand-in hosts get generous rate limits."""
+    tlds = BENCH_TLDS[:max(1, min(options['tlds'], len(BENCH_TLDS)))]
+    for folder in ('domain_name', 'top_level_domain'):
+        os.makedirs(os.path.join(workdir, 'input', folder), exist_ok=True)
+    with open(os.path.join(workdir, 'input', 'domain_name', 'names.txt'), 'w', encoding='utf-8') as f:
+        f.writelines(f"benchname{i}\n" for i in range(options['names']))
+    with open(os.path.join(workdir, 'input', 'top_level_domain', 'tlds.txt'), 'w', encoding='utf-8') as f:
+        f.writelines(f"{tld}\n" for tld in tlds)
+    with open(os.path.join(workdir, 'input', 'whois_servers.txt'), 'w', encoding='utf-8') as f:
+        f.writelines(f"{tld.lstrip('.')} {WHOIS_HOST}\n" for tld in tlds)
+    with open(os.path.join(workdir, 'input', 'rate_limits.txt'), 'w', encoding='utf-8') as f:
+        f.write(f"{WHOIS_HOST} 100000 1000\napi.namecheap.com 100000 1000\n")
+
+
+def route_bench_names():
+    """Resolve every name under the benchmark TLDs to 127.0.0.1 (the HTTP target)."""
+    real_getaddrinfo = socket.getaddrinfo
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        if isinstance(host, str) and host.rstrip('.').endswith(tuple(BENCH_TLDS)):
+            return real_getaddrinfo('127.0.0.1', port, *args, **kwargs)
+        return real_getaddrinfo(host, port, *args, **kwargs)
+
+    socket.getaddrinfo = getaddrinfo
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_scenario(options):
+    """Run main() once against the stand-in servers. Returns the result dict."""
+    standins, standins_conn, ports = start_standins(options)
+
+    workdir = tempfile.mkdtemp(prefix='domain-checker-bench-')
+    prepare_workdir(workdir, options)
+    os.chdir(workdir)
+
+    os.environ.update({
+        'DOMAIN_CHECKER_MODE': options['mode'],
+        'DOMAIN_CHECKER_CONCURRENCY': str(options['concurrency']),
+        'DOMAIN_CHECKER_DNS_SERVERS': f"127.0.0.1:{ports['dns']}",
+        'DOMAIN_CHECKER_PIPELINE': options['pipeline'],
+        'DOMAIN_CHECKER_PROGRESS_INTERVAL': '0',
+        'DOMAIN_CHECKER_METRICS_PORT': '0',
+    })
+    for key in ('NAMECHEAP_API_KEY', 'NAMECHEAP_API_USER', 'NAMECHEAP_USERNAME', 'NAMECHEAP_CLIENT_IP'):
+        os.environ[key] = 'bench' if options['api'] else ''  # '' keeps a local .env from enabling the API
+    if options['api']:
+        os.environ['NAMECHEAP_CLIENT_IP'] = '127.0.0.1'
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        import async_engine
+        import http_probe
+        import main
+        import namecheap_api
+        import whois_client
+        from metrics import metrics
+        from concurrency import concurrency
+
+    http_probe.PROBES = [('http', ports['http'])]
+    route_bench_names()
+    whois_client._addresses[WHOIS_HOST] = ('127.0.0.1', ports['whois'])
+    if 'api' in ports:
+        namecheap_api.NAMECHEAP_API_URL = f"http://127.0.0.1:{ports['api']}/xml.response"
+
+    # End-to-end latency of every check, from both engines
+    latencies = []
+    check = main.enhanced_availability_check
+    async_check = async_engine.async_availability_check
+
+    def timed_check(domain):
+        start = time.perf_counter()
+        try:
+            return check(domain)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    async def async_timed_check(domain, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await async_check(domain, *args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    main.enhanced_availability_check = timed_check
+    async_engine.async_availability_check = async_timed_check
+
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        main.main(use_cache=False, use_zone_index=False)
+    elapsed = time.perf_counter() - start
+    standins_conn.send('done')
+    standins.join(5)
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    checks = len(latencies)
+    stages = {stage: {'p50': round(h.percentile(0.5), 4), 'p99': round(h.percentile(0.99), 4), 'calls': h.count}
+              for stage, h in metrics.stage_totals().items()}
+    return {
+        'checks': checks,
+        'seconds': round(elapsed, 3),
+        'checks_per_second': round(checks / elapsed, 2) if elapsed else 0.0,
+        'p50': round(percentile(latencies, 0.5), 4),
+        'p99': round(percentile(latencies, 0.99), 4),
+        'cpu_seconds': round(usage.ru_utime + usage.ru_stime, 2),
+        'peak_rss_mb': round(usage.ru_maxrss / 1024, 1),
+        'stages': stages,
+        'concurrency_limits': concurrency.limits(),
+    }
+
+
+# --- driver ---
+
+def run_in_child(name, options):
+    with tempfile.NamedTemporaryFile('r', suffix='.json', delete=False) as f:
+        result_path = f.name
+    try:
+        command = [sys.executable, os.path.abspath(__file__), '--child', json.dumps(options), result_path]
+        completed = subprocess.run(command)
+        if completed.returncode != 0:
+            raise RuntimeError(f"scenario '{name}' failed (exit code {completed.returncode})")
+        with open(result_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
+
+
+def run_repeated(name, options, repeat):
+    """Run a scenario repeat times; returns the run with the median throughput."""
+    runs = sorted((run_in_child(name, options) for _ in range(max(1, repeat))),
+                  key=lambda result: result['checks_per_second'])
+    return runs[len(runs) // 2]
+
+
+def load_baselines():
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(result, baseline, tolerance):
+    """Returns list of regression messages (empty if none); latency is not judged."""
+    regressions = []
+    if result['checks_per_second'] < baseline['checks_per_second'] * (1 - tolerance):
+        regressions.append(f"throughput {baseline['checks_per_second']} -> {result['checks_per_second']} checks/s")
+    if result['peak_rss_mb'] > baseline['peak_rss_mb'] * (1 + tolerance):
+        regressions.append(f"peak memory {baseline['peak_rss_mb']} -> {result['peak_rss_mb']} MB")
+    return regressions
+
+
+def change(result, baseline, key):
+    if not baseline or not baseline.get(key):
+        return ''
+    return f" ({(result[key] - baseline[key]) / baseline[key]:+.0%})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark with local stand-in servers.")
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="scenario to run (repeatable; default: all)")
+    parser.add_argument('--names', type=int, help="override the number of names of every scenario")
+    parser.add_argument('--save-baseline', action='store_true', help=f"store the results in {os.path.basename(BASELINE_FILE)}")
+    parser.add_argument('--repeat', type=int, default=1, metavar='N',
+                        help="run every scenario N times and use the median run (default 1)")
+    parser.add_argument('--fail-on-regression', action='store_true', help="exit with status 1 if any scenario regressed")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative change of throughput and peak memory (default 0.15)")
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        options, result_path = json.loads(args.child[0]), args.child[1]
+        result = run_scenario(options)
+        with open(result_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        return 0
+
+    baselines = load_baselines()
+    results = {}
+    regressed = False
+    print("=== DOMAIN CHECKER BENCHMARK (offline) ===")
+    for name in args.scenario or list(SCENARIOS):
+        options = dict(DEFAULT_OPTIONS, **SCENARIOS[name])
+        if args.names:
+            options['names'] = args.names
+        print(f"\n▶ {name}: {options['names']} names x {options['tlds']} TLDs, {options['mode']}"
+              f"{', API' if options['api'] else ''}{', pipeline ' + options['pipeline'] if options['pipeline'] else ''}")
+        result = run_repeated(name, options, args.repeat)
+        results[name] = result
+        baseline = baselines.get(name)
+
+        print(f"   {result['checks']} checks in {result['seconds']}s: "
+              f"{result['checks_per_second']} checks/s{change(result, baseline, 'checks_per_second')}")
+        print(f"   latency p50 {result['p50']}s{change(result, baseline, 'p50')}, "
+              f"p99 {result['p99']}s{change(result, baseline, 'p99')}")
+        print(f"   peak memory {result['peak_rss_mb']} MB{change(result, baseline, 'peak_rss_mb')}, "
+              f"CPU {result['cpu_seconds']}s")
+        for stage, timing in sorted(result['stages'].items()):
+            print(f"   {stage:<6} {timing['calls']} calls, p50 {timing['p50']}s, p99 {timing['p99']}s")
+        limits = result.get('concurrency_limits') or {}
+        if limits:
+            print(f"   final per-server concurrency: {', '.join(f'{k} {v}' for k, v in sorted(limits.items()))}")
+
+        if baseline:
+            regressions = compare(result, baseline, args.tolerance)
+            if regressions:
+                regressed = True
+                print(f"   ⚠️  REGRESSION vs baseline: {'; '.join(regressions)}")
+            else:
+                print(f"   ✓ within {args.tolerance:.0%} of the baseline")
+        else:
+            print("   (no baseline yet - run with --save-baseline)")
+
+    if args.save_baseline:
+        baselines.update(results)
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\n✓ Baselines saved to {BASELINE_FILE}")
+
+    return 1 if regressed and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
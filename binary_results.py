@@ -0,0 +1,465 @@
+"""
+Compact columnar binary copy of the results (output/domain_results.dcr).
+
+The CSV files repeat the name, TLD, full domain and long status strings
+for every row, which adds up to gigabytes on multi-million-row runs and
+makes them slow to load again. With `python main.py --binary` the same
+results are also written to a binary file that is a fraction of the size:
+
+- the file is a sequence of self-contained chunks of up to CHUNK_ROWS
+  rows, so it can be written while the run goes on, memory-mapped and
+  read chunk by chunk
+- inside a chunk every column is one contiguous array; names, TLDs and
+  the status / confidence / API status / note strings are dictionary-encoded
+  (the dictionaries are stored per chunk), the Yes/No columns and the
+  DNS record types are packed into one 16-bit flag word
+- the summary table (one row per name, one status per TLD) is stored as
+  well, so all three CSV files can be regenerated exactly
+
+BinaryResultsReader filters rows on status / confidence / TLD by
+scanning the one-byte code columns, skipping whole chunks whose
+dictionaries do not contain a wanted value, and only decodes the rows
+that match:
+
+    with BinaryResultsReader('output/domain_results.dcr') as results:
+        for result in results.results(status='AVAILABLE', confidence=('HIGH', 'VERY HIGH')):
+            ...
+        results.to_csv('output/regenerated')
+
+The same from the command line:
+
+    python binary_results.py output/domain_results.dcr --status AVAILABLE --confidence HIGH
+    python binary_results.py output/domain_results.dcr --csv output/regenerated
+"""
+import argparse
+import csv
+import mmap
+import os
+import struct
+import sys
+from array import array
+from itertools import zip_longest
+
+from csv_output import (SUMMARY_FILE, DETAILED_FILE, AVAILABLE_FILE, DETAILED_HEADER, AVAILABLE_HEADER,
+                        detailed_row, available_row)
+
+BINARY_FILE = "domain_results.dcr"
+CHUNK_ROWS = 65536
+
+MAGIC = b'DCRES2\0' + (b'L' if sys.byteorder == 'little' else b'B')
+FILE_HEADER = struct.Struct('=8sH')     # magic, TLD count (TLD strings follow)
+CHUNK_HEADER = struct.Struct('=4sIII')  # marker, payload size, result rows, summary rows
+CHUNK_MARKER = b'CHNK'
+
+# Flag word bits
+WHOIS_AVAILABLE = 1 << 0
+DNS_ACTIVE = 1 << 1
+HTTP_ACTIVE = 1 << 2
+DNS_RECORDS = ('A', 'AAAA', 'MX', 'NS', 'CNAME', 'SOA')   # bits 3..8
+
+# Dictionary-encoded string columns, in file order
+ENUM_COLUMNS = ('status', 'confidence', 'whois_confidence', 'registrar_status', 'note')
+EMPTY_CELL = 255   # summary cell of a TLD not checked in this run (shards)
+
+
+def _pad(data):
+    data.extend(bytes(-len(data) % 4))
+
+
+def _pack_strings(strings, data):
+    data.extend(struct.pack('=I', len(strings)))
+    offsets = array('I', [0])
+    blob = bytearray()
+    for string in strings:
+        blob.extend(string.encode('utf-8'))
+        offsets.append(len(blob))
+    data.extend(offsets.tobytes())
+    data.extend(blob)
+    _pad(data)
+
+
+def _pack_flags(result):
+    whois_available, dns_active, dns_details, http_active = result[2], result[4], result[5], result[6]
+    flags = (WHOIS_AVAILABLE if whois_available else 0) | (DNS_ACTIVE if dns_active else 0) \
+        | (HTTP_ACTIVE if http_active else 0)
+    if dns_details:
+        for bit, record in enumerate(DNS_RECORDS, 3):
+            if dns_details.get(record):
+                flags |= 1 << bit
+    return flags
+
+
+class _Dictionary:
+    """String -> code table of one chunk column."""
+
+    def __init__(self, limit):
+        self.codes = {}
+        self.values = []
+        self.limit = limit
+
+    def code(self, value):
+        value = '' if value is None else str(value)
+        code = self.codes.get(value)
+        if code is None:
+            if len(self.values) >= self.limit:
+                raise OverflowError("too many distinct values in one chunk")
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class BinaryResultsWriter:
+    """Appends result tuples and summary rows; a chunk is written every chunk_rows rows."""
+
+    def __init__(self, path, tlds, chunk_rows=CHUNK_ROWS):
+        self.path = path
+        self.tlds = list(tlds)
+        self.tld_codes = {tld: i for i, tld in enumerate(self.tlds)}
+        self.chunk_rows = chunk_rows
+        self.file = open(path, 'wb')
+        header = bytearray(FILE_HEADER.pack(MAGIC, len(self.tlds)))
+        for tld in self.tlds:
+            encoded = tld.encode('utf-8')
+            header.extend(struct.pack('=B', len(encoded)) + encoded)
+        self.file.write(header)
+        self._new_chunk()
+
+    def _new_chunk(self):
+        self.names = {}
+        self.dictionaries = {column: _Dictionary(EMPTY_CELL) for column in ENUM_COLUMNS}
+        self.columns = {
+            'name': array('I'), 'tld': array('H'), 'flags': array('H'),
+            'status': array('B'), 'confidence': array('B'), 'whois_confidence': array('B'),
+            'registrar_status': array('B'), 'note': array('B'), 'attempts': array('B'),
+        }
+        self.summary_names = array('I')
+        self.summary_cells = array('B')
+
+    def _name_code(self, name):
+        code = self.names.get(name)
+        if code is None:
+            code = self.names[name] = len(self.names)
+        return code
+
+    def _rows(self):
+        return len(self.columns['name']) + len(self.summary_names)
+
+    def append(self, result):
+        """Add one result tuple (as produced by the check workers)."""
+        if self._rows() >= self.chunk_rows:
+            self._write_chunk()
+        try:
+            codes = [self.dictionaries[column].code(value)
+                     for column, value in zip(ENUM_COLUMNS, (result[7], result[8], result[3], result[9],
+                                                             result[11] if len(result) > 11 else None))]
+        except OverflowError:
+            self._write_chunk()
+            return self.append(result)
+        columns = self.columns
+        columns['name'].append(self._name_code(result[0]))
+        columns['tld'].append(self.tld_codes[result[1]])
+        columns['flags'].append(_pack_flags(result))
+        for column, code in zip(ENUM_COLUMNS, codes):
+            columns[column].append(code)
+        columns['attempts'].append(min(result[10] if len(result) > 10 else 1, 255))
+
+    def add_summary_row(self, name, statuses):
+        """Add one domain_results.csv row: a status per TLD ('' = not checked in this run)."""
+        if self._rows() >= self.chunk_rows:
+            self._write_chunk()
+        try:
+            cells = [EMPTY_CELL if status == '' else self.dictionaries['status'].code(status) for status in statuses]
+        except OverflowError:
+            self._write_chunk()
+            return self.add_summary_row(name, statuses)
+        self.summary_names.append(self._name_code(name))
+        self.summary_cells.extend(cells)
+
+    def _write_chunk(self):
+        if not self._rows():
+            return
+        data = bytearray()
+        _pack_strings(list(self.names), data)
+        for column in ENUM_COLUMNS:
+            _pack_strings(self.dictionaries[column].values, data)
+        for column in ('name', 'tld', 'flags', 'status', 'confidence', 'whois_confidence',
+                       'registrar_status', 'note', 'attempts'):
+            data.extend(self.columns[column].tobytes())
+            _pad(data)
+        data.extend(self.summary_names.tobytes())
+        _pad(data)
+        data.extend(self.summary_cells.tobytes())
+        _pad(data)
+
+        self.file.write(CHUNK_HEADER.pack(CHUNK_MARKER, len(data), len(self.columns['name']), len(self.summary_names)))
+        self.file.write(data)
+        self.file.flush()
+        self._new_chunk()
+
+    def close(self):
+        if not self.file.closed:
+            self._write_chunk()
+            self.file.close()
+
+
+def _as_set(value):
+    if value is None:
+        return None
+    return {value} if isinstance(value, str) else set(value)
+
+
+def _matching_rows(column, codes):
+    """Sorted indexes of the rows whose one-byte code is in codes."""
+    data = column.tobytes()
+    rows = []
+    for code in codes:
+        needle = bytes([code])
+        i = data.find(needle)
+        while i != -1:
+            rows.append(i)
+            i = data.find(needle, i + 1)
+    rows.sort()
+    return rows
+
+
+class _Chunk:
+    """Decoded view of one chunk (columns are memoryviews into the map)."""
+
+    def __init__(self, view, tld_count, result_rows, summary_rows):
+        self.offset = 0
+        self.view = view
+        self.names = self._strings()
+        self.dictionaries = {column: self._strings() for column in ENUM_COLUMNS}
+        n = result_rows
+        self.name = self._column('I', n)
+        self.tld = self._column('H', n)
+        self.flags = self._column('H', n)
+        self.enums = {column: self._column('B', n) for column in ENUM_COLUMNS}
+        self.attempts = self._column('B', n)
+        self.summary_names = self._column('I', summary_rows)
+        self.summary_cells = self._column('B', summary_rows * tld_count)
+        self.result_rows = result_rows
+        self.summary_rows = summary_rows
+
+    def _align(self):
+        self.offset += -self.offset % 4
+
+    def _column(self, typecode, count):
+        size = array(typecode).itemsize * count
+        column = self.view[self.offset:self.offset + size].cast(typecode)
+        self.offset += size
+        self._align()
+        return column
+
+    def _strings(self):
+        count = struct.unpack_from('=I', self.view, self.offset)[0]
+        self.offset += 4
+        offsets = self.view[self.offset:self.offset + 4 * (count + 1)].cast('I')
+        self.offset += 4 * (count + 1)
+        blob = self.view[self.offset:self.offset + offsets[count]].tobytes()
+        self.offset += offsets[count]
+        self._align()
+        return [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(count)]
+
+    def codes(self, column, wanted):
+        """Codes of the wanted values in this chunk's dictionary of a column."""
+        return {code for code, value in enumerate(self.dictionaries[column]) if value in wanted}
+
+
+class BinaryResultsReader:
+    """Memory-mapped reader for files written by BinaryResultsWriter."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = None
+        try:
+            header = self.file.read(FILE_HEADER.size)
+            if len(header) < FILE_HEADER.size:
+                raise ValueError(f"{path} is not a results file")
+            magic, tld_count = FILE_HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a results file (or was written on a machine with another byte order)")
+            self.tlds = []
+            for _ in range(tld_count):
+                length = self.file.read(1)[0]
+                self.tlds.append(self.file.read(length).decode('utf-8'))
+            self.size = os.fstat(self.file.fileno()).st_size
+            if self.size > self.file.tell():
+                self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.chunk_offsets = self._find_chunks(self.file.tell())
+        except Exception:
+            self.close()
+            raise
+
+    def _find_chunks(self, offset):
+        """Offsets of all complete chunks (a torn last chunk from a crash is ignored)."""
+        offsets = []
+        while self.map is not None and offset + CHUNK_HEADER.size <= self.size:
+            marker, payload, _, _ = CHUNK_HEADER.unpack_from(self.map, offset)
+            if marker != CHUNK_MARKER or offset + CHUNK_HEADER.size + payload > self.size:
+                break
+            offsets.append(offset)
+            offset += CHUNK_HEADER.size + payload
+        return offsets
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __len__(self):
+        """Number of result rows."""
+        return sum(CHUNK_HEADER.unpack_from(self.map, offset)[2] for offset in self.chunk_offsets)
+
+    def chunks(self):
+        for offset in self.chunk_offsets:
+            _, payload, result_rows, summary_rows = CHUNK_HEADER.unpack_from(self.map, offset)
+            start = offset + CHUNK_HEADER.size
+            view = memoryview(self.map)[start:start + payload]
+            yield _Chunk(view, len(self.tlds), result_rows, summary_rows)
+
+    def results(self, status=None, confidence=None, tld=None):
+        """
+        Yield the result tuples in file order, optionally only those with the
+        given status / final confidence / TLD (each a value or a collection).
+        """
+        wanted = {'status': _as_set(status), 'confidence': _as_set(confidence)}
+        tld_codes = None
+        if tld is not None:
+            tld_codes = {i for i, value in enumerate(self.tlds) if value in _as_set(tld)}
+
+        for chunk in self.chunks():
+            rows = None
+            for column, values in wanted.items():
+                if values is None:
+                    continue
+                codes = chunk.codes(column, values)
+                matched = _matching_rows(chunk.enums[column], codes) if codes else []
+                rows = matched if rows is None else sorted(set(rows).intersection(matched))
+                if not rows:
+                    break
+            if rows is None:
+                rows = range(chunk.result_rows)
+            for row in rows:
+                if tld_codes is None or chunk.tld[row] in tld_codes:
+                    yield self._decode(chunk, row)
+
+    def _decode(self, chunk, row):
+        flags = chunk.flags[row]
+        dns_details = {record: True for bit, record in enumerate(DNS_RECORDS, 3) if flags & (1 << bit)}
+        enums = {column: chunk.dictionaries[column][chunk.enums[column][row]] or None for column in ENUM_COLUMNS}
+        return (
+            chunk.names[chunk.name[row]], self.tlds[chunk.tld[row]],
+            bool(flags & WHOIS_AVAILABLE), enums['whois_confidence'],
+            bool(flags & DNS_ACTIVE), dns_details, bool(flags & HTTP_ACTIVE),
+            enums['status'], enums['confidence'], enums['registrar_status'],
+            chunk.attempts[row], enums['note'],
+        )
+
+    def summary_rows(self):
+        """Yield the domain_results.csv rows: (name, [status per TLD, '' = not checked])."""
+        tld_count = len(self.tlds)
+        for chunk in self.chunks():
+            statuses = chunk.dictionaries['status']
+            for row in range(chunk.summary_rows):
+                cells = chunk.summary_cells[row * tld_count:(row + 1) * tld_count]
+                yield chunk.names[chunk.summary_names[row]], [
+                    '' if cell == EMPTY_CELL else statuses[cell] for cell in cells
+                ]
+
+    def to_csv(self, output_dir):
+        """
+        Regenerate the three standard CSV files in output_dir.
+        Returns dict with 'total', 'available' and 'possibly_available' counts.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        counts = {'total': 0, 'available': 0, 'possibly_available': 0}
+        with open(os.path.join(output_dir, SUMMARY_FILE), 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Domain Name"] + self.tlds)
+            for name, statuses in self.summary_rows():
+                writer.writerow([name] + statuses)
+
+        with open(os.path.join(output_dir, DETAILED_FILE), 'w', newline='', encoding='utf-8') as detailed_file, \
+                open(os.path.join(output_dir, AVAILABLE_FILE), 'w', newline='', encoding='utf-8') as available_file:
+            detailed = csv.writer(detailed_file)
+            available = csv.writer(available_file)
+            detailed.writerow(DETAILED_HEADER)
+            available.writerow(AVAILABLE_HEADER)
+            for result in self.results():
+                counts['total'] += 1
+                detailed.writerow(detailed_row(result))
+                row = available_row(result)
+                if row is not None:
+                    available.writerow(row)
+                    counts['available' if result[7] == 'AVAILABLE' else 'possibly_available'] += 1
+        return counts
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+
+def merge_binary(paths, output_path):
+    """
+    Combine the binary files of several shards (see sharding.py): result
+    rows are concatenated, summary rows are merged cell by cell.
+    """
+    readers = [BinaryResultsReader(path) for path in paths]
+    try:
+        if any(reader.tlds != readers[0].tlds for reader in readers):
+            raise ValueError("Shard results files have different TLDs - were they run with the same input?")
+        writer = BinaryResultsWriter(output_path, readers[0].tlds)
+        try:
+            for reader in readers:
+                for result in reader.results():
+                    writer.append(result)
+            for rows in zip_longest(*[reader.summary_rows() for reader in readers]):
+                if None in rows:
+                    raise ValueError("Shard results files have different numbers of summary rows - is a shard incomplete?")
+                name = rows[0][0]
+                if any(row[0] != name for row in rows):
+                    raise ValueError(f"Shard summary rows are out of step at '{name}' - were they run with the same input?")
+                writer.add_summary_row(name, [
+                    next((cells[i] for _, cells in rows if cells[i]), 'ERROR') for i in range(len(readers[0].tlds))
+                ])
+        finally:
+            writer.close()
+    finally:
+        for reader in readers:
+            reader.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or convert a binary results file.")
+    parser.add_argument('path', nargs='?', default=os.path.join('output', BINARY_FILE))
+    parser.add_argument('--status', action='append', help="only rows with this status (repeatable)")
+    parser.add_argument('--confidence', action='append', help="only rows with this confidence (repeatable)")
+    parser.add_argument('--tld', action='append', help="only rows for this TLD (repeatable)")
+    parser.add_argument('--csv', metavar='DIR', help="regenerate the three CSV files into DIR")
+    args = parser.parse_args()
+
+    try:
+        reader = BinaryResultsReader(args.path)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not open {args.path}: {e}")
+        return 1
+    with reader:
+        if args.csv:
+            counts = reader.to_csv(args.csv)
+            print(f"✓ {counts['total']} results written to {args.csv}/")
+            return 0
+        writer = csv.writer(sys.stdout)
+        writer.writerow(DETAILED_HEADER)
+        for result in reader.results(args.status, args.confidence, args.tld):
+            writer.writerow(detailed_row(result))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Cost-ordered verification pipeline with early exit.
+
+enhanced_availability_check (and its asyncio twin) run the checks as a
+cascade of stages in a configurable order. The default puts the cheapest
+stage first:
+
+    dns -> whois -> api -> http
+
+After every stage the policy below decides whether the verdict is
+already settled at the confidence we need, so the remaining (more
+expensive) stages can be skipped. For example, a name that is delegated
+in its TLD zone (NS/SOA records exist) is registered, so most taken
+names are settled by a single DNS lookup without touching WHOIS.
+
+The order is set with DOMAIN_CHECKER_PIPELINE, the confidence that is
+good enough to stop early with DOMAIN_CHECKER_MIN_CONFIDENCE.
+
+A verdict settled early is kept apart from the WHOIS fields as the
+check's decision (stage, status, confidence); if WHOIS never ran, its
+confidence is reported as NOT_CHECKED.
+"""
+
+STAGES = ('dns', 'whois', 'api', 'http')
+DEFAULT_PIPELINE = ['dns', 'whois', 'api', 'http']
+
+# Pipeline that reproduces the original check order (WHOIS first)
+LEGACY_PIPELINE = ['whois', 'dns', 'http', 'api']
+
+CONFIDENCE_LEVELS = ['LOW', 'MEDIUM', 'HIGH', 'VERY HIGH']
+
+# Early-exit policy: after a stage, if the condition holds, the verdict is
+# (status, confidence). The pipeline stops there when that confidence is
+# at least the configured minimum; otherwise later stages keep running.
+EARLY_EXIT_RULES = {
+    'dns': [
+        ('delegated', 'TAKEN', 'HIGH'),
+    ],
+    'api': [
+        ('api_taken', 'TAKEN', 'VERY HIGH'),
+        ('api_available', 'AVAILABLE', 'VERY HIGH'),
+        ('api_premium', 'PREMIUM', 'HIGH'),
+    ],
+}
+
+CONDITIONS = {
+    # NS/SOA in the TLD zone means the name is registered - only used
+    # when WHOIS has not given its own answer yet
+    'delegated': lambda state: state['whois_available'] is None and bool(
+        state['dns_details'].get('NS') or state['dns_details'].get('SOA')
+    ),
+    'api_taken': lambda state: state['registrar_status'] == 'TAKEN',
+    'api_available': lambda state: state['registrar_status'] == 'AVAILABLE',
+    'api_premium': lambda state: state['registrar_status'] == 'PREMIUM',
+}
+
+
+def parse_pipeline(spec):
+    """Parse a comma-separated stage list such as 'dns,whois,api,http' (or 'legacy')."""
+    if not spec:
+        return list(DEFAULT_PIPELINE)
+    if spec.strip().lower() == 'legacy':
+        return list(LEGACY_PIPELINE)
+
+    pipeline = []
+    for stage in spec.lower().split(','):
+        stage = stage.strip()
+        if stage not in STAGES:
+            raise ValueError(f"Unknown check stage '{stage}' (expected one of: {', '.join(STAGES)})")
+        if stage not in pipeline:
+            pipeline.append(stage)
+    if 'whois' not in pipeline:
+        raise ValueError("The check pipeline must include the 'whois' stage")
+    return pipeline
+
+
+def parse_min_confidence(value):
+    """Validate a confidence level name such as 'HIGH' or 'very high'."""
+    level = value.strip().upper().replace('_', ' ')
+    if level not in CONFIDENCE_LEVELS:
+        raise ValueError(f"Unknown confidence level '{value}' (expected one of: {', '.join(CONFIDENCE_LEVELS)})")
+    return level
+
+
+def confidence_at_least(confidence, minimum):
+    return CONFIDENCE_LEVELS.index(confidence) >= CONFIDENCE_LEVELS.index(minimum)
+
+
+# Check result standing in for a check that raised: recorded (or retried)
+# like a failed WHOIS lookup instead of being lost
+FAILED_CHECK = (False, 'LOW', False, {}, False, 'NOT_CHECKED', None)
+
+
+def new_state():
+    """Evidence gathered for one domain; None means the stage has not run."""
+    return {
+        'whois_available': None,
+        'confidence': None,
+        'dns_active': False,
+        'dns_details': {},
+        'http_active': False,
+        'registrar_status': 'API_NOT_CONFIGURED',
+        'decision': None,   # (stage, status, confidence) of an early exit
+    }
+
+
+def stage_applicable(stage, state, api_configured):
+    """Whether running this stage can still change the verdict."""
+    if stage == 'http':
+        # Only meaningful for names with DNS that WHOIS did not claim
+        return state['dns_active'] and state['whois_available'] is not False
+    if stage == 'api':
+        # Only if configured, WHOIS didn't already show it taken, and DNS doesn't indicate heavy use
+        return (api_configured and state['whois_available'] is not False
+                and (not state['dns_active'] or state['confidence'] == 'HIGH'))
+    return True
+
+
+def settle(stage, state, min_confidence):
+    """
+    Apply the early-exit policy after a stage.
+    Returns True if the pipeline can stop here.
+    """
+    # WHOIS says it's not available (registered or undeterminable) - nothing
+    # later can make it available, so stop like the original check did
+    if state['whois_available'] is False:
+        return True
+
+    for condition, status, confidence in EARLY_EXIT_RULES.get(stage, []):
+        if CONDITIONS[condition](state) and confidence_at_least(confidence, min_confidence):
+            state['decision'] = (stage, status, confidence)
+            return True
+    return False
+
+
+def result_tuple(state):
+    """Convert the gathered evidence to enhanced_availability_check's 7-tuple."""
+    whois_available = state['whois_available']
+    confidence = state['confidence']
+    if whois_available is None:
+        # Settled before WHOIS ran; without a decision WHOIS should always have run
+        whois_available, confidence = False, 'NOT_CHECKED' if state['decision'] else 'LOW'
+    return (whois_available, confidence, state['dns_active'], state['dns_details'],
+            state['http_active'], state['registrar_status'], state['decision'])
+
+
+def decision_note(decision):
+    """Note column text for a check settled early (None for a full check)."""
+    if decision is None:
+        return None
+    return f"decided by {decision[0].upper()}"
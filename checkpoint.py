@@ -0,0 +1,93 @@
+"""
+Crash-safe checkpoint of finished checks for --resume.
+
+Every finished check is appended as one JSON line to
+output/checkpoint.jsonl and flushed immediately, with an fsync at most
+every FSYNC_INTERVAL seconds. If a run dies (crash, Ctrl-C, rate-limit
+ban), `python main.py --resume` reads the file back, skips every domain
+already in it and only checks what is left. A torn last line from a
+crash is simply ignored.
+
+A normal (non-resume) run starts a fresh checkpoint.
+"""
+import json
+import os
+import threading
+import time
+
+DEFAULT_CHECKPOINT_PATH = os.path.join('output', 'checkpoint.jsonl')
+FSYNC_INTERVAL = 2.0
+
+
+class Checkpoint:
+    """Append-only log of result tuples, safe to write from many threads."""
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH):
+        self.path = path
+        self.file = None
+        self.lock = threading.Lock()
+        self.last_sync = 0.0
+
+    def open(self, resume=False):
+        """
+        Open the checkpoint for writing.
+        With resume=True, returns dict: full_domain -> result tuple of the
+        checks already finished; otherwise starts a new, empty checkpoint.
+        """
+        completed = {}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if resume and os.path.exists(self.path):
+            completed = self.load(self.path)
+            self.file = open(self.path, 'a', encoding='utf-8')
+            if not self._ends_with_newline():
+                self.file.write('\n')  # close off a torn last line
+        else:
+            self.file = open(self.path, 'w', encoding='utf-8')
+        return completed
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return True
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    @staticmethod
+    def load(path):
+        """Read all complete entries from a checkpoint file."""
+        completed = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    result = tuple(json.loads(line))
+                except ValueError:
+                    continue  # torn write from a crash
+                if len(result) < 10:
+                    continue
+                completed[result[0].lower() + result[1]] = result
+        return completed
+
+    def append(self, result):
+        """Persist one result tuple."""
+        line = json.dumps(list(result), ensure_ascii=False) + '\n'
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(line)
+            self.file.flush()
+            now = time.monotonic()
+            if now - self.last_sync >= FSYNC_INTERVAL:
+                os.fsync(self.file.fileno())
+                self.last_sync = now
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                self.file.close()
+                self.file = None
@@ -0,0 +1,209 @@
+"""
+Adaptive per-upstream concurrency (AIMD).
+
+Instead of one global worker count that is too low for fast registries
+and still too high for slow ones, every upstream server (a WHOIS host,
+the Namecheap API endpoint) gets its own limit on the number of requests
+in flight, adjusted like TCP congestion control:
+
+- slow start: until the first sign of congestion every successful
+  response adds 1, so the limit doubles every round trip
+- additive increase: after that every successful response adds 1/limit,
+  so the limit grows by about one per round trip
+- multiplicative decrease: a timeout, connection error or throttle
+  response halves the limit; a response much slower than the server's
+  usual latency (LATENCY_TOLERANCE x its baseline) shrinks it by 10%.
+  After a decrease, further decreases wait for DECREASE_HOLDOFF so one
+  burst of failures counts once
+
+Limits start at INITIAL_LIMIT and never exceed the hard ceiling
+(DOMAIN_CHECKER_MAX_PER_SERVER, default MAX_LIMIT), divided between the
+local shard processes of a `--processes N` run. Every change of a limit
+is logged.
+"""
+import asyncio
+import os
+import threading
+import time
+
+INITIAL_LIMIT = 2.0
+MIN_LIMIT = 1.0
+MAX_LIMIT = 32
+
+LATENCY_TOLERANCE = 2.0    # slower than this x baseline counts as congestion
+BASELINE_DRIFT = 0.01      # how fast the baseline follows slower latencies
+DECREASE_HOLDOFF = 1.0     # seconds between two decreases
+
+
+class AIMDLimiter:
+    """Concurrency limit of one upstream. acquire()/release() are thread-safe."""
+
+    def __init__(self, key, ceiling=MAX_LIMIT, initial=INITIAL_LIMIT):
+        self.key = key
+        self.ceiling = max(MIN_LIMIT, ceiling)
+        self.limit = min(max(MIN_LIMIT, initial), self.ceiling)
+        self.in_flight = 0
+        self.baseline = None
+        self.last_decrease = 0.0
+        self.slow_start = True
+        self.condition = threading.Condition()
+        self.async_waiters = []   # (loop, future) of coroutines waiting for a slot
+
+    @property
+    def allowed(self):
+        return int(self.limit)
+
+    def _try_acquire(self):
+        if self.in_flight < self.allowed:
+            self.in_flight += 1
+            return True
+        return False
+
+    def acquire(self):
+        """Block until a request to this upstream may start."""
+        with self.condition:
+            while not self._try_acquire():
+                self.condition.wait()
+
+    async def async_acquire(self):
+        """Non-blocking equivalent of acquire."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self.condition:
+                if self._try_acquire():
+                    return
+                waiter = (loop, loop.create_future())
+                self.async_waiters.append(waiter)
+            try:
+                await waiter[1]
+            except asyncio.CancelledError:
+                with self.condition:
+                    if waiter in self.async_waiters:
+                        self.async_waiters.remove(waiter)
+                    else:
+                        self._wake()  # pass on the wake-up this waiter got
+                raise
+
+    def _wake(self):
+        """Wake as many waiters as there are free slots (call with the condition held)."""
+        free = self.allowed - self.in_flight
+        if free <= 0:
+            return
+        self.condition.notify(free)
+        for _ in range(min(free, len(self.async_waiters))):
+            loop, future = self.async_waiters.pop(0)
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def release(self, latency, outcome='ok'):
+        """
+        Finish a request and adapt the limit.
+        outcome: 'ok', 'throttled' or 'error' (timeout, connection failure)
+        """
+        with self.condition:
+            self.in_flight -= 1
+            old = self.allowed
+            reason = self._adapt(latency, outcome)
+            if reason and self.allowed != old:
+                print(f"    🎚  {self.key}: concurrency {old} → {self.allowed} ({reason})")
+            self._wake()
+
+    def _adapt(self, latency, outcome):
+        now = time.monotonic()
+        if outcome != 'ok':
+            return self._decrease(now, 0.5, 'throttled' if outcome == 'throttled' else 'errors/timeouts')
+
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        else:
+            self.baseline += (latency - self.baseline) * BASELINE_DRIFT
+
+        if latency > LATENCY_TOLERANCE * self.baseline and latency > 0.05:
+            return self._decrease(now, 0.9, f"latency {latency:.2f}s vs usual {self.baseline:.2f}s")
+
+        if self.limit < self.ceiling:
+            self.limit = min(self.ceiling, self.limit + (1.0 if self.slow_start else 1.0 / self.limit))
+            return 'responding well'
+        return None
+
+    def _decrease(self, now, factor, reason):
+        if now - self.last_decrease < DECREASE_HOLDOFF:
+            return None
+        self.last_decrease = now
+        self.slow_start = False
+        self.limit = max(MIN_LIMIT, self.limit * factor)
+        return reason
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _Slot:
+    """Context manager around one request; set .outcome before leaving."""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.outcome = 'ok'
+        self.started = None
+
+    def start(self):
+        """Restart the latency clock (e.g. after waiting for a rate-limit token)."""
+        self.started = time.monotonic()
+
+    def __enter__(self):
+        self.limiter.acquire()
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        outcome = 'error' if exc_type is not None else self.outcome
+        self.limiter.release(time.monotonic() - self.started, outcome)
+        return False
+
+    async def __aenter__(self):
+        await self.limiter.async_acquire()
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+class ConcurrencyController:
+    """AIMD limiters keyed by upstream server."""
+
+    def __init__(self, ceiling=None):
+        self.ceiling = ceiling
+        self.limiters = {}
+        self.lock = threading.Lock()
+
+    def limiter(self, key):
+        key = key.lower()
+        limiter = self.limiters.get(key)
+        if limiter is None:
+            with self.lock:
+                limiter = self.limiters.get(key)
+                if limiter is None:
+                    if self.ceiling is None:
+                        ceiling = int(os.getenv('DOMAIN_CHECKER_MAX_PER_SERVER', str(MAX_LIMIT)))
+                        processes = max(1, int(os.getenv('DOMAIN_CHECKER_LOCAL_PROCESSES', '1')))
+                        self.ceiling = max(1, ceiling // processes)
+                    limiter = self.limiters[key] = AIMDLimiter(key, self.ceiling)
+        return limiter
+
+    def slot(self, key):
+        """
+        `with controller.slot(host) as slot:` (or `async with`) around a request;
+        set slot.outcome = 'throttled' / 'error' when the response says so.
+        """
+        return _Slot(self.limiter(key))
+
+    def limits(self):
+        """Returns dict: upstream -> current concurrency limit."""
+        with self.lock:
+            return {key: limiter.allowed for key, limiter in self.limiters.items()}
+
+
+# Shared by every check in the process
+concurrency = ConcurrencyController()
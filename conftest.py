@@ -0,0 +1,4 @@
+"""
+pytest configuration: the modules live at the top level of the repository,
+and this file being here puts that directory on sys.path for tests/.
+"""
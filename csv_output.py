@@ -0,0 +1,208 @@
+"""
+Streaming CSV output.
+
+Rows are written while the check is running instead of after it:
+
+- domain_results_detailed.csv and available_domains.csv get one row per
+  result as soon as it arrives
+- domain_results.csv (one row per name, one column per TLD) keeps only
+  the names that are still incomplete in memory and writes each row as
+  soon as the name and every name before it are complete, so the rows
+  stay in input order
+
+Files are flushed at least every FLUSH_INTERVAL seconds so other tools
+can tail them during a run. Names may be registered (add_name) from the
+task producer while another thread writes results. With binary=True the
+same rows also go to the compact binary results file (binary_results.py).
+"""
+import csv
+import os
+import threading
+import time
+from collections import deque
+
+FLUSH_INTERVAL = 1.0
+
+SUMMARY_FILE = "domain_results.csv"
+DETAILED_FILE = "domain_results_detailed.csv"
+AVAILABLE_FILE = "available_domains.csv"
+
+DETAILED_HEADER = [
+    "Domain Name", "TLD", "Full Domain", "Status", "Confidence Level",
+    "WHOIS Available", "DNS Active", "DNS Records", "HTTP Active",
+    "Namecheap API Status", "Recommended Action", "Attempts", "Note"
+]
+AVAILABLE_HEADER = ["Full Domain", "Domain Name", "TLD", "Confidence Level", "Verification Method"]
+
+
+def recommended_action(status, confidence):
+    """Recommended action based on status and confidence."""
+    if status == 'AVAILABLE' and confidence in ['HIGH', 'VERY HIGH']:
+        return '✓ Safe to purchase'
+    elif status == 'AVAILABLE':
+        return '⚠ Check manually before purchase'
+    elif status == 'POSSIBLY AVAILABLE':
+        return '⚠ Verify on registrar website'
+    elif status == 'PREMIUM':
+        return '💎 Premium pricing - check cost'
+    return '✗ Not available'
+
+
+def detailed_row(result):
+    """Format a result tuple as a domain_results_detailed.csv row."""
+    name, tld, whois_available, whois_confidence, dns_active, dns_details, http_active, status, confidence, registrar_status = result[:10]
+    # Number of lookups it took (0 = from the zone index); older results don't have it
+    attempts = result[10] if len(result) > 10 else 1
+    # Why a candidate was rejected without a lookup (see tld_policy.py)
+    note = (result[11] if len(result) > 11 else None) or ''
+    active_dns = [k for k, v in dns_details.items() if v] if dns_details else []
+    return [
+        name, tld, name.lower() + tld, status, confidence,
+        'Not checked' if whois_confidence == 'NOT_CHECKED' else 'Yes' if whois_available else 'No',
+        'Yes' if dns_active else 'No',
+        ', '.join(active_dns) if active_dns else 'None',
+        'Yes' if http_active else 'No',
+        registrar_status,
+        recommended_action(status, confidence),
+        attempts,
+        note
+    ]
+
+
+def available_row(result):
+    """Format a result tuple as an available_domains.csv row (None if not available)."""
+    name, tld = result[0], result[1]
+    status, confidence, registrar_status = result[7], result[8], result[9]
+    if status not in ['AVAILABLE', 'POSSIBLY AVAILABLE']:
+        return None
+
+    # Determine verification method
+    if registrar_status == 'AVAILABLE':
+        verification = 'Namecheap API'
+    else:
+        verification = 'WHOIS + DNS + HTTP'
+    return [name.lower() + tld, name, tld, confidence, verification]
+
+
+class StreamingCSVWriter:
+    """Writes the three standard CSV files incrementally."""
+
+    def __init__(self, output_dir, tlds, flush_interval=FLUSH_INTERVAL, binary=False):
+        os.makedirs(output_dir, exist_ok=True)
+        self.tlds = list(tlds)
+        self.flush_interval = flush_interval
+        self.last_flush = time.monotonic()
+
+        self.summary_path = os.path.join(output_dir, SUMMARY_FILE)
+        self.detailed_path = os.path.join(output_dir, DETAILED_FILE)
+        self.available_path = os.path.join(output_dir, AVAILABLE_FILE)
+
+        self.files = []
+        self.summary = self._open(self.summary_path, ["Domain Name"] + self.tlds)
+        self.detailed = self._open(self.detailed_path, DETAILED_HEADER)
+        self.available = self._open(self.available_path, AVAILABLE_HEADER)
+
+        self.binary = None
+        self.binary_path = None
+        if binary:
+            from binary_results import BinaryResultsWriter, BINARY_FILE
+            self.binary_path = os.path.join(output_dir, BINARY_FILE)
+            self.binary = BinaryResultsWriter(self.binary_path, self.tlds)
+
+        # Names in output order whose summary row has not been written yet,
+        # and the statuses collected so far for them
+        self.pending_names = deque()
+        self.pending_rows = {}
+        # Pending names that only get some of the TLDs (sharded runs)
+        self.expected_tlds = {}
+        self.lock = threading.Lock()
+
+        self.total_count = 0
+        self.available_count = 0
+        self.possibly_available_count = 0
+
+    def _open(self, path, header):
+        f = open(path, "w", newline='', encoding='utf-8')
+        self.files.append(f)
+        writer = csv.writer(f)
+        writer.writerow(header)
+        return writer
+
+    def add_name(self, name, tlds=None):
+        """
+        Register the next name in summary row order (call in input order).
+        tlds limits the row to the TLDs this run checks for the name (a
+        shard); the other cells are left empty for the shard merge.
+        """
+        with self.lock:
+            if tlds is not None and len(tlds) < len(self.tlds):
+                self.expected_tlds[name] = set(tlds)
+            self.pending_names.append(name)
+            self.pending_rows.setdefault(name, {})
+            self._write_complete_summary_rows()
+
+    def write(self, result):
+        """Write one result tuple to the output files."""
+        with self.lock:
+            self._write(result)
+
+    def _write(self, result):
+        name, tld, status = result[0], result[1], result[7]
+        self.total_count += 1
+
+        self.detailed.writerow(detailed_row(result))
+        if self.binary is not None:
+            self.binary.append(result)
+
+        row = available_row(result)
+        if row is not None:
+            self.available.writerow(row)
+            if status == 'AVAILABLE':
+                self.available_count += 1
+            else:
+                self.possibly_available_count += 1
+
+        self.pending_rows.setdefault(name, {})[tld] = status
+        self._write_complete_summary_rows()
+        self._maybe_flush()
+
+    def _write_summary_row(self, name):
+        statuses = self.pending_rows.pop(name, {})
+        expected = self.expected_tlds.pop(name, None)
+        cells = [
+            statuses.get(tld, 'ERROR') if expected is None or tld in expected else ''
+            for tld in self.tlds
+        ]
+        self.summary.writerow([name] + cells)
+        if self.binary is not None:
+            self.binary.add_summary_row(name, cells)
+
+    def _write_complete_summary_rows(self):
+        while self.pending_names:
+            name = self.pending_names[0]
+            expected = self.expected_tlds.get(name)
+            needed = len(self.tlds) if expected is None else len(expected)
+            if len(self.pending_rows.get(name, ())) < needed:
+                break
+            self.pending_names.popleft()
+            self._write_summary_row(name)
+
+    def _maybe_flush(self):
+        now = time.monotonic()
+        if now - self.last_flush >= self.flush_interval:
+            self.flush()
+            self.last_flush = now
+
+    def flush(self):
+        for f in self.files:
+            f.flush()
+
+    def close(self):
+        """Write the remaining summary rows (missing checks show as ERROR) and close the files."""
+        with self.lock:
+            while self.pending_names:
+                self._write_summary_row(self.pending_names.popleft())
+            for f in self.files:
+                f.close()
+            if self.binary is not None:
+                self.binary.close()
@@ -0,0 +1,300 @@
+"""
+Shared caching DNS resolver.
+
+All DNS lookups (dns_probe.py, both engines) go through one in-process
+CachingResolver, so repeated questions are answered from memory:
+
+- positive answers are kept for the TTL of the answer
+- NXDOMAIN (cached for the name, so it answers every record type) and
+  "no records of this type" answers are kept for the negative TTL of
+  RFC 2308: min(SOA TTL, SOA MINIMUM) from the authority section
+  (NEGATIVE_TTL if the response has no SOA)
+- the cache holds at most max_entries answers, least recently used ones
+  are evicted first
+
+Timeouts and server failures are never cached.
+
+Queries are spread round-robin over the upstream resolvers, set with
+DOMAIN_CHECKER_DNS_SERVERS (comma-separated, "ip" or "ip:port"; default:
+the system resolvers). An upstream that fails FAILURE_THRESHOLD times in
+a row is skipped for DOWN_TIME seconds, and a failed query is retried
+once on the next upstream. Only timeouts and network errors count as
+failures of the upstream: a SERVFAIL or REFUSED for one name usually
+means that name's own servers are broken.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import dns.asyncresolver
+import dns.exception
+import dns.name
+import dns.rdatatype
+import dns.resolver
+
+DEFAULT_MAX_ENTRIES = 50_000
+NEGATIVE_TTL = 300     # seconds, when a negative answer carries no SOA
+MAX_TTL = 86400
+QUERY_LIFETIME = 5.0
+
+FAILURE_THRESHOLD = 3
+DOWN_TIME = 30.0
+
+# Errors that say something about the upstream, not about the name
+UPSTREAM_ERRORS = (dns.exception.Timeout, OSError)
+
+# Cache key record type of NXDOMAIN entries (they cover all record types)
+NXDOMAIN_KEY = '*'
+
+
+def parse_upstreams(spec):
+    """Parse 'ip[:port],ip[:port]' into [(ip, port), ...]."""
+    upstreams = []
+    for item in (spec or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        host, port = item, 53
+        if item.count(':') == 1:  # IPv4 with port (IPv6 addresses contain several colons)
+            host, port = item.split(':')
+            port = int(port)
+        elif item.startswith('[') and ']:' in item:
+            host, port = item[1:].split(']:')
+            port = int(port)
+        upstreams.append((host.strip('[]'), port))
+    return upstreams
+
+
+def is_upstream_failure(error):
+    """True if a failed query means the upstream itself is not answering."""
+    if isinstance(error, UPSTREAM_ERRORS):
+        return True
+    if isinstance(error, dns.resolver.NoNameservers):
+        # (nameserver, tcp, port, error, response) per attempt; a response
+        # such as SERVFAIL is an answer about the name, not an upstream failure
+        errors = error.kwargs.get('errors') or []
+        return bool(errors) and all(isinstance(attempt[3], UPSTREAM_ERRORS) for attempt in errors)
+    return False
+
+
+def negative_ttl(response):
+    """RFC 2308 negative-caching TTL of a response: min(SOA TTL, SOA MINIMUM)."""
+    if response is not None:
+        for rrset in response.authority:
+            if rrset.rdtype == dns.rdatatype.SOA and len(rrset):
+                return min(rrset.ttl, rrset[0].minimum, MAX_TTL)
+    return NEGATIVE_TTL
+
+
+def _error_ttl(error):
+    if isinstance(error, dns.resolver.NXDOMAIN):
+        try:
+            return negative_ttl(error.response(error.qnames()[0]))
+        except (KeyError, IndexError):
+            return NEGATIVE_TTL
+    return negative_ttl(error.kwargs.get('response'))  # NoAnswer
+
+
+class Upstream:
+    """One upstream resolver with its failure counter."""
+
+    def __init__(self, host, port=53):
+        self.host = host
+        self.port = port
+        self.failures = 0
+        self.down_until = 0.0
+        self.queries = 0
+
+        self.resolver = dns.resolver.Resolver(configure=False)
+        self.async_resolver = dns.asyncresolver.Resolver(configure=False)
+        for resolver in (self.resolver, self.async_resolver):
+            resolver.nameservers = [host]
+            resolver.port = port
+            resolver.lifetime = QUERY_LIFETIME
+
+    def __repr__(self):
+        return f"{self.host}:{self.port}"
+
+
+class CachingResolver:
+    """Thread-safe caching resolver; resolve() mirrors dns.resolver.resolve."""
+
+    def __init__(self, upstreams=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.upstream_spec = upstreams
+        self.upstreams = None
+        self.max_entries = max_entries
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.next_upstream = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _configure(self):
+        """Pick the upstreams on first use (reads resolv.conf if none are configured)."""
+        if self.upstreams is not None:
+            return
+        upstreams = self.upstream_spec
+        if upstreams is None:
+            upstreams = parse_upstreams(os.getenv('DOMAIN_CHECKER_DNS_SERVERS', ''))
+        if not upstreams:
+            system = dns.resolver.Resolver()
+            upstreams = [(host, system.port) for host in system.nameservers]
+        if not upstreams:
+            raise dns.resolver.NoResolverConfiguration("no DNS resolvers configured")
+        self.upstreams = [Upstream(host, port) for host, port in upstreams]
+
+    # --- cache ---
+
+    def _get(self, key):
+        # A name that does not exist has no records of any type, so an
+        # NXDOMAIN entry for the name answers every record type
+        with self.lock:
+            now = time.monotonic()
+            for cache_key in (key, (key[0], NXDOMAIN_KEY)):
+                entry = self.cache.get(cache_key)
+                if entry is None:
+                    continue
+                if entry[0] <= now:
+                    del self.cache[cache_key]
+                    continue
+                self.cache.move_to_end(cache_key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def _put(self, key, ttl, answer=None, error=None):
+        if ttl <= 0:
+            return
+        with self.lock:
+            self.cache[key] = (time.monotonic() + min(ttl, MAX_TTL), answer, error)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+
+    def _store(self, key, answer=None, error=None):
+        if isinstance(error, dns.resolver.NXDOMAIN):
+            self._put((key[0], NXDOMAIN_KEY), _error_ttl(error), error=dns.resolver.NXDOMAIN)
+        elif error is not None:
+            # Keep only the error type: replaying a shared exception
+            # instance would grow its traceback on every raise
+            self._put(key, _error_ttl(error), error=type(error))
+        elif answer.rrset is not None:
+            self._put(key, answer.rrset.ttl, answer=answer)
+
+    @staticmethod
+    def _replay(key, entry):
+        _, answer, error = entry
+        if error is dns.resolver.NXDOMAIN:
+            raise dns.resolver.NXDOMAIN(qnames=[dns.name.from_text(key[0])])
+        if error is not None:
+            raise error()
+        return answer
+
+    # --- upstream selection and health ---
+
+    def _pick_upstream(self, exclude=None):
+        with self.lock:
+            self._configure()
+            now = time.monotonic()
+            count = len(self.upstreams)
+            for _ in range(count):
+                upstream = self.upstreams[self.next_upstream % count]
+                self.next_upstream += 1
+                if upstream is not exclude and upstream.down_until <= now:
+                    upstream.queries += 1
+                    return upstream
+            # Every upstream is down: use the one that comes back first
+            candidates = [u for u in self.upstreams if u is not exclude] or self.upstreams
+            upstream = min(candidates, key=lambda u: u.down_until)
+            upstream.queries += 1
+            return upstream
+
+    def _report(self, upstream, failed):
+        with self.lock:
+            if not failed:
+                upstream.failures = 0
+                return
+            upstream.failures += 1
+            if upstream.failures >= FAILURE_THRESHOLD:
+                upstream.down_until = time.monotonic() + DOWN_TIME
+                upstream.failures = 0
+                print(f"    ⚠️  DNS resolver {upstream} is not answering - skipping it for {DOWN_TIME:.0f}s")
+
+    def _attempts(self):
+        with self.lock:
+            self._configure()
+            return min(2, len(self.upstreams))
+
+    # --- lookups ---
+
+    def resolve(self, qname, rdtype='A'):
+        """Blocking lookup. Returns a dns.resolver.Answer or raises like dns.resolver.resolve."""
+        key = (str(qname).lower().rstrip('.'), str(rdtype).upper())
+        entry = self._get(key)
+        if entry is not None:
+            return self._replay(key, entry)
+
+        upstream = None
+        for attempt in range(self._attempts()):
+            upstream = self._pick_upstream(exclude=upstream)
+            try:
+                answer = upstream.resolver.resolve(key[0], key[1])
+            except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer) as e:
+                self._report(upstream, failed=False)
+                self._store(key, error=e)
+                raise
+            except (dns.resolver.NoNameservers, *UPSTREAM_ERRORS) as e:
+                if not is_upstream_failure(e):
+                    self._report(upstream, failed=False)
+                    raise
+                self._report(upstream, failed=True)
+                if attempt + 1 >= self._attempts():
+                    raise
+                continue
+            self._report(upstream, failed=False)
+            self._store(key, answer=answer)
+            return answer
+
+    async def async_resolve(self, qname, rdtype='A'):
+        """Non-blocking lookup with the same cache and upstreams as resolve()."""
+        key = (str(qname).lower().rstrip('.'), str(rdtype).upper())
+        entry = self._get(key)
+        if entry is not None:
+            return self._replay(key, entry)
+
+        upstream = None
+        for attempt in range(self._attempts()):
+            upstream = self._pick_upstream(exclude=upstream)
+            try:
+                answer = await upstream.async_resolver.resolve(key[0], key[1])
+            except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer) as e:
+                self._report(upstream, failed=False)
+                self._store(key, error=e)
+                raise
+            except (dns.resolver.NoNameservers, *UPSTREAM_ERRORS) as e:
+                if not is_upstream_failure(e):
+                    self._report(upstream, failed=False)
+                    raise
+                self._report(upstream, failed=True)
+                if attempt + 1 >= self._attempts():
+                    raise
+                continue
+            self._report(upstream, failed=False)
+            self._store(key, answer=answer)
+            return answer
+
+    def stats(self):
+        """Returns dict with cache size, hits, misses and per-upstream query counts."""
+        with self.lock:
+            return {
+                'entries': len(self.cache),
+                'hits': self.hits,
+                'misses': self.misses,
+                'upstreams': {repr(u): u.queries for u in self.upstreams or []},
+            }
+
+
+# Shared by every DNS lookup in the process
+resolver = CachingResolver()
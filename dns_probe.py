@@ -0,0 +1,141 @@
+"""
+Staged DNS probing shared by the threaded and asyncio engines.
+
+A single NXDOMAIN answer proves the name does not exist, so there is no
+point asking for the other record types. The probe therefore runs in two
+stages:
+
+1. Query the first record type on its own. NXDOMAIN ends the probe.
+2. Query the remaining record types concurrently.
+
+Two modes are available:
+
+- 'full' - the complete record map (A, AAAA, MX, NS, CNAME, SOA)
+- 'fast' - existence check only (NS, SOA)
+
+Lookups go through the shared caching resolver (dns_cache.py). The
+blocking probe's second stage runs on a shared pool sized so that every
+worker can have all its remaining queries in flight at once (see
+set_pool_size).
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import dns.resolver
+
+from dns_cache import resolver as caching_resolver
+
+DNS_RECORD_TYPES = ['A', 'AAAA', 'MX', 'NS', 'CNAME', 'SOA']
+FAST_RECORD_TYPES = ['NS', 'SOA']
+
+# Answers that only mean "no record of this type"
+NO_RECORD_ERRORS = (dns.resolver.NoAnswer, dns.resolver.NoNameservers, dns.resolver.Timeout)
+
+# Shared pool for the concurrent second stage of the blocking probe
+# (created on first use, threads are only started as they are needed)
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def set_pool_size(workers):
+    """Size the second-stage pool for workers concurrent blocking probes."""
+    global _executor
+    with _executor_lock:
+        previous = _executor
+        _executor = ThreadPoolExecutor(max_workers=max(1, workers) * (len(DNS_RECORD_TYPES) - 1),
+                                       thread_name_prefix='dns-probe')
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+
+def _get_executor():
+    if _executor is None:
+        set_pool_size(int(os.getenv('DOMAIN_CHECKER_MAX_WORKERS', '50')))
+    return _executor
+
+
+def record_types_for_mode(mode):
+    """Return the record types queried in the given mode ('full' or 'fast')."""
+    if mode == 'fast':
+        return FAST_RECORD_TYPES
+    if mode == 'full':
+        return DNS_RECORD_TYPES
+    raise ValueError(f"Unknown DNS check mode: {mode}")
+
+
+def _empty_details(mode):
+    return {record_type: False for record_type in record_types_for_mode(mode)}
+
+
+def probe_dns(domain, mode='full', resolve=None):
+    """
+    Blocking staged DNS probe.
+    Returns tuple: (has_dns, dns_details)
+    """
+    resolve = resolve or caching_resolver.resolve
+    record_types = record_types_for_mode(mode)
+    dns_details = _empty_details(mode)
+
+    def has_record(record_type):
+        try:
+            resolve(domain, record_type)
+            return True
+        except NO_RECORD_ERRORS:
+            return False
+
+    # Stage 1: a single query - NXDOMAIN means nothing else can exist
+    try:
+        dns_details[record_types[0]] = has_record(record_types[0])
+    except dns.resolver.NXDOMAIN:
+        return False, dns_details
+
+    # Stage 2: remaining record types in parallel
+    # (an NXDOMAIN here just means "no record", same as before staging)
+    def safe_has_record(record_type):
+        try:
+            return has_record(record_type)
+        except dns.resolver.NXDOMAIN:
+            return False
+
+    remaining = record_types[1:]
+    for record_type, found in zip(remaining, _get_executor().map(safe_has_record, remaining)):
+        dns_details[record_type] = found
+
+    return any(dns_details.values()), dns_details
+
+
+async def async_probe_dns(domain, resolver=None, mode='full'):
+    """
+    Non-blocking staged DNS probe using a CachingResolver (the shared one by default).
+    Returns tuple: (has_dns, dns_details)
+    """
+    resolver = resolver or caching_resolver
+    record_types = record_types_for_mode(mode)
+    dns_details = _empty_details(mode)
+
+    async def has_record(record_type):
+        try:
+            await resolver.async_resolve(domain, record_type)
+            return True
+        except NO_RECORD_ERRORS:
+            return False
+
+    # Stage 1: a single query - NXDOMAIN means nothing else can exist
+    try:
+        dns_details[record_types[0]] = await has_record(record_types[0])
+    except dns.resolver.NXDOMAIN:
+        return False, dns_details
+
+    # Stage 2: remaining record types concurrently
+    remaining = record_types[1:]
+    found = await asyncio.gather(*(has_record(t) for t in remaining), return_exceptions=True)
+    for record_type, result in zip(remaining, found):
+        if isinstance(result, dns.resolver.NXDOMAIN):
+            result = False
+        elif isinstance(result, BaseException):
+            raise result
+        dns_details[record_type] = result
+
+    return any(dns_details.values()), dns_details
@@ -0,0 +1,259 @@
+"""
+HTTP liveness probe shared by the threaded and asyncio engines.
+
+Only a yes/no answer is needed ("does anything answer on this name?"),
+so https and http are probed in parallel and the first success wins
+instead of waiting for a dead https endpoint to time out before trying
+http. Connect and read timeouts are separate, so a name that does not
+accept connections (the common case for parked or unused domains) is
+given up on after CONNECT_TIMEOUT.
+
+Two modes are available:
+
+- 'full' - a HEAD request; any HTTP response counts. The blocking probe
+  uses pooled per-thread requests sessions and follows at most
+  MAX_REDIRECTS redirects, the asyncio probe counts the first status line
+- 'fast' - TCP connect only, to ports 443 and 80 (no TLS handshake, no
+  request)
+
+Once one probe has answered, the other one is cancelled and its socket
+shut down, so it does not hold a pool thread (or a connection) until its
+timeouts run out. The blocking engine's pool is sized for every worker
+to run all its probes at once (see set_pool_size).
+"""
+import asyncio
+import os
+import socket
+import ssl
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+HTTP_PROBE_MODES = ('full', 'fast')
+PROBES = [('https', 443), ('http', 80)]
+DEFAULT_PORTS = {'https': 443, 'http': 80}
+
+CONNECT_TIMEOUT = 3
+READ_TIMEOUT = 5
+MAX_REDIRECTS = 3
+
+# Shared pool for the parallel https/http probes of the blocking engine
+# (created on first use, threads are only started as they are needed)
+_executor = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+_adapter_class = None
+
+
+def set_pool_size(workers):
+    """Size the probe pool for workers concurrent blocking probes."""
+    global _executor
+    with _executor_lock:
+        previous = _executor
+        _executor = ThreadPoolExecutor(max_workers=max(1, workers) * len(PROBES), thread_name_prefix='http-probe')
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+
+def _get_executor():
+    if _executor is None:
+        set_pool_size(int(os.getenv('DOMAIN_CHECKER_MAX_WORKERS', '50')))
+    return _executor
+
+
+class _Attempt:
+    """The sockets one blocking probe opens, so that a losing probe can be cut off."""
+
+    def __init__(self):
+        self.sockets = []
+        self.cancelled = False
+        self.lock = threading.Lock()
+
+    def track(self, sock):
+        with self.lock:
+            self.sockets.append(sock)
+            cancelled = self.cancelled
+        if cancelled:
+            _shutdown(sock)
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            sockets, self.sockets = self.sockets, []
+        for sock in sockets:
+            _shutdown(sock)
+
+
+def _shutdown(sock):
+    # shutdown() (unlike close()) also wakes up a thread blocked on the socket
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def _get_adapter_class():
+    """HTTPAdapter whose new connections are tracked by the current thread's _Attempt."""
+    global _adapter_class
+    if _adapter_class is None:
+        from requests.adapters import HTTPAdapter
+        from urllib3.connection import HTTPConnection, HTTPSConnection
+        from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+        def tracked(connection_class):
+            class TrackedConnection(connection_class):
+                def _new_conn(self):
+                    sock = super()._new_conn()
+                    attempt = getattr(_local, 'attempt', None)
+                    if attempt is not None:
+                        attempt.track(sock)
+                    return sock
+            return TrackedConnection
+
+        class TrackedHTTPPool(HTTPConnectionPool):
+            ConnectionCls = tracked(HTTPConnection)
+
+        class TrackedHTTPSPool(HTTPSConnectionPool):
+            ConnectionCls = tracked(HTTPSConnection)
+
+        class TrackingAdapter(HTTPAdapter):
+            def init_poolmanager(self, *args, **kwargs):
+                super().init_poolmanager(*args, **kwargs)
+                self.poolmanager.pool_classes_by_scheme = {'http': TrackedHTTPPool, 'https': TrackedHTTPSPool}
+
+        _adapter_class = TrackingAdapter
+    return _adapter_class
+
+
+def check_mode(mode):
+    if mode not in HTTP_PROBE_MODES:
+        raise ValueError(f"Unknown HTTP check mode: {mode}")
+    return mode
+
+
+def get_session():
+    """Per-thread pooled session (requests.Session is not thread-safe)."""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        # requests is imported on first use so that importing this module stays cheap
+        import requests
+        session = requests.Session()
+        session.max_redirects = MAX_REDIRECTS
+        adapter = _get_adapter_class()(pool_connections=4, pool_maxsize=4, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _local.session = session
+    return session
+
+
+def _head(domain, protocol, port, attempt):
+    import requests
+    url = f"{protocol}://{domain}" if DEFAULT_PORTS[protocol] == port else f"{protocol}://{domain}:{port}"
+    _local.attempt = attempt
+    try:
+        get_session().head(url, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), allow_redirects=True)
+        return True
+    except requests.TooManyRedirects:
+        return True  # it answered, just with a long redirect chain
+    except (requests.RequestException, ValueError, UnicodeError):
+        return False
+    finally:
+        _local.attempt = None
+
+
+def _connect(domain, port, attempt):
+    # Like socket.create_connection, but every socket is tracked before it connects
+    try:
+        addresses = socket.getaddrinfo(domain, port, type=socket.SOCK_STREAM)
+    except (OSError, UnicodeError):
+        return False
+    for family, socket_type, proto, _, address in addresses:
+        if attempt.cancelled:
+            return False
+        sock = socket.socket(family, socket_type, proto)
+        attempt.track(sock)
+        try:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(address)
+            return True
+        except OSError:
+            continue
+        finally:
+            sock.close()
+    return False
+
+
+def probe_http(domain, mode='full'):
+    """
+    Blocking probe: https and http in parallel, True as soon as one answers.
+    """
+    check_mode(mode)
+    executor = _get_executor()
+    attempts = {}
+    for protocol, port in PROBES:
+        attempt = _Attempt()
+        if mode == 'fast':
+            future = executor.submit(_connect, domain, port, attempt)
+        else:
+            future = executor.submit(_head, domain, protocol, port, attempt)
+        attempts[future] = attempt
+
+    pending = set(attempts)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        if any(future.result() for future in done):
+            # Cut the other probe off instead of letting it run into its timeouts
+            for future in pending:
+                future.cancel()
+                attempts[future].cancel()
+            return True
+    return False
+
+
+async def _async_head(domain, protocol, port):
+    ssl_context = ssl.create_default_context() if protocol == 'https' else None
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(domain, port, ssl=ssl_context), timeout=CONNECT_TIMEOUT
+        )
+    except (OSError, asyncio.TimeoutError, UnicodeError, ssl.SSLError):
+        return False
+    try:
+        writer.write(f"HEAD / HTTP/1.1\r\nHost: {domain}\r\nConnection: close\r\n\r\n".encode('ascii'))
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout=READ_TIMEOUT)
+        return status_line.startswith(b'HTTP/')
+    except (OSError, asyncio.TimeoutError, ssl.SSLError):
+        return False
+    finally:
+        writer.close()
+
+
+async def _async_connect(domain, port):
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(domain, port), timeout=CONNECT_TIMEOUT)
+    except (OSError, asyncio.TimeoutError, UnicodeError):
+        return False
+    writer.close()
+    return True
+
+
+async def async_probe_http(domain, mode='full'):
+    """
+    Non-blocking probe: https and http in parallel, True as soon as one answers.
+    """
+    check_mode(mode)
+    if mode == 'fast':
+        probes = [asyncio.ensure_future(_async_connect(domain, port)) for _, port in PROBES]
+    else:
+        probes = [asyncio.ensure_future(_async_head(domain, protocol, port)) for protocol, port in PROBES]
+
+    pending = set(probes)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if any(probe.result() for probe in done):
+                return True
+        return False
+    finally:
+        for probe in pending:
+            probe.cancel()
@@ -0,0 +1,185 @@
+"""
+Streaming input for the task pipeline.
+
+Name files are read line by line and de-duplicated on the fly, so the
+checks can start as soon as the first name is read and the input may be
+larger than the available memory. De-duplication uses CompactSeenSet,
+which stores a 64-bit hash per name (about 16 bytes per name) instead of
+the names themselves. Names are compared in their normalised form
+(lowercased, IDNA-encoded), so "Foo" and "foo" are checked once, under
+the spelling that came first.
+
+Generated names (see name_generator.py) can run into billions, so when
+they are part of the input the duplicates are removed with a BloomFilter
+of fixed size instead (DOMAIN_CHECKER_DEDUPE_MB, default DEDUPE_MB): its
+memory never grows, at the price of skipping a tiny fraction of unique
+names once it holds many more names than it was sized for.
+"""
+import glob
+import hashlib
+import itertools
+import math
+import os
+from array import array
+
+from zone_index import normalize_domain
+
+
+def _hash64(key):
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    # 0 marks an empty slot in CompactSeenSet
+    return int.from_bytes(digest, 'little') or 1
+
+
+class CompactSeenSet:
+    """
+    Memory-compact set of strings, stored as 64-bit hashes in an
+    open-addressing table. Two different strings hashing to the same
+    64-bit value would be treated as duplicates; at a billion entries the
+    chance of even a single collision is about 3%.
+    """
+
+    def __init__(self, capacity=1024):
+        size = 16
+        while size < capacity * 2:
+            size *= 2
+        self.slots = array('Q', bytes(8 * size))
+        self.mask = size - 1
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _find(self, h):
+        slots, mask = self.slots, self.mask
+        i = h & mask
+        while True:
+            value = slots[i]
+            if value == 0 or value == h:
+                return i
+            i = (i + 1) & mask
+
+    def __contains__(self, key):
+        return self.slots[self._find(_hash64(key))] != 0
+
+    def add(self, key):
+        """Add a string. Returns True if it was not in the set yet."""
+        h = _hash64(key)
+        i = self._find(h)
+        if self.slots[i] != 0:
+            return False
+        self.slots[i] = h
+        self.count += 1
+        if self.count * 2 > len(self.slots):
+            self._grow()
+        return True
+
+    def _grow(self):
+        old = self.slots
+        self.slots = array('Q', bytes(16 * len(old)))
+        self.mask = len(self.slots) - 1
+        for h in old:
+            if h:
+                self.slots[self._find(h)] = h
+
+
+DEDUPE_MB = 64
+
+
+class BloomFilter:
+    """
+    Fixed-size set of strings that may report a string it has not seen as
+    seen (a false positive), but never the other way round. With m bits
+    and n strings the false positive rate is about (1 - e^(-kn/m))^k; the
+    default 64 MB keep it under 0.1% up to about 37 million names.
+    """
+
+    def __init__(self, size_mb=None, hashes=10):
+        if size_mb is None:
+            size_mb = float(os.getenv('DOMAIN_CHECKER_DEDUPE_MB', str(DEDUPE_MB)))
+        self.bits = bytearray(max(1, int(size_mb * 1024 * 1024)))
+        self.size = len(self.bits) * 8
+        self.hashes = hashes
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _positions(self, key):
+        # Double hashing: k positions from the two halves of one 128-bit hash
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key):
+        """Add a string. Returns True if it was (as far as the filter can tell) not in the set yet."""
+        bits = self.bits
+        new = False
+        for p in self._positions(key):
+            mask = 1 << (p & 7)
+            if not bits[p >> 3] & mask:
+                bits[p >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def false_positive_rate(self):
+        """Estimated chance that the next new string is taken for a duplicate."""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+def iter_lines_from_folder(folder_path, label):
+    """Yield the stripped, non-empty lines of every .txt file in a folder, one at a time."""
+    if not os.path.exists(folder_path):
+        print(f"Error: Folder {folder_path} does not exist")
+        return
+
+    # Find all .txt files in the folder
+    txt_files = sorted(glob.glob(os.path.join(folder_path, "*.txt")))
+
+    if not txt_files:
+        print(f"No .txt files found in {folder_path}")
+        return
+
+    print(f"Found {len(txt_files)} {label} file(s) in {folder_path}")
+
+    for file_path in txt_files:
+        count = 0
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        count += 1
+                        yield line
+        except Exception as e:
+            print(f"  Error reading {file_path}: {e}")
+        print(f"  Read {count} {label}s from {os.path.basename(file_path)}")
+
+
+def iter_unique(items, seen=None, key=None):
+    """Yield items in order, skipping ones already seen (compared by key(item) if given)."""
+    seen = seen if seen is not None else CompactSeenSet()
+    for item in items:
+        if seen.add(key(item) if key else item):
+            yield item
+
+
+def iter_domain_names(folder_path="input/domain_name", generated=None):
+    """
+    Lazily yield the unique domain names from all text files in a folder,
+    followed by the generated names (an iterable, see name_generator.py) if given.
+    """
+    names = iter_lines_from_folder(folder_path, "domain name")
+    if generated is None:
+        return iter_unique(names, key=normalize_domain)
+    if not os.path.exists(folder_path):
+        names = ()  # generated names only
+    return iter_unique(itertools.chain(names, generated), seen=BloomFilter(), key=normalize_domain)
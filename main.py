@@ -1,59 +1,137 @@
-import whois
+"""
+Domain availability checker.
+
+Importing this module has no side effects: it reads no files, and the
+heavy dependencies (dnspython, requests) are only imported by the check
+stages that need them, so other code can reuse e.g. advanced_whois_check
+cheaply. Configuration comes from the environment (DOMAIN_CHECKER_*
+variables, see load_settings) and the command line (see cli):
+
+    python main.py --names input/domain_name --tlds input/top_level_domain --mode async
+"""
 import time
-import csv
 import threading
 import queue
 import os
 import glob
+import itertools
 import socket
-import dns.resolver
-import requests
-import re
+import sqlite3
+import argparse
+import subprocess
+import sys
 from collections import defaultdict
 from dotenv import load_dotenv
+from http_probe import HTTP_PROBE_MODES, check_mode as check_http_mode
+from whois_client import whois_lookup, interpret_whois_result
+from result_cache import ResultCache
+from checkpoint import Checkpoint
+from csv_output import StreamingCSVWriter
+from input_stream import iter_domain_names
+from tld_policy import PolicyTable, parse_tld_line, rejected_result
+from priority import AvailabilityModel, StopTracker, prioritize, task_key
+from name_generator import has_patterns, iter_generated_names, DEFAULT_PATTERNS_FOLDER, DEFAULT_WORDLISTS_FOLDER
+from check_pipeline import (parse_pipeline, parse_min_confidence, new_state, stage_applicable, settle, result_tuple,
+                            decision_note, FAILED_CHECK)
+from zone_index import ZoneIndex, DEFAULT_INDEX_PATH as ZONE_INDEX_PATH, build_index
+from metrics import metrics, timed, ProgressReporter, serve_metrics, PROGRESS_INTERVAL
+from sharding import parse_shard, shard_of, shard_dir, find_shard_dirs, merge_shards
+from retry import RetryPolicy, RetryScheduler
+from singleflight import checks_in_flight, lookup_key
+from namecheap_api import get_credentials as get_namecheap_credentials
+
+DOMAIN_NAME_FOLDER = os.path.join('input', 'domain_name')
+TLD_FOLDER = os.path.join('input', 'top_level_domain')
+
+EXECUTION_MODES = ('threaded', 'async')
+DNS_CHECK_MODES = ('full', 'fast')
 
-# Load environment variables from .env file
-load_dotenv()
+def check_execution_mode(mode):
+    if mode not in EXECUTION_MODES:
+        raise ValueError(f"Unknown execution mode: {mode}")
+    return mode
 
-def load_domain_names_from_folder(folder_path="input/domain_name"):
-    """Load domain names from all text files in the specified folder."""
-    all_names = []
+def check_dns_mode(mode):
+    if mode not in DNS_CHECK_MODES:
+        raise ValueError(f"Unknown DNS check mode: {mode}")
+    return mode
+
+def load_settings(strict=True):
+    """
+    (Re-)read the DOMAIN_CHECKER_* settings from the environment.
+    An invalid value raises ValueError, or with strict=False falls back to
+    the default. Runs at import non-strictly (environment only, no file
+    access, so `import main` and --help never fail); cli() runs it again
+    strictly after loading the .env file and then applies the command line
+    options.
+    """
+    global DNS_CHECK_MODE, HTTP_CHECK_MODE, CHECK_PIPELINE, MIN_CONFIDENCE, NUM_WORKERS, EXECUTION_MODE
+    global ASYNC_CONCURRENCY, PROGRESS_EVERY, METRICS_PORT, BINARY_OUTPUT, SERVICE_PORT, STOP_AFTER
     
-    if not os.path.exists(folder_path):
-        print(f"Error: Folder {folder_path} does not exist")
-        return []
+    def setting(name, default, parse):
+        value = os.getenv(name, default)
+        try:
+            return parse(value)
+        except ValueError as e:
+            if strict:
+                raise ValueError(f"{name}={value!r}: {e}") from None
+            return parse(default)
     
-    # Find all .txt files in the folder
-    txt_files = glob.glob(os.path.join(folder_path, "*.txt"))
+    # DNS check mode: 'full' (A, AAAA, MX, NS, CNAME, SOA) or 'fast' (NS/SOA only)
+    DNS_CHECK_MODE = setting('DOMAIN_CHECKER_DNS_MODE', 'full', lambda value: check_dns_mode(value.lower()))
     
-    if not txt_files:
-        print(f"No .txt files found in {folder_path}")
-        return []
+    # HTTP check mode: 'full' (HEAD request) or 'fast' (TCP connect to 443/80 only)
+    HTTP_CHECK_MODE = setting('DOMAIN_CHECKER_HTTP_MODE', 'full', lambda value: check_http_mode(value.lower()))
     
-    print(f"Found {len(txt_files)} domain name file(s) in {folder_path}")
+    # Order of the verification stages (see check_pipeline.py), e.g. 'dns,whois,api,http'
+    # or 'legacy' for the original WHOIS-first order, and the confidence that is
+    # good enough to skip the remaining stages
+    CHECK_PIPELINE = setting('DOMAIN_CHECKER_PIPELINE', '', parse_pipeline)
+    MIN_CONFIDENCE = setting('DOMAIN_CHECKER_MIN_CONFIDENCE', 'HIGH', parse_min_confidence)
     
-    for file_path in txt_files:
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                names = [line.strip() for line in f if line.strip()]
-                all_names.extend(names)
-                print(f"  Loaded {len(names)} domain names from {os.path.basename(file_path)}")
-        except Exception as e:
-            print(f"  Error reading {file_path}: {e}")
+    # Using threads makes this process *significantly* faster.
+    # NUM_WORKERS is only the hard ceiling of checks in flight: how many of them
+    # query one WHOIS server or the API at the same time is adapted per server
+    # (AIMD, see concurrency.py), so fast registries get more and slow or
+    # throttling ones fewer
+    NUM_WORKERS = setting('DOMAIN_CHECKER_MAX_WORKERS', '50', int)
     
-    # Remove duplicates while preserving order
-    unique_names = []
-    seen = set()
-    for name in all_names:
-        if name not in seen:
-            unique_names.append(name)
-            seen.add(name)
+    # Execution mode: 'threaded' (NUM_WORKERS blocking threads) or 'async'
+    # (asyncio engine that keeps ASYNC_CONCURRENCY checks in flight at once)
+    EXECUTION_MODE = setting('DOMAIN_CHECKER_MODE', 'threaded', lambda value: check_execution_mode(value.lower()))
+    ASYNC_CONCURRENCY = setting('DOMAIN_CHECKER_CONCURRENCY', '500', int)
     
+    # Progress line every N seconds (0 = off) and optional Prometheus /metrics port (see metrics.py)
+    PROGRESS_EVERY = setting('DOMAIN_CHECKER_PROGRESS_INTERVAL', str(PROGRESS_INTERVAL), float)
+    METRICS_PORT = setting('DOMAIN_CHECKER_METRICS_PORT', '0', int)
+    
+    # Also write the compact binary results file next to the CSVs (see binary_results.py)
+    BINARY_OUTPUT = os.getenv('DOMAIN_CHECKER_BINARY_OUTPUT', '').lower() in ('1', 'true', 'yes')
+    
+    # Port of the check service started with --serve (see service.py)
+    SERVICE_PORT = setting('DOMAIN_CHECKER_SERVICE_PORT', '8053', int)
+    
+    # Skip the remaining TLDs of a name once it has this many AVAILABLE results (0 = check all, see priority.py)
+    STOP_AFTER = setting('DOMAIN_CHECKER_STOP_AFTER', '0', int)
+
+load_settings(strict=False)
+
+def load_domain_names_from_folder(folder_path=DOMAIN_NAME_FOLDER):
+    """
+    Load domain names from all text files in the specified folder.
+    main() streams names with iter_domain_names instead; this is kept for
+    callers that want the whole list.
+    """
+    unique_names = list(iter_domain_names(folder_path))
     print(f"Total unique domain names loaded: {len(unique_names)}")
     return unique_names
 
-def load_tlds_from_folder(folder_path="input/top_level_domain"):
-    """Load TLDs from all text files in the specified folder."""
+def load_tlds_from_folder(folder_path=TLD_FOLDER, options=None):
+    """
+    Load TLDs from all text files in the specified folder.
+    A TLD may be followed by policy options (see tld_policy.py); they are
+    collected into the options dict (tld -> dict) if one is given.
+    """
     all_tlds = []
     
     if not os.path.exists(folder_path):
@@ -72,7 +150,19 @@ def load_tlds_from_folder(folder_path="input/top_level_domain"):
     for file_path in txt_files:
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                tlds = [line.strip() for line in f if line.strip()]
+                tlds = []
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    try:
+                        tld, tld_options = parse_tld_line(line)
+                    except ValueError as e:
+                        print(f"  ⚠️  {os.path.basename(file_path)}: {e} - ignoring the options of {line.split()[0]}")
+                        tld, tld_options = line.split()[0], {}
+                    tlds.append(tld)
+                    if options is not None and tld_options:
+                        options.setdefault(tld, {}).update(tld_options)
                 all_tlds.extend(tlds)
                 print(f"  Loaded {len(tlds)} TLDs from {os.path.basename(file_path)}")
         except Exception as e:
@@ -89,141 +179,49 @@ def load_tlds_from_folder(folder_path="input/top_level_domain"):
     print(f"Total unique TLDs loaded: {len(unique_tlds)}")
     return unique_tlds
 
-def check_dns_exists(domain):
+@timed('dns')
+def check_dns_exists(domain, mode=None):
     """
-    Check if domain has DNS records (A, AAAA, MX, NS records).
+    Check if domain has DNS records (A, AAAA, MX, NS, CNAME, SOA records).
+    Stops at the first NXDOMAIN and queries the remaining record types in parallel.
+    mode: 'full' (all record types) or 'fast' (NS/SOA existence check only),
+    defaults to DNS_CHECK_MODE.
     Returns tuple: (has_dns, dns_details)
     """
-    dns_details = {
-        'A': False,
-        'AAAA': False,
-        'MX': False,
-        'NS': False,
-        'CNAME': False,
-        'SOA': False
-    }
-    
-    has_any_dns = False
-    
-    # Check for A records (IPv4 - most common for websites)
-    try:
-        dns.resolver.resolve(domain, 'A')
-        dns_details['A'] = True
-        has_any_dns = True
-    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.NoNameservers, dns.resolver.Timeout):
-        pass
-    
-    # Check for AAAA records (IPv6)
-    try:
-        dns.resolver.resolve(domain, 'AAAA')
-        dns_details['AAAA'] = True
-        has_any_dns = True
-    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.NoNameservers, dns.resolver.Timeout):
-        pass
-    
-    # Check for MX records (email servers - strong indicator domain is in use)
-    try:
-        dns.resolver.resolve(domain, 'MX')
-        dns_details['MX'] = True
-        has_any_dns = True
-    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.NoNameservers, dns.resolver.Timeout):
-        pass
-    
-    # Check for NS records (nameservers - indicates domain is configured)
-    try:
-        dns.resolver.resolve(domain, 'NS')
-        dns_details['NS'] = True
-        has_any_dns = True
-    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.NoNameservers, dns.resolver.Timeout):
-        pass
-    
-    # Check for CNAME records
-    try:
-        dns.resolver.resolve(domain, 'CNAME')
-        dns_details['CNAME'] = True
-        has_any_dns = True
-    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.NoNameservers, dns.resolver.Timeout):
-        pass
-    
-    # Check for SOA records (Start of Authority - indicates DNS zone exists)
-    try:
-        dns.resolver.resolve(domain, 'SOA')
-        dns_details['SOA'] = True
-        has_any_dns = True
-    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.NoNameservers, dns.resolver.Timeout):
-        pass
-    
-    return has_any_dns, dns_details
+    from dns_probe import probe_dns  # dnspython is only loaded once DNS is checked
+    return probe_dns(domain, mode or DNS_CHECK_MODE)
 
-def check_http_response(domain):
+@timed('http')
+def check_http_response(domain, mode=None):
     """
     Check if domain responds to HTTP/HTTPS requests.
     This helps identify domains that are actively being used.
+    https and http are probed in parallel and the first answer wins.
+    mode: 'full' (HEAD request) or 'fast' (TCP connect only), defaults to
+    HTTP_CHECK_MODE.
     """
-    for protocol in ['https', 'http']:
-        try:
-            url = f"{protocol}://{domain}"
-            response = requests.head(url, timeout=5, allow_redirects=True)
-            return True  # Domain responds to HTTP
-        except:
-            pass
-    return False
+    from http_probe import probe_http
+    return probe_http(domain, mode or HTTP_CHECK_MODE)
 
+@timed('whois')
 def advanced_whois_check(domain):
     """
     Perform advanced WHOIS check with multiple verification methods.
+    Queries the TLD's WHOIS server directly over port 43 (see whois_client.py),
+    rate limited per WHOIS server.
     Returns: (is_available, confidence_level, details)
     """
-    try:
-        time.sleep(0.3)  # Rate limiting
-        w = whois.whois(domain)
-        
-        # Check multiple indicators
-        has_domain_name = bool(w.domain_name)
-        has_registrar = bool(w.registrar) if hasattr(w, 'registrar') else False
-        has_creation_date = bool(w.creation_date) if hasattr(w, 'creation_date') else False
-        has_expiration_date = bool(w.expiration_date) if hasattr(w, 'expiration_date') else False
-        has_name_servers = bool(w.name_servers) if hasattr(w, 'name_servers') else False
-        
-        # Strong indicators that domain is TAKEN
-        if has_domain_name or has_registrar or has_creation_date:
-            return False, 'HIGH', {
-                'domain_name': has_domain_name,
-                'registrar': has_registrar,
-                'creation_date': has_creation_date,
-                'expiration_date': has_expiration_date,
-                'name_servers': has_name_servers
-            }
-        
-        # If no clear indicators, likely available
-        return True, 'MEDIUM', {}
-        
-    except Exception as e:
-        error_str = str(e).lower()
-        
-        # Strong indicators domain is AVAILABLE
-        if any(phrase in error_str for phrase in [
-            'domain not found',
-            'no match',
-            'not found',
-            'no entries found',
-            'no data found',
-            'status: free',
-            'no match for',
-            'not registered',
-            'available for registration'
-        ]):
-            return True, 'HIGH', {'whois_message': 'Domain not found'}
-        
-        # If we can't determine, be conservative
-        return False, 'LOW', {'error': str(e)[:100]}
-    
-    return True, 'MEDIUM', {}
+    result = whois_lookup(domain)
+    return interpret_whois_result(result)
 
+@timed('api')
 def check_namecheap_availability(domain):
     """
     Check domain availability via Namecheap API.
-    Returns: 'AVAILABLE', 'TAKEN', 'PREMIUM', 'RESTRICTED', or 'ERROR'
+    Returns: 'AVAILABLE', 'TAKEN', 'PREMIUM', or an 'ERROR_*' status
+    
+    Domains from all workers are combined into batched namecheap.domains.check
+    calls (up to 50 domains per request, see namecheap_api.py).
     
     Requires environment variables:
     - NAMECHEAP_API_KEY
@@ -231,78 +229,22 @@ def check_namecheap_availability(domain):
     - NAMECHEAP_USERNAME
     - NAMECHEAP_CLIENT_IP
     """
-    try:
-        # Get API credentials from environment
-        api_key = os.getenv('NAMECHEAP_API_KEY')
-        api_user = os.getenv('NAMECHEAP_API_USER')
-        username = os.getenv('NAMECHEAP_USERNAME')
-        client_ip = os.getenv('NAMECHEAP_CLIENT_IP')
-        
-        # Check if credentials are configured
-        if not all([api_key, api_user, username, client_ip]):
-            return 'ERROR_NO_CREDENTIALS'
-        
-        # Namecheap API endpoint for domain availability check
-        # Use sandbox for testing: https://api.sandbox.namecheap.com/xml.response
-        # Use production: https://api.namecheap.com/xml.response
-        api_url = "https://api.namecheap.com/xml.response"
-        
-        params = {
-            'ApiUser': api_user,
-            'ApiKey': api_key,
-            'UserName': username,
-            'ClientIp': client_ip,
-            'Command': 'namecheap.domains.check',
-            'DomainList': domain
-        }
-        
-        response = requests.get(api_url, params=params, timeout=10)
-        
-        # Parse XML response
-        if response.status_code == 200:
-            content = response.text
-            content_lower = content.lower()
-            
-            # Check for API errors and extract error message
-            if 'status="error"' in content_lower:
-                # Try to extract the error message from XML
-                error_match = re.search(r'<error[^>]*>(.*?)</error>', content, re.IGNORECASE)
-                if error_match:
-                    error_msg = error_match.group(1)
-                    print(f"    ❌ Namecheap API Error for {domain}: {error_msg}")
-                else:
-                    print(f"    ❌ Namecheap API Error for {domain}: Check credentials/IP whitelist")
-                # Print full response for debugging (first check only)
-                if domain.endswith(('.com', '.net', '.org')):
-                    print(f"    Debug - API Response: {content[:500]}")
-                return 'ERROR_API'
-            
-            # Parse availability from XML
-            # Look for Available="true" or Available="false"
-            if 'available="true"' in content_lower:
-                # Check if it's premium
-                if 'ispremiumname="true"' in content_lower or 'premium' in content_lower:
-                    return 'PREMIUM'
-                return 'AVAILABLE'
-            elif 'available="false"' in content_lower:
-                return 'TAKEN'
-            else:
-                print(f"    ⚠️  Could not parse API response for {domain}")
-                return 'ERROR_PARSE'
-        else:
-            print(f"    ❌ HTTP Error {response.status_code} for {domain}")
-            return 'ERROR_HTTP'
-            
-    except requests.exceptions.Timeout:
-        return 'ERROR_TIMEOUT'
-    except Exception as e:
-        print(f"    Namecheap API exception for {domain}: {type(e).__name__}")
-        return 'ERROR'
+    # Check if credentials are configured
+    if get_namecheap_credentials() is None:
+        return 'ERROR_NO_CREDENTIALS'
+    
+    from namecheap_api import batcher as namecheap_batcher
+    return namecheap_batcher.submit(domain).result()
+
+def is_api_configured():
+    """True if Namecheap API credentials are set (and not the .env.example placeholder)."""
+    api_key = os.getenv('NAMECHEAP_API_KEY')
+    return get_namecheap_credentials() is not None and api_key != 'your_api_key_here'
 
 def enhanced_availability_check(domain):
     """
     Enhanced availability check combining multiple methods.
-    Returns tuple: (whois_available, confidence, dns_active, dns_details, http_active, registrar_status)
+    Returns tuple: (whois_available, confidence, dns_active, dns_details, http_active, registrar_status, decision)
     
     Without API:
     - Uses advanced WHOIS checking
@@ -313,178 +255,523 @@ def enhanced_availability_check(domain):
     With API (optional):
     - All of the above PLUS
     - Namecheap API verification
-    """
-    # 1. Advanced WHOIS Check
-    whois_available, confidence, whois_details = advanced_whois_check(domain)
     
-    # 2. Comprehensive DNS Check
-    dns_active = False
-    dns_details = {}
-    http_active = False
+    The checks run in CHECK_PIPELINE order (cheapest first by default) and
+    stop as soon as the early-exit policy in check_pipeline.py settles the
+    verdict at MIN_CONFIDENCE or better; decision is then (stage, status,
+    confidence), else None.
+    """
+    state = new_state()
+    api_configured = is_api_configured()
     
-    if whois_available:
-        try:
-            dns_active, dns_details = check_dns_exists(domain)
-        except Exception:
-            dns_active = False
-            dns_details = {}
+    for stage in CHECK_PIPELINE:
+        if not stage_applicable(stage, state, api_configured):
+            continue
+        
+        if stage == 'whois':
+            # Advanced WHOIS Check
+            state['whois_available'], state['confidence'], _ = advanced_whois_check(domain)
         
-        # 3. HTTP Check (only if WHOIS says available and DNS is active)
-        # This helps identify parked domains vs truly available
-        if dns_active:
+        elif stage == 'dns':
+            # Comprehensive DNS Check
             try:
-                http_active = check_http_response(domain)
+                state['dns_active'], state['dns_details'] = check_dns_exists(domain)
+            except Exception:
+                state['dns_active'], state['dns_details'] = False, {}
+        
+        elif stage == 'http':
+            # HTTP Check - helps identify parked domains vs truly available
+            try:
+                state['http_active'] = check_http_response(domain)
             except:
-                http_active = False
-    
-    # 4. Namecheap API Check (optional - only if configured)
-    registrar_status = 'API_NOT_CONFIGURED'
-    api_key = os.getenv('NAMECHEAP_API_KEY')
-    
-    # Only use API if:
-    # - API key exists AND is not placeholder
-    # - Domain appears available from WHOIS
-    # - DNS doesn't indicate heavy use
-    if api_key and api_key != 'your_api_key_here' and whois_available:
-        if not dns_active or confidence == 'HIGH':
+                state['http_active'] = False
+        
+        elif stage == 'api':
+            # Namecheap API Check (optional - only if configured)
             try:
-                time.sleep(0.5)  # API rate limiting
-                registrar_status = check_namecheap_availability(domain)
+                state['registrar_status'] = check_namecheap_availability(domain)
             except:
-                registrar_status = 'API_ERROR'
+                state['registrar_status'] = 'API_ERROR'
+        
+        if settle(stage, state, MIN_CONFIDENCE):
+            break
     
-    return whois_available, confidence, dns_active, dns_details, http_active, registrar_status
+    return result_tuple(state)
 
-# Load domain names and TLDs from folders
-NAMES = load_domain_names_from_folder()
-TLDS_TO_CHECK = load_tlds_from_folder()
+# TLDs to check, loaded by main() (domain names are streamed), and their
+# registration policies for rejecting impossible names (see tld_policy.py)
+TLDS_TO_CHECK = []
+TLD_POLICIES = None
 
 # --- Threading Setup ---
-# Using threads makes this process *significantly* faster.
-# We will check this many domains at the same time.
-# Reduced from 10 to 5 to avoid rate limiting
-NUM_WORKERS = 5 
-task_queue = queue.Queue()
+# Tasks are produced lazily; a full queue makes the producer wait (backpressure)
+TASK_QUEUE_SIZE = 1000
+task_queue = queue.Queue(maxsize=TASK_QUEUE_SIZE)
 results_queue = queue.Queue()
 # -----------------------
 
+# Persistent result cache (see result_cache.py) and per-run checkpoint
+# for --resume (see checkpoint.py), both opened in main()
+result_cache = None
+checkpoint = None
+REFRESH_CACHE = False  # True = re-check everything, but still update the cache
+
+# Index of registered domains from zone files (see zone_index.py), opened in
+# main() if it has been built with --import-zone
+zone_index = None
+
+# (index, count) when this process only checks one shard (see sharding.py)
+SHARD = None
+
+# Checks that failed for transient reasons (WHOIS errors, API errors) are
+# re-queued with backoff instead of being recorded (see retry.py); set up
+# in run_checks()
+retry_policy = None
+retry_scheduler = None
+
+# Counts AVAILABLE results per name when checks stop after STOP_AFTER hits
+# per name (see priority.py); set up in main()
+stop_tracker = None
+
+def determine_final_status(full_domain, whois_available, confidence, dns_active, dns_details, http_active, registrar_status,
+                           decision=None):
+    """
+    Combine the individual check results into a final verdict.
+    decision is the (stage, status, confidence) of a check the pipeline settled early.
+    Returns tuple: (status, final_confidence)
+    """
+    # Advanced decision logic for accurate availability determination
+    # Priority: Namecheap API > Multi-factor analysis > WHOIS
+    
+    if registrar_status == 'AVAILABLE':
+        # Namecheap API confirms it's available - HIGHEST confidence!
+        print(f"  -> {full_domain} is ✅ CONFIRMED AVAILABLE via Namecheap API (HIGH CONFIDENCE)")
+        status = "AVAILABLE"
+        final_confidence = "VERY HIGH"
+        
+    elif registrar_status == 'PREMIUM':
+        # Domain is available but premium pricing
+        print(f"  -> {full_domain} is 💎 PREMIUM (available but special pricing)")
+        status = "PREMIUM"
+        final_confidence = "HIGH"
+        
+    elif registrar_status == 'TAKEN':
+        # Namecheap says taken - trust it
+        print(f"  -> {full_domain} is ❌ TAKEN (confirmed by Namecheap)")
+        status = "TAKEN"
+        final_confidence = "VERY HIGH"
+        
+    elif decision is not None and confidence == 'NOT_CHECKED':
+        # Settled by an earlier stage - WHOIS was skipped
+        stage, status, final_confidence = decision
+        print(f"  -> {full_domain} is {status} (decided by {stage.upper()}, WHOIS not checked)")
+        
+    elif not whois_available and confidence != 'LOW' and (dns_details.get('NS') or dns_details.get('SOA')):
+        # Delegated in its TLD zone - registered
+        print(f"  -> {full_domain} is ❌ TAKEN (delegated in DNS)")
+        status = "TAKEN"
+        final_confidence = confidence
+        
+    elif not whois_available and confidence == 'LOW':
+        # WHOIS failed on every attempt - nothing says it's available
+        print(f"  -> {full_domain} status UNCERTAIN (WHOIS lookup failed) - assuming TAKEN for safety")
+        status = "TAKEN"
+        final_confidence = "LOW"
+        
+    elif not whois_available:
+        # WHOIS shows it's registered - definitely taken
+        print(f"  -> {full_domain} is ❌ TAKEN (registered in WHOIS)")
+        status = "TAKEN"
+        final_confidence = "HIGH"
+        
+    elif whois_available and not dns_active and not http_active:
+        # WHOIS says available, NO DNS, NO HTTP - BEST case for availability!
+        dns_info = "No DNS records"
+        print(f"  -> {full_domain} is ✅ LIKELY AVAILABLE ({confidence} confidence - {dns_info})")
+        status = "AVAILABLE"
+        final_confidence = confidence
+        
+    elif whois_available and dns_active and not http_active:
+        # Has DNS but no HTTP response - might be parked/reserved/premium
+        active_records = [k for k, v in dns_details.items() if v]
+        dns_info = f"Has {', '.join(active_records)} records but no website"
+        
+        # If only NS/SOA (basic DNS), might still be available
+        if set(active_records).issubset({'NS', 'SOA'}):
+            print(f"  -> {full_domain} is ⚠️  POSSIBLY AVAILABLE ({dns_info} - may be parking)")
+            status = "POSSIBLY AVAILABLE"
+            final_confidence = "MEDIUM"
+        else:
+            # Has A, MX, or other records - likely reserved/premium
+            print(f"  -> {full_domain} appears ⚠️  RESTRICTED/PREMIUM ({dns_info})")
+            status = "RESTRICTED/PREMIUM"
+            final_confidence = "MEDIUM"
+            
+    elif whois_available and http_active:
+        # Responds to HTTP but WHOIS says available - likely reserved/premium
+        active_records = [k for k, v in dns_details.items() if v]
+        dns_info = f"Active website with {', '.join(active_records)} records"
+        print(f"  -> {full_domain} is ⚠️  RESTRICTED/PREMIUM (WHOIS shows available but {dns_info})")
+        status = "RESTRICTED/PREMIUM"
+        final_confidence = "HIGH"
+        
+    else:
+        # Fallback - be conservative
+        print(f"  -> {full_domain} status UNCERTAIN - assuming TAKEN for safety")
+        status = "TAKEN"
+        final_confidence = "LOW"
+    
+    return status, final_confidence
+
 def domain_checker_worker():
     """The function each thread will run - with enhanced multi-layer availability checking."""
     while True:
-        try:
-            name, tld = task_queue.get(timeout=3) # Wait 3s for a task
-        except queue.Empty:
+        task = task_queue.get()
+        if task is None:
+            task_queue.task_done()
             return # No more tasks, thread can exit
+        name, tld = task[0], task[1]
+        attempt = task[2] if len(task) > 2 else 1
 
         full_domain = name.lower() + tld
-        
+        metrics.check_started()
+        try:
+            check_task(name, tld, attempt, full_domain)
+        except Exception as e:
+            # Keep the thread alive; the run must not wait for a task that never finishes
+            print(f"  -> {full_domain} result could not be recorded: {type(e).__name__}")
+        finally:
+            metrics.check_finished()
+            task_queue.task_done()
+
+def check_task(name, tld, attempt, full_domain):
+    """Check one task and record its result (or schedule its retry)."""
+    # The name already has enough AVAILABLE results (--stop-after)
+    skipped = stop_tracker.skip(name, tld) if stop_tracker is not None and attempt == 1 else None
+    if skipped is not None:
+        print(f"Skipping: {full_domain} ({skipped[11]})")
+        record_result(skipped)
+        return
+    
+    if attempt > 1:
+        print(f"Retrying: {full_domain} (attempt {attempt}/{retry_policy.max_attempts})...")
+    else:
         print(f"Checking: {full_domain}...")
+    
+    # Use enhanced checking with multiple verification layers; a check of
+    # the same domain already running elsewhere is shared, not repeated.
+    # A check that raises is treated like a failed lookup (retried, then recorded)
+    try:
+        checked = checks_in_flight.do(lookup_key(full_domain), enhanced_availability_check, full_domain)
+    except Exception as e:
+        print(f"  -> {full_domain} check failed: {type(e).__name__}")
+        checked = FAILED_CHECK
+    whois_available, confidence, dns_active, dns_details, http_active, registrar_status, decision = checked
+    
+    retry = None
+    if retry_scheduler is not None:
+        retry = retry_policy.retry_delay(tld, confidence, registrar_status, attempt)
+    if retry is not None:
+        # Try again later; scheduled before task_done so run_checks keeps waiting for it
+        reason, delay = retry
+        print(f"  -> {full_domain} {reason.upper()} lookup failed - retrying in {delay:.0f}s")
+        metrics.task_queued()
+        retry_scheduler.schedule((name, tld, attempt + 1), delay)
+    else:
+        status, final_confidence = determine_final_status(
+            full_domain, whois_available, confidence, dns_active, dns_details, http_active, registrar_status, decision
+        )
+        
+        record_result((name, tld, whois_available, confidence, dns_active, dns_details, http_active, status, final_confidence, registrar_status, attempt,
+                       decision_note(decision)))
+
+def record_result(result):
+    """Collect a finished check: hand it to the CSV stage, checkpoint it and store it in the cache."""
+    results_queue.put(result)
+    if checkpoint is not None:
+        checkpoint.append(result)
+    cache_result(result)
+
+def cache_result(result):
+    """Store a finished check in the result cache (if one is open)."""
+    # Only results of an actual lookup (not rejected or skipped ones, attempts 0)
+    if result_cache is not None and (result[10] if len(result) > 10 else 1) > 0:
+        name, tld = result[0], result[1]
+        try:
+            result_cache.put(name.lower() + tld, result)
+        except sqlite3.Error as e:
+            print(f"    ⚠️  Could not cache result for {name.lower() + tld}: {e}")
+
+def get_zone_index_result(name, tld):
+    """Return a TAKEN result tuple if name+tld is in the zone index, else None."""
+    if zone_index is None or (name.lower() + tld) not in zone_index:
+        return None
+    # Listed in its TLD zone = delegated, i.e. registered
+    return (name, tld, False, 'VERY HIGH', True, {'NS': True}, False, 'TAKEN', 'VERY HIGH', 'NOT_CHECKED', 0)
+
+def get_rejected_result(name, tld):
+    """Return an INVALID/RESERVED result tuple if name can't be registered under tld, else None."""
+    problem = TLD_POLICIES.check_domain(name, tld) if TLD_POLICIES is not None else None
+    if problem is None:
+        return None
+    return rejected_result(name, tld, *problem)
+
+def get_known_result(name, tld):
+    """Result tuple from the zone index or the cache, or None if name+tld needs a check."""
+    return get_zone_index_result(name, tld) or get_cached_result(name, tld)
+
+def get_cached_result(name, tld):
+    """Return a still-valid cached result tuple for name+tld, or None."""
+    if result_cache is None or REFRESH_CACHE:
+        return None
+    try:
+        cached = result_cache.get(name.lower() + tld)
+    except sqlite3.Error:
+        return None
+    if cached is None:
+        return None
+    # Keep the name exactly as it appears in this run's input
+    return (name, tld) + cached[2:]
+
+def iter_pending_tasks(names, writer, completed=None):
+    """
+    Lazily yield the (name, tld) pairs that still need checking.
+    Domains already finished in the resumed checkpoint (completed), found in
+    the zone index or with a fresh cached result go straight to
+    results_queue instead.
+    """
+    completed = completed or {}
+    name_count = 0
+    check_count = 0
+    resumed_count = 0
+    invalid_count = 0
+    zone_count = 0
+    cached_count = 0
+    for name in names:
+        name_count += 1
+        if SHARD is None:
+            tlds = TLDS_TO_CHECK
+            writer.add_name(name)
+        else:
+            # Only the domains that hash to this shard; other shards do the rest
+            tlds = [tld for tld in TLDS_TO_CHECK if shard_of(name.lower() + tld, SHARD[1]) == SHARD[0]]
+            writer.add_name(name, tlds)
+        check_count += len(tlds)
+        # Label and TLD policy checks for all TLDs of the name at once
+        rejected = TLD_POLICIES.check(name) if TLD_POLICIES is not None else {}
+        for tld in tlds:
+            done = completed.get(name.lower() + tld)
+            if done is not None:
+                results_queue.put((name, tld) + done[2:])
+                resumed_count += 1
+                metrics.task_skipped()
+                continue
+            problem = rejected.get(tld)
+            if problem is not None:
+                invalid = rejected_result(name, tld, *problem)
+                results_queue.put(invalid)
+                if checkpoint is not None:
+                    checkpoint.append(invalid)
+                invalid_count += 1
+                metrics.task_skipped()
+                continue
+            listed = get_zone_index_result(name, tld)
+            if listed is not None:
+                results_queue.put(listed)
+                if checkpoint is not None:
+                    checkpoint.append(listed)
+                zone_count += 1
+                metrics.task_skipped()
+                continue
+            cached = get_cached_result(name, tld)
+            if cached is not None:
+                results_queue.put(cached)
+                if checkpoint is not None:
+                    checkpoint.append(cached)
+                cached_count += 1
+                metrics.task_skipped()
+            else:
+                metrics.task_queued()
+                yield name, tld
+    metrics.input_finished()
+    print(f"\n📥 All {name_count} domain names queued ({check_count} domain checks)")
+    if resumed_count:
+        print(f"⏩ Resuming: {resumed_count} domain(s) already checked in the previous run")
+    if invalid_count:
+        print(f"🚫 {invalid_count} domain(s) can't be registered (INVALID/RESERVED, reason in the Note column) - not checked")
+    if zone_count:
+        print(f"📚 {zone_count} domain(s) found in the zone index (TAKEN, no network check needed)")
+    if cached_count:
+        print(f"♻️  {cached_count} domain(s) served from cache (use --refresh to re-check)")
+
+def csv_writer_worker(writer, errors):
+    """Drain results_queue into the CSV files until a None sentinel arrives."""
+    while True:
+        result = results_queue.get()
+        if result is None:
+            break
+        if stop_tracker is not None:
+            stop_tracker.record(result)
+        if errors:
+            continue  # keep draining so the checks are not blocked
+        try:
+            writer.write(result)
+        except Exception as e:
+            errors.append(e)
+    try:
+        writer.close()
+    except Exception as e:
+        errors.append(e)
+
+def preload_stage_modules(api_configured):
+    """
+    Import the check stages' dependencies before the worker threads start:
+    dozens of threads importing them at once would hold up the first checks.
+    Also sizes the probes' shared pools for NUM_WORKERS workers.
+    """
+    import dns_probe
+    dns_probe.set_pool_size(NUM_WORKERS)
+    import http_probe
+    http_probe.set_pool_size(NUM_WORKERS)
+    if HTTP_CHECK_MODE == 'full' or api_configured:
+        import requests
+
+def open_result_cache():
+    """Open the result cache, or return None (and say why) if it can't be used."""
+    try:
+        return ResultCache()
+    except sqlite3.Error as e:
+        print(f"\n⚠️  Result cache unavailable ({e}) - checking everything")
+        return None
+
+def open_zone_index():
+    """Open the zone index if it has been built, else return None."""
+    if not os.path.exists(ZONE_INDEX_PATH):
+        return None
+    try:
+        index = ZoneIndex(ZONE_INDEX_PATH)
+    except (OSError, ValueError) as e:
+        print(f"\n⚠️  Zone index unavailable ({e}) - checking everything live")
+        return None
+    print(f"\n📚 Zone index: {len(index)} registered domains (built {index.age_days():.0f} day(s) ago)")
+    return index
+
+def run_checks(tasks, api_configured):
+    """Check every (name, tld) pair from the tasks iterable with the configured execution mode."""
+    global retry_policy, retry_scheduler
+    
+    retry_policy = RetryPolicy()
+    if EXECUTION_MODE == 'async':
+        from async_engine import run_async_checks
+        from namecheap_api import batcher as namecheap_batcher
         
-        # Use enhanced checking with multiple verification layers
-        whois_available, confidence, dns_active, dns_details, http_active, registrar_status = enhanced_availability_check(full_domain)
+        print(f"\n--- Starting asyncio domain check with {ASYNC_CONCURRENCY} concurrent checks ---")
+        run_async_checks(
+            tasks, record_result, determine_final_status,
+            api_submit=namecheap_batcher.submit if api_configured else None,
+            concurrency=ASYNC_CONCURRENCY,
+            dns_mode=DNS_CHECK_MODE,
+            http_mode=HTTP_CHECK_MODE,
+            pipeline=CHECK_PIPELINE,
+            min_confidence=MIN_CONFIDENCE,
+            retry_policy=retry_policy,
+            skip=stop_tracker.skip if stop_tracker is not None else None
+        )
+    else:
+        print(f"\n--- Starting domain check with up to {NUM_WORKERS} workers (adaptive per server) ---")
         
-        # Advanced decision logic for accurate availability determination
-        # Priority: Namecheap API > Multi-factor analysis > WHOIS
+        preload_stage_modules(api_configured)
         
-        if registrar_status == 'AVAILABLE':
-            # Namecheap API confirms it's available - HIGHEST confidence!
-            print(f"  -> {full_domain} is ✅ CONFIRMED AVAILABLE via Namecheap API (HIGH CONFIDENCE)")
-            status = "AVAILABLE"
-            final_confidence = "VERY HIGH"
-            
-        elif registrar_status == 'PREMIUM':
-            # Domain is available but premium pricing
-            print(f"  -> {full_domain} is 💎 PREMIUM (available but special pricing)")
-            status = "PREMIUM"
-            final_confidence = "HIGH"
-            
-        elif registrar_status == 'TAKEN':
-            # Namecheap says taken - trust it
-            print(f"  -> {full_domain} is ❌ TAKEN (confirmed by Namecheap)")
-            status = "TAKEN"
-            final_confidence = "VERY HIGH"
-            
-        elif not whois_available:
-            # WHOIS shows it's registered - definitely taken
-            print(f"  -> {full_domain} is ❌ TAKEN (registered in WHOIS)")
-            status = "TAKEN"
-            final_confidence = "HIGH"
-            
-        elif whois_available and not dns_active and not http_active:
-            # WHOIS says available, NO DNS, NO HTTP - BEST case for availability!
-            dns_info = "No DNS records"
-            print(f"  -> {full_domain} is ✅ LIKELY AVAILABLE ({confidence} confidence - {dns_info})")
-            status = "AVAILABLE"
-            final_confidence = confidence
-            
-        elif whois_available and dns_active and not http_active:
-            # Has DNS but no HTTP response - might be parked/reserved/premium
-            active_records = [k for k, v in dns_details.items() if v]
-            dns_info = f"Has {', '.join(active_records)} records but no website"
-            
-            # If only NS/SOA (basic DNS), might still be available
-            if set(active_records).issubset({'NS', 'SOA'}):
-                print(f"  -> {full_domain} is ⚠️  POSSIBLY AVAILABLE ({dns_info} - may be parking)")
-                status = "POSSIBLY AVAILABLE"
-                final_confidence = "MEDIUM"
-            else:
-                # Has A, MX, or other records - likely reserved/premium
-                print(f"  -> {full_domain} appears ⚠️  RESTRICTED/PREMIUM ({dns_info})")
-                status = "RESTRICTED/PREMIUM"
-                final_confidence = "MEDIUM"
-                
-        elif whois_available and http_active:
-            # Responds to HTTP but WHOIS says available - likely reserved/premium
-            active_records = [k for k, v in dns_details.items() if v]
-            dns_info = f"Active website with {', '.join(active_records)} records"
-            print(f"  -> {full_domain} is ⚠️  RESTRICTED/PREMIUM (WHOIS shows available but {dns_info})")
-            status = "RESTRICTED/PREMIUM"
-            final_confidence = "HIGH"
-            
-        else:
-            # Fallback - be conservative
-            print(f"  -> {full_domain} status UNCERTAIN - assuming TAKEN for safety")
-            status = "TAKEN"
-            final_confidence = "LOW"
+        # 1. Start all the worker threads
+        threads = []
+        for _ in range(NUM_WORKERS):
+            t = threading.Thread(target=domain_checker_worker)
+            t.daemon = True # Allows program to exit even if threads are running
+            t.start()
+            threads.append(t)
+
+        # Failed checks come back into the task queue when their retry is due
+        retry_scheduler = RetryScheduler(task_queue.put)
+        metrics.gauge('retries_pending', retry_scheduler.pending_count)
+        
+        # 2. Feed the task queue as names are read (blocks while the queue is full)
+        for task in tasks:
+            task_queue.put(task)
+        
+        # 3. Wait until the queue is drained and no retry is outstanding
+        task_queue.join()
+        while retry_scheduler.pending_count():
+            retry_scheduler.wait_dispatched()
+            task_queue.join()
         
-        results_queue.put((name, tld, whois_available, confidence, dns_active, dns_details, http_active, status, final_confidence, registrar_status))
-        task_queue.task_done()
+        # 4. Tell the workers to stop, then wait
+        for _ in range(NUM_WORKERS):
+            task_queue.put(None)
+        task_queue.join()
 
-def main():
-    """Main function to run the threaded domain check."""
+def main(refresh=False, use_cache=True, resume=False, shard=None, use_zone_index=True, binary=None,
+         names_folder=DOMAIN_NAME_FOLDER, tlds_folder=TLD_FOLDER,
+         patterns_folder=DEFAULT_PATTERNS_FOLDER, wordlists_folder=DEFAULT_WORDLISTS_FOLDER):
+    """
+    Main function to run the threaded domain check.
+    Names are streamed from the .txt files in names_folder, followed by the
+    names generated from the patterns in patterns_folder (see
+    name_generator.py); the TLDs are read from tlds_folder.
+    With shard=(i, N) only that shard is checked and written to its own
+    folder under output/shards/ (combine the shards with merge()).
+    binary=True also writes the compact binary results file (defaults to
+    BINARY_OUTPUT).
+    """
+    global result_cache, checkpoint, REFRESH_CACHE, SHARD, zone_index, TLDS_TO_CHECK, TLD_POLICIES, stop_tracker
+    
+    SHARD = shard
+    output_dir = shard_dir(*shard) if shard else "output"
     
     print("=== DOMAIN CHECKER - ENHANCED ===")
+    if shard:
+        print(f"🧩 Shard {shard[0]}/{shard[1]} (output: {output_dir}/)")
     print("Reading configuration files...")
     
-    # Check if domain names and TLDs were loaded successfully
-    if not NAMES:
+    # Domain names are streamed from the input folder; make sure there is at least one
+    tld_options = {}
+    TLDS_TO_CHECK = load_tlds_from_folder(tlds_folder, tld_options)
+    TLD_POLICIES = PolicyTable(TLDS_TO_CHECK, tld_options)
+    generated = None
+    if has_patterns(patterns_folder):
+        generated = iter_generated_names(patterns_folder, wordlists_folder)
+    names = iter_domain_names(names_folder, generated)
+    first_name = next(names, None)
+    if first_name is None:
         print("\n❌ No domain names loaded.")
-        print("Please add .txt files with domain names to: input/domain_name/")
+        print(f"Please add .txt files with domain names to: {names_folder}/")
+        print(f"   (or name patterns to: {patterns_folder}/)")
         return
     
     if not TLDS_TO_CHECK:
         print("\n❌ No TLDs loaded.")
-        print("Please add .txt files with TLDs to: input/top_level_domain/")
+        print(f"Please add .txt files with TLDs to: {tlds_folder}/")
         return
     
     # Check Namecheap API configuration
-    api_key = os.getenv('NAMECHEAP_API_KEY')
-    api_configured = all([
-        api_key,
-        os.getenv('NAMECHEAP_API_USER'),
-        os.getenv('NAMECHEAP_USERNAME'),
-        os.getenv('NAMECHEAP_CLIENT_IP')
-    ]) and api_key != 'your_api_key_here'
+    api_configured = is_api_configured()
     
     print(f"\n✅ Configuration loaded successfully!")
-    print(f"📝 Domain names: {len(NAMES)}")
+    print(f"📝 Domain names: streamed from {names_folder}/ (checking starts right away)")
+    if generated is not None:
+        print(f"🧬 Generated names: from the patterns in {patterns_folder}/")
     print(f"🌐 TLDs to check: {len(TLDS_TO_CHECK)} ({', '.join(TLDS_TO_CHECK)})")
-    print(f"🔍 Total domain checks: {len(NAMES) * len(TLDS_TO_CHECK)}")
+    print(f"🔍 Domain checks per name: {len(TLDS_TO_CHECK)}")
     
-    print(f"\n🔬 Verification Methods:")
+    print(f"\n🔬 Verification Methods (in order: {' → '.join(CHECK_PIPELINE)}, stop early at {MIN_CONFIDENCE} confidence):")
     print(f"   ✓ Advanced WHOIS lookup (multiple indicators)")
-    print(f"   ✓ Comprehensive DNS verification (A, AAAA, MX, NS, CNAME, SOA)")
-    print(f"   ✓ HTTP/HTTPS response checking")
+    if DNS_CHECK_MODE == 'fast':
+        print(f"   ✓ Fast DNS existence check (NS, SOA)")
+    else:
+        print(f"   ✓ Comprehensive DNS verification (A, AAAA, MX, NS, CNAME, SOA)")
+    if HTTP_CHECK_MODE == 'fast':
+        print(f"   ✓ Fast HTTP/HTTPS liveness check (TCP connect to 443/80)")
+    else:
+        print(f"   ✓ HTTP/HTTPS response checking")
     
     # Show API status
     if api_configured:
@@ -496,190 +783,349 @@ def main():
         print(f"   Note: Results are still very accurate!")
         print(f"   To enable API: Edit .env file or run `python test_api.py`")
     
-    print(f"\n--- Starting domain check with {NUM_WORKERS} workers ---")
-    
-    # 1. Start all the worker threads
-    threads = []
-    for _ in range(NUM_WORKERS):
-        t = threading.Thread(target=domain_checker_worker)
-        t.daemon = True # Allows program to exit even if threads are running
-        t.start()
-        threads.append(t)
-
-    # 2. Load the task queue with all domains to check
-    print("Loading task queue...")
-    total_checks = 0
-    for name in NAMES:
-        for tld in TLDS_TO_CHECK:
-            task_queue.put((name, tld))
-            total_checks += 1
-    
-    print(f"Queue loaded with {total_checks} domains. Waiting for completion...")
-    
-    # 3. Wait for all tasks in the queue to be processed
-    task_queue.join()
-    print("All domains checked. Processing results...")
-
-    # 4. Process all results from the results_queue
-    # We use a dict to store detailed availability status for each domain+TLD combination
-    domain_availability = {}
-    
-    while not results_queue.empty():
-        name, tld, whois_available, whois_confidence, dns_active, dns_details, http_active, status, final_confidence, registrar_status = results_queue.get()
-        if name not in domain_availability:
-            domain_availability[name] = {}
-        domain_availability[name][tld] = {
-            'whois_available': whois_available,
-            'whois_confidence': whois_confidence,
-            'dns_active': dns_active,
-            'dns_details': dns_details,
-            'http_active': http_active,
-            'status': status,
-            'confidence': final_confidence,
-            'registrar_status': registrar_status
-        }
-
-    # 5. Create output directory if it doesn't exist
-    output_dir = "output"
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # 6. Write the final results to a CSV file in the output directory (table format)
-    csv_filename = os.path.join(output_dir, "domain_results.csv")
-    csv_detailed = os.path.join(output_dir, "domain_results_detailed.csv")
+    # Open the result cache so repeat runs can skip recently checked domains
+    REFRESH_CACHE = refresh
+    if use_cache:
+        result_cache = open_result_cache()
+    
+    # Domains in the zone index are reported as TAKEN without a network check
+    if use_zone_index:
+        zone_index = open_zone_index()
     
+    # Output files are written while the checks are running (see csv_output.py)
     try:
-        # Write simplified results (original format with enhanced status)
-        with open(csv_filename, "w", newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            
-            # Write the header row - Domain Name + each TLD as separate columns
-            header = ["Domain Name"] + TLDS_TO_CHECK
-            writer.writerow(header)
-            
-            # Write data for each name, maintaining original order
-            for name in NAMES:
-                row = [name]
-                for tld in TLDS_TO_CHECK:
-                    # Check if this domain+TLD combination is available
-                    domain_info = domain_availability.get(name, {}).get(tld, {})
-                    status = domain_info.get('status', 'ERROR')
-                    row.append(status)
-                writer.writerow(row)
-        
-        # Write detailed results with all information
-        with open(csv_detailed, "w", newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            
-            # Write header with comprehensive information
-            header = [
-                "Domain Name", "TLD", "Full Domain", "Status", "Confidence Level",
-                "WHOIS Available", "DNS Active", "DNS Records", "HTTP Active",
-                "Namecheap API Status", "Recommended Action"
-            ]
-            writer.writerow(header)
-            
-            # Write detailed data
-            for name in NAMES:
-                for tld in TLDS_TO_CHECK:
-                    domain_info = domain_availability.get(name, {}).get(tld, {})
-                    full_domain = name.lower() + tld
-                    status = domain_info.get('status', 'ERROR')
-                    confidence = domain_info.get('confidence', 'UNKNOWN')
-                    whois_avail = 'Yes' if domain_info.get('whois_available', False) else 'No'
-                    dns_active = 'Yes' if domain_info.get('dns_active', False) else 'No'
-                    
-                    # Format DNS records
-                    dns_details = domain_info.get('dns_details', {})
-                    active_dns = [k for k, v in dns_details.items() if v] if dns_details else []
-                    dns_records = ', '.join(active_dns) if active_dns else 'None'
-                    
-                    http_active = 'Yes' if domain_info.get('http_active', False) else 'No'
-                    registrar_status = domain_info.get('registrar_status', 'UNKNOWN')
-                    
-                    # Recommended action based on status and confidence
-                    if status == 'AVAILABLE' and confidence in ['HIGH', 'VERY HIGH']:
-                        action = '✓ Safe to purchase'
-                    elif status == 'AVAILABLE':
-                        action = '⚠ Check manually before purchase'
-                    elif status == 'POSSIBLY AVAILABLE':
-                        action = '⚠ Verify on registrar website'
-                    elif status == 'PREMIUM':
-                        action = '💎 Premium pricing - check cost'
-                    else:
-                        action = '✗ Not available'
-                    
-                    row = [name, tld, full_domain, status, confidence, whois_avail, dns_active, 
-                           dns_records, http_active, registrar_status, action]
-                    writer.writerow(row)
-        
-        # Create a summary file with only truly available domains
-        csv_available = os.path.join(output_dir, "available_domains.csv")
-        with open(csv_available, "w", newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            header = ["Full Domain", "Domain Name", "TLD", "Confidence Level", "Verification Method"]
-            writer.writerow(header)
-            
-            available_count = 0
-            possibly_available_count = 0
-            for name in NAMES:
-                for tld in TLDS_TO_CHECK:
-                    domain_info = domain_availability.get(name, {}).get(tld, {})
-                    status = domain_info.get('status', '')
-                    confidence = domain_info.get('confidence', 'UNKNOWN')
-                    registrar_status = domain_info.get('registrar_status', 'UNKNOWN')
-                    
-                    # Include AVAILABLE and POSSIBLY AVAILABLE domains
-                    if status in ['AVAILABLE', 'POSSIBLY AVAILABLE']:
-                        full_domain = name.lower() + tld
-                        
-                        # Determine verification method
-                        if registrar_status == 'AVAILABLE':
-                            verification = 'Namecheap API'
-                        else:
-                            verification = 'WHOIS + DNS + HTTP'
-                        
-                        writer.writerow([full_domain, name, tld, confidence, verification])
-                        
-                        if status == 'AVAILABLE':
-                            available_count += 1
-                        else:
-                            possibly_available_count += 1
-                
-        print(f"\n--- SUCCESS ---")
-        print(f"✓ Summary results saved to: {csv_filename}")
-        print(f"✓ Detailed results saved to: {csv_detailed}")
-        print(f"✓ Available domains list saved to: {csv_available}")
-        print(f"\n📊 Summary:")
-        print(f"   Total domains checked: {len(NAMES) * len(TLDS_TO_CHECK)}")
-        print(f"   Likely available domains: {available_count}")
-        if possibly_available_count > 0:
-            print(f"   Possibly available domains: {possibly_available_count} (verify manually)")
-        
-        if available_count > 0:
-            print(f"\n🎉 Found {available_count} domain(s) that appear to be available for purchase!")
-            print(f"   Check {csv_available} for the complete list.")
-            print(f"\n💡 Recommendation:")
-            print(f"   - HIGH/VERY HIGH confidence = Safe to proceed")
-            print(f"   - MEDIUM confidence = Verify on registrar website first")
-        
-        if possibly_available_count > 0:
-            print(f"\n⚠️  {possibly_available_count} domain(s) are POSSIBLY available but need manual verification")
-        
-        # Show verification method used
-        if api_configured:
-            print(f"\n✓ Verification: Namecheap API + WHOIS + DNS + HTTP (Highest Accuracy)")
-        else:
-            print(f"\n✓ Verification: Advanced WHOIS + Comprehensive DNS + HTTP (High Accuracy)")
-            print(f"   Note: Results are accurate even without API!")
-        
+        writer = StreamingCSVWriter(output_dir, TLDS_TO_CHECK, binary=BINARY_OUTPUT if binary is None else binary)
     except IOError as e:
         print(f"\n--- ERROR ---")
         print(f"Could not write to file: {e}")
-    except Exception as e:
-        print(f"\n--- UNEXPECTED ERROR ---")
-        print(f"An error occurred: {e}")
+        return
+    writer_errors = []
+    writer_thread = threading.Thread(target=csv_writer_worker, args=(writer, writer_errors))
+    writer_thread.start()
+    
+    # Every finished check is checkpointed so an interrupted run can --resume
+    checkpoint = Checkpoint(os.path.join(output_dir, 'checkpoint.jsonl'))
+    completed = checkpoint.open(resume=resume)
+    
+    tasks = iter_pending_tasks(itertools.chain([first_name], names), writer, completed)
+    
+    # Likely-available domains and high-priority TLDs first (see priority.py)
+    model = AvailabilityModel.from_cache(result_cache)
+    tld_priorities = {tld: options['priority'] for tld, options in tld_options.items() if 'priority' in options}
+    tasks = prioritize(tasks, task_key(model, tld_priorities))
+    if model.total or tld_priorities:
+        print(f"\n🎯 Priority order: TLD priorities, then availability history of {model.total} cached result(s)")
+    stop_tracker = StopTracker(STOP_AFTER) if STOP_AFTER > 0 else None
+    if stop_tracker is not None:
+        print(f"\n⏭  Stopping after {STOP_AFTER} available domain(s) per name")
+    
+    # Per-stage timings, queue gauges and a periodic progress line (see metrics.py)
+    metrics.reset()
+    metrics.gauge('task_queue_depth', task_queue.qsize)
+    metrics.gauge('results_queue_depth', results_queue.qsize)
+    metrics.gauge('checks_coalesced', lambda: checks_in_flight.shared)
+    if METRICS_PORT:
+        try:
+            serve_metrics(METRICS_PORT)
+            print(f"\n📡 Metrics: http://127.0.0.1:{METRICS_PORT}/metrics")
+        except OSError as e:
+            print(f"\n⚠️  Could not start the metrics endpoint on port {METRICS_PORT}: {e}")
+    progress = ProgressReporter(PROGRESS_EVERY).start()
+    
+    try:
+        run_checks(tasks, api_configured)
+    except KeyboardInterrupt:
+        progress.stop()
+        checkpoint.close()
+        results_queue.put(None)
+        writer_thread.join()
+        print(f"\n\n⏸  Interrupted. Finished checks are saved in {checkpoint.path}")
+        shard_flag = f" --shard {shard[0]}/{shard[1]}" if shard else ""
+        print(f"   Run `python main.py --resume{shard_flag}` to continue where you left off.")
+        return
+    progress.stop()
+    checkpoint.close()
+    print("All domains checked. Finishing output files...")
+    
+    # Let the CSV writer drain the remaining results and close the files
+    results_queue.put(None)
+    writer_thread.join()
+    
+    if writer_errors:
+        e = writer_errors[0]
+        if isinstance(e, IOError):
+            print(f"\n--- ERROR ---")
+            print(f"Could not write to file: {e}")
+        else:
+            print(f"\n--- UNEXPECTED ERROR ---")
+            print(f"An error occurred: {e}")
+        return
+    
+    print(f"\n--- SUCCESS ---")
+    print(f"✓ Summary results saved to: {writer.summary_path}")
+    print(f"✓ Detailed results saved to: {writer.detailed_path}")
+    print(f"✓ Available domains list saved to: {writer.available_path}")
+    if writer.binary_path:
+        print(f"✓ Binary results saved to: {writer.binary_path}")
+    print_stage_timings(os.path.join(output_dir, 'metrics.json'))
+    print(f"\n📊 Summary:")
+    print(f"   Total domains checked: {writer.total_count}")
+    print(f"   Likely available domains: {writer.available_count}")
+    if writer.possibly_available_count > 0:
+        print(f"   Possibly available domains: {writer.possibly_available_count} (verify manually)")
+    if stop_tracker is not None and stop_tracker.skipped:
+        print(f"   Skipped domains: {stop_tracker.skipped} (name had {STOP_AFTER} available already)")
+    
+    if writer.available_count > 0:
+        print(f"\n🎉 Found {writer.available_count} domain(s) that appear to be available for purchase!")
+        print(f"   Check {writer.available_path} for the complete list.")
+        print(f"\n💡 Recommendation:")
+        print(f"   - HIGH/VERY HIGH confidence = Safe to proceed")
+        print(f"   - MEDIUM confidence = Verify on registrar website first")
+    
+    if writer.possibly_available_count > 0:
+        print(f"\n⚠️  {writer.possibly_available_count} domain(s) are POSSIBLY available but need manual verification")
+    
+    # Show verification method used
+    if api_configured:
+        print(f"\n✓ Verification: Namecheap API + WHOIS + DNS + HTTP (Highest Accuracy)")
+    else:
+        print(f"\n✓ Verification: Advanced WHOIS + Comprehensive DNS + HTTP (High Accuracy)")
+        print(f"   Note: Results are accurate even without API!")
+
+def print_stage_timings(report_path):
+    """Write the metrics report and print the per-stage latencies."""
+    try:
+        metrics.write_report(report_path)
+        print(f"✓ Timing report saved to: {report_path}")
+    except IOError as e:
+        print(f"⚠️  Could not write the timing report: {e}")
+    
+    totals = metrics.stage_totals()
+    if totals:
+        print(f"\n⏱  Check timings:")
+        for stage, histogram in sorted(totals.items(), key=lambda item: -item[1].sum):
+            print(f"   {stage:<6} {histogram.count} calls, p50 {histogram.percentile(0.5):.2f}s, "
+                  f"p99 {histogram.percentile(0.99):.2f}s, total {histogram.sum:.1f}s")
+
+def import_zone_files(paths):
+    """Build the zone index from zone files / registered-domain lists."""
+    print(f"=== IMPORTING ZONE FILES INTO {ZONE_INDEX_PATH} ===")
+    try:
+        count = build_index(paths, ZONE_INDEX_PATH)
+    except OSError as e:
+        print(f"\n❌ Could not build the zone index: {e}")
+        return False
+    print(f"\n✓ Zone index built: {count} registered domains")
+    print("   Domains in it are now reported as TAKEN without a network check.")
+    print("   Re-import regularly - names dropped since the import would still show as TAKEN.")
+    return True
+
+def serve(port, use_cache=True, use_zone_index=True, tlds_folder=TLD_FOLDER):
+    """
+    Run the long-running check service (see service.py) until Ctrl-C.
+    Jobs may use any TLD; the policy options in tlds_folder apply to theirs.
+    """
+    global result_cache, zone_index, TLD_POLICIES
+    from service import CheckService, serve_api
+    
+    print("=== DOMAIN CHECKER - SERVICE ===")
+    api_configured = is_api_configured()
+    tld_options = {}
+    tlds = load_tlds_from_folder(tlds_folder, tld_options) if os.path.exists(tlds_folder) else []
+    TLD_POLICIES = PolicyTable(tlds, tld_options)
+    if use_cache:
+        result_cache = open_result_cache()
+    if use_zone_index:
+        zone_index = open_zone_index()
+    
+    # Warm up once; the workers, sessions and caches then live as long as the service
+    preload_stage_modules(api_configured)
+    metrics.reset()
+    metrics.gauge('checks_coalesced', lambda: checks_in_flight.shared)
+    service = CheckService(enhanced_availability_check, determine_final_status,
+                           validate=get_rejected_result, lookup=get_known_result, store=cache_result,
+                           workers=NUM_WORKERS, retry_policy=RetryPolicy()).start()
+    try:
+        server = serve_api(service, port)
+    except OSError as e:
+        print(f"\n❌ Could not listen on port {port}: {e}")
+        return False
+    
+    print(f"\n📡 Listening on http://127.0.0.1:{port}/ ({NUM_WORKERS} workers, "
+          f"Namecheap API {'enabled' if api_configured else 'not configured'})")
+    print(f"   curl 'http://127.0.0.1:{port}/check?domain=example.com'")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n\n⏹  Service stopped.")
+    finally:
+        server.server_close()
+    return True
+
+def merge(shard_count, output_dir="output"):
+    """Combine the output of shards 1..shard_count into the standard output files."""
+    try:
+        shard_dirs = find_shard_dirs(shard_count)
+        counts = merge_shards(shard_dirs, output_dir)
+    except (OSError, ValueError) as e:
+        print(f"\n❌ Could not merge shards: {e}")
+        return False
+    
+    print(f"\n--- MERGED {shard_count} SHARD(S) ---")
+    print(f"✓ Results saved to: {output_dir}/")
+    print(f"\n📊 Summary:")
+    print(f"   Total domains checked: {counts['total']}")
+    print(f"   Likely available domains: {counts['available']}")
+    if counts['possibly_available'] > 0:
+        print(f"   Possibly available domains: {counts['possibly_available']} (verify manually)")
+    return True
+
+def run_local_shards(process_count, extra_args=()):
+    """
+    Run the check as process_count local processes (one per shard), then
+    merge their output. The processes share this machine's per-server rate
+    limits and concurrency ceilings: each of them gets 1/process_count of
+    them, so the upstreams see the configured load, not process_count times
+    it. This spreads the CPU work of a run, not its allowance per server.
+    Returns True if every shard finished and the output was merged.
+    """
+    print(f"=== DOMAIN CHECKER - {process_count} PROCESSES ===")
+    env = dict(os.environ, DOMAIN_CHECKER_LOCAL_PROCESSES=str(process_count))
+    processes = []
+    for index in range(1, process_count + 1):
+        command = [sys.executable, os.path.abspath(__file__), '--shard', f"{index}/{process_count}"] + list(extra_args)
+        processes.append(subprocess.Popen(command, env=env))
+    
+    failed = []
+    try:
+        for index, process in enumerate(processes, 1):
+            if process.wait() != 0:
+                failed.append(index)
+    except KeyboardInterrupt:
+        for process in processes:
+            process.wait()
+        print(f"\n\n⏸  Interrupted. Run `python main.py --processes {process_count} --resume` to continue.")
+        return False
+    
+    if failed:
+        print(f"\n❌ Shard(s) {', '.join(map(str, failed))} failed - fix the problem and re-run with --resume")
+        return False
+    return merge(process_count)
+
+def _without_option(argv, option):
+    """argv without `option VALUE` / `option=VALUE`."""
+    result = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == option:
+            skip = True
+        elif not arg.startswith(option + '='):
+            result.append(arg)
+    return result
+
+def cli(argv=None):
+    """Command line entry point. Returns the process exit code."""
+    argv = sys.argv[1:] if argv is None else list(argv)
+    
+    # Load environment variables from .env file, then the command line overrides them
+    load_dotenv()
+    try:
+        load_settings()
+        config_error = None
+    except ValueError as e:
+        # Reported after parsing the command line, so --help still works
+        config_error = e
+        load_settings(strict=False)
+    
+    global NUM_WORKERS, ASYNC_CONCURRENCY, EXECUTION_MODE, DNS_CHECK_MODE, HTTP_CHECK_MODE
+    global CHECK_PIPELINE, MIN_CONFIDENCE, STOP_AFTER
+    
+    parser = argparse.ArgumentParser(description="Check domain name availability.")
+    parser.add_argument('--names', metavar='DIR', default=DOMAIN_NAME_FOLDER,
+                        help=f"folder with the domain name .txt files (default: {DOMAIN_NAME_FOLDER})")
+    parser.add_argument('--tlds', metavar='DIR', default=TLD_FOLDER,
+                        help=f"folder with the TLD .txt files (default: {TLD_FOLDER})")
+    parser.add_argument('--patterns', metavar='DIR', default=DEFAULT_PATTERNS_FOLDER,
+                        help=f"folder with name pattern .txt files (default: {DEFAULT_PATTERNS_FOLDER})")
+    parser.add_argument('--wordlists', metavar='DIR', default=DEFAULT_WORDLISTS_FOLDER,
+                        help=f"folder with the word lists the patterns use (default: {DEFAULT_WORDLISTS_FOLDER})")
+    parser.add_argument('--mode', choices=EXECUTION_MODES, default=EXECUTION_MODE,
+                        help=f"execution engine (default: {EXECUTION_MODE})")
+    parser.add_argument('--workers', type=int, metavar='N', default=NUM_WORKERS,
+                        help=f"maximum parallel checks in threaded mode (default: {NUM_WORKERS})")
+    parser.add_argument('--concurrency', type=int, metavar='N', default=ASYNC_CONCURRENCY,
+                        help=f"checks in flight in async mode (default: {ASYNC_CONCURRENCY})")
+    parser.add_argument('--dns-mode', choices=DNS_CHECK_MODES, default=DNS_CHECK_MODE,
+                        help=f"DNS check mode (default: {DNS_CHECK_MODE})")
+    parser.add_argument('--http-mode', choices=HTTP_PROBE_MODES, default=HTTP_CHECK_MODE,
+                        help=f"HTTP check mode (default: {HTTP_CHECK_MODE})")
+    parser.add_argument('--pipeline', metavar='STAGES',
+                        help="order of the check stages, e.g. dns,whois,api,http or 'legacy'")
+    parser.add_argument('--min-confidence', metavar='LEVEL',
+                        help=f"stop checking a domain at this confidence (default: {MIN_CONFIDENCE})")
+    parser.add_argument('--stop-after', type=int, metavar='K', default=STOP_AFTER,
+                        help="skip the remaining TLDs of a name once K of them are AVAILABLE (default: check all)")
+    parser.add_argument('--refresh', action='store_true',
+                        help="ignore cached results and re-check every domain")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="do not read or write the result cache")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted run from output/checkpoint.jsonl")
+    parser.add_argument('--no-zone-index', action='store_true',
+                        help="check every domain live, even if it is in the zone index")
+    parser.add_argument('--import-zone', nargs='+', metavar='PATH',
+                        help="build the zone index from zone files / domain lists (files or folders, .gz ok)")
+    parser.add_argument('--shard', metavar='I/N',
+                        help="only check shard I of N (e.g. 1/4) and write it to output/shards/")
+    parser.add_argument('--processes', type=int, metavar='N',
+                        help="run N local shard processes and merge their output")
+    parser.add_argument('--merge', type=int, metavar='N',
+                        help="combine the output of shards 1..N into output/")
+    parser.add_argument('--binary', action='store_true',
+                        help="also write output/domain_results.dcr (compact binary results, see binary_results.py)")
+    parser.add_argument('--serve', type=int, nargs='?', const=SERVICE_PORT, metavar='PORT',
+                        help=f"run as a service that takes check jobs over a local HTTP API (default port: {SERVICE_PORT})")
+    args = parser.parse_args(argv)
+    if config_error is not None:
+        print(f"❌ Invalid configuration: {config_error}")
+        return 2
+    
+    try:
+        if args.pipeline is not None:
+            CHECK_PIPELINE = parse_pipeline(args.pipeline)
+        if args.min_confidence is not None:
+            MIN_CONFIDENCE = parse_min_confidence(args.min_confidence)
+        shard = parse_shard(args.shard) if args.shard else None
+    except ValueError as e:
+        parser.error(str(e))
+    NUM_WORKERS = max(1, args.workers)
+    ASYNC_CONCURRENCY = max(1, args.concurrency)
+    EXECUTION_MODE = args.mode
+    DNS_CHECK_MODE = args.dns_mode
+    HTTP_CHECK_MODE = args.http_mode
+    STOP_AFTER = max(0, args.stop_after)
+    
+    if args.import_zone:
+        return 0 if import_zone_files(args.import_zone) else 1
+    if args.serve:
+        return 0 if serve(args.serve, use_cache=not args.no_cache, use_zone_index=not args.no_zone_index,
+                          tlds_folder=args.tlds) else 1
+    if args.merge:
+        return 0 if merge(args.merge) else 1
+    if args.processes and args.processes > 1:
+        if args.shard:
+            parser.error("--shard and --processes can't be combined")
+        # Every shard process gets the same options
+        return 0 if run_local_shards(args.processes, _without_option(argv, '--processes')) else 1
+    main(refresh=args.refresh, use_cache=not args.no_cache, resume=args.resume, shard=shard,
+         use_zone_index=not args.no_zone_index, binary=args.binary or None,
+         names_folder=args.names, tlds_folder=args.tlds,
+         patterns_folder=args.patterns, wordlists_folder=args.wordlists)
+    return 0
 
 # --- Main execution ---
 if __name__ == "__main__":
-    main()
-
+    sys.exit(cli())
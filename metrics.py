@@ -0,0 +1,321 @@
+"""
+Run instrumentation: per-stage latency, throughput and queue gauges.
+
+Every check stage (whois, dns, http, api) is timed, per TLD, into
+histograms with fixed buckets. Together with the queue-depth and
+in-flight gauges this shows where a run spends its time:
+
+- a progress line every PROGRESS_INTERVAL seconds with domains/sec and
+  the ETA (known once the whole input has been read)
+- output/metrics.json at the end of the run (JSON report)
+- a Prometheus text endpoint at http://127.0.0.1:PORT/metrics (and the
+  JSON report at /metrics.json) while the run is going, if
+  DOMAIN_CHECKER_METRICS_PORT is set
+"""
+import asyncio
+import functools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROGRESS_INTERVAL = 10.0
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float('inf'))
+
+
+def tld_of(domain):
+    """'.com' for 'example.com', '.co.uk' for 'example.co.uk'."""
+    parts = domain.split('.', 1)
+    return '.' + parts[1] if len(parts) > 1 else ''
+
+
+class Histogram:
+    """Fixed-bucket latency histogram."""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q):
+        """Estimate the q-th quantile, interpolating linearly inside its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(BUCKETS, self.counts):
+            if count and seen + count >= rank:
+                upper = min(bound, self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p99': self.percentile(0.99),
+            'max': round(self.max, 6),
+            'buckets': {('+Inf' if bound == float('inf') else str(bound)): count
+                        for bound, count in zip(BUCKETS, self.counts)},
+        }
+
+
+class Metrics:
+    """Thread-safe collector shared by the engines and main()."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.monotonic()
+            self.histograms = {}     # (stage, tld) -> Histogram
+            self.gauges = {}         # name -> callable returning a number
+            self.in_flight = 0
+            self.queued = 0          # live checks handed to the engine
+            self.completed = 0       # live checks finished
+            self.skipped = 0         # answered from checkpoint/cache/zone index
+            self.input_done = False
+
+    # --- recording ---
+
+    def observe(self, stage, domain, seconds):
+        key = (stage, tld_of(domain))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def gauge(self, name, read):
+        """Register a gauge; read() is called whenever a report is made."""
+        with self.lock:
+            self.gauges[name] = read
+
+    def task_queued(self):
+        with self.lock:
+            self.queued += 1
+
+    def task_skipped(self):
+        with self.lock:
+            self.skipped += 1
+
+    def input_finished(self):
+        with self.lock:
+            self.input_done = True
+
+    def check_started(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def check_finished(self):
+        with self.lock:
+            self.in_flight -= 1
+            self.completed += 1
+
+    # --- reporting ---
+
+    def stage_totals(self):
+        """Returns dict: stage -> Histogram over all TLDs."""
+        totals = {}
+        with self.lock:
+            for (stage, _), histogram in self.histograms.items():
+                totals.setdefault(stage, Histogram()).merge(histogram)
+        return totals
+
+    def _gauge_values(self):
+        values = {'in_flight': self.in_flight}
+        for name, read in self.gauges.items():
+            try:
+                values[name] = read()
+            except Exception:
+                pass
+        return values
+
+    def snapshot(self):
+        """Machine-readable report of the run so far."""
+        elapsed = time.monotonic() - self.started
+        totals = self.stage_totals()
+        with self.lock:
+            rate = self.completed / elapsed if elapsed > 0 else 0.0
+            remaining = self.queued - self.completed
+            eta = remaining / rate if self.input_done and rate > 0 else None
+            return {
+                'elapsed_seconds': round(elapsed, 3),
+                'checks_completed': self.completed,
+                'checks_queued': self.queued,
+                'checks_skipped': self.skipped,
+                'input_finished': self.input_done,
+                'domains_per_second': round(rate, 3),
+                'eta_seconds': round(eta, 1) if eta is not None else None,
+                'gauges': self._gauge_values(),
+                'stages': {stage: h.to_dict() for stage, h in sorted(totals.items())},
+                'stages_by_tld': {
+                    f"{stage} {tld}": h.to_dict() for (stage, tld), h in sorted(self.histograms.items())
+                },
+            }
+
+    def prometheus(self):
+        """The report in Prometheus text exposition format."""
+        report = self.snapshot()
+        lines = [
+            '# TYPE domain_checker_checks_completed_total counter',
+            f"domain_checker_checks_completed_total {report['checks_completed']}",
+            '# TYPE domain_checker_checks_queued_total counter',
+            f"domain_checker_checks_queued_total {report['checks_queued']}",
+            '# TYPE domain_checker_checks_skipped_total counter',
+            f"domain_checker_checks_skipped_total {report['checks_skipped']}",
+            '# TYPE domain_checker_domains_per_second gauge',
+            f"domain_checker_domains_per_second {report['domains_per_second']}",
+        ]
+        for name, value in sorted(report['gauges'].items()):
+            lines.append(f"# TYPE domain_checker_{name} gauge")
+            lines.append(f"domain_checker_{name} {value}")
+
+        lines.append('# TYPE domain_checker_stage_seconds histogram')
+        with self.lock:
+            items = sorted(self.histograms.items())
+        for (stage, tld), histogram in items:
+            labels = f'stage="{stage}",tld="{tld}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else str(bound)
+                lines.append(f'domain_checker_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'domain_checker_stage_seconds_sum{{{labels}}} {histogram.sum:.6f}')
+            lines.append(f'domain_checker_stage_seconds_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def progress_line(self):
+        report = self.snapshot()
+        gauges = report['gauges']
+        done = report['checks_completed']
+        total = f"/{report['checks_queued']}" if report['input_finished'] else ''
+        if report['eta_seconds'] is not None:
+            eta = format_duration(report['eta_seconds'])
+        else:
+            eta = 'reading input'
+        line = (f"📈 {done}{total} checked | {report['domains_per_second']:.1f} domains/s | ETA {eta}"
+                f" | in flight {gauges.get('in_flight', 0)}")
+        if 'task_queue_depth' in gauges:
+            line += f" | queued {gauges['task_queue_depth']}"
+        stages = [f"{stage} p50 {h['p50']:.2f}s p99 {h['p99']:.2f}s" for stage, h in report['stages'].items()]
+        if stages:
+            line += ' | ' + ', '.join(stages)
+        return line
+
+    def write_report(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def timed(stage):
+    """Decorator: time a check function (sync or async) whose first argument is the domain."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(domain, *args, **kwargs):
+                start = time.monotonic()
+                try:
+                    return await func(domain, *args, **kwargs)
+                finally:
+                    metrics.observe(stage, domain, time.monotonic() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(domain, *args, **kwargs):
+            start = time.monotonic()
+            try:
+                return func(domain, *args, **kwargs)
+            finally:
+                metrics.observe(stage, domain, time.monotonic() - start)
+        return wrapper
+    return decorator
+
+
+class ProgressReporter:
+    """Prints metrics.progress_line() every interval seconds until stopped."""
+
+    def __init__(self, interval=PROGRESS_INTERVAL):
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        if self.interval > 0:
+            self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            print(metrics.progress_line())
+
+    def stop(self):
+        self.stopped.set()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/metrics':
+            body, content_type = metrics.prometheus(), 'text/plain; version=0.0.4'
+        elif self.path == '/metrics.json':
+            body, content_type = json.dumps(metrics.snapshot(), indent=2), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # keep the console for the check output
+
+
+def serve_metrics(port, host='127.0.0.1'):
+    """Start the /metrics endpoint in a background thread. Returns the server."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Shared by every check in the process
+metrics = Metrics()
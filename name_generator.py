@@ -0,0 +1,182 @@
+"""
+Built-in generator of candidate domain names.
+
+Instead of writing permutations into huge .txt files with external
+scripts, put pattern specs in input/name_patterns/*.txt and the word
+lists they use in input/wordlists/*.txt. Names are produced lazily, one
+at a time, in pattern order, so checking starts right away and nothing
+but the word lists is held in memory.
+
+One pattern per line (# starts a comment). A pattern is literal text
+mixed with:
+
+    {adjectives}       every word of input/wordlists/adjectives.txt
+    {nouns:plural}     ... in plural form (box -> boxes, city -> cities)
+    (get|try|my)       one of the alternatives; an empty one makes the
+                       part optional, e.g. (|-) for an optional hyphen
+
+For example:
+
+    (get|try){nouns}
+    {adjectives}(|-){nouns}
+    {nouns}(|s|ly|hub)
+
+Before any network work, generated names are lowercased and dropped if
+they are shorter than MIN_LENGTH or longer than MAX_LENGTH characters
+(DOMAIN_CHECKER_NAME_MIN_LENGTH / DOMAIN_CHECKER_NAME_MAX_LENGTH), contain
+anything but a-z, 0-9 and hyphens, or start or end with a hyphen.
+Duplicates are removed later by the input pipeline (see input_stream.py).
+"""
+import glob
+import os
+import re
+
+DEFAULT_PATTERNS_FOLDER = os.path.join('input', 'name_patterns')
+DEFAULT_WORDLISTS_FOLDER = os.path.join('input', 'wordlists')
+
+MIN_LENGTH = 1
+MAX_LENGTH = 63   # longest DNS label
+
+TOKEN = re.compile(r'\{([^{}:]+)(?::([A-Za-z]+))?\}|\(([^()]*)\)')
+VALID_NAME = re.compile(r'[a-z0-9](?:[a-z0-9-]*[a-z0-9])?')
+
+
+def pluralize(word):
+    """Simple English plural: box -> boxes, city -> cities, app -> apps."""
+    if word.endswith(('s', 'x', 'z', 'ch', 'sh')):
+        return word + 'es'
+    if len(word) > 1 and word.endswith('y') and word[-2] not in 'aeiou':
+        return word[:-1] + 'ies'
+    return word + 's'
+
+
+MODIFIERS = {
+    'plural': pluralize,
+}
+
+
+def load_wordlists(folder_path=DEFAULT_WORDLISTS_FOLDER):
+    """Returns dict: list name (file name without .txt) -> list of unique words."""
+    wordlists = {}
+    for file_path in sorted(glob.glob(os.path.join(folder_path, "*.txt"))):
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                words = [line.strip().lower() for line in f if line.strip() and not line.startswith('#')]
+        except Exception as e:
+            print(f"  Error reading {file_path}: {e}")
+            continue
+        wordlists[name] = list(dict.fromkeys(words))
+    return wordlists
+
+
+def parse_pattern(pattern, wordlists):
+    """
+    Split a pattern into its parts, each a list of alternatives.
+    Literal text is lowercased (like the words); word list names are
+    matched as written, since they are file names.
+    Raises ValueError for unknown word lists or modifiers.
+    """
+    parts = []
+    position = 0
+    for match in TOKEN.finditer(pattern):
+        if match.start() > position:
+            parts.append([pattern[position:match.start()].lower()])
+        list_name, modifier, alternatives = match.groups()
+        if alternatives is not None:
+            parts.append(alternatives.lower().split('|'))
+        else:
+            if list_name not in wordlists:
+                raise ValueError(f"unknown word list {{{list_name}}}")
+            words = wordlists[list_name]
+            if modifier is not None:
+                modifier = modifier.lower()
+                if modifier not in MODIFIERS:
+                    raise ValueError(f"unknown modifier :{modifier}")
+                words = [MODIFIERS[modifier](word) for word in words]
+            parts.append(words)
+        position = match.end()
+    if position < len(pattern):
+        parts.append([pattern[position:].lower()])
+    return parts
+
+
+def count_combinations(parts):
+    total = 1
+    for alternatives in parts:
+        total *= len(alternatives)
+    return total
+
+
+def iter_combinations(parts, prefix=''):
+    """Lazily yield every string made of one alternative per part, in order."""
+    if not parts:
+        yield prefix
+        return
+    first, rest = parts[0], parts[1:]
+    for alternative in first:
+        yield from iter_combinations(rest, prefix + alternative)
+
+
+def read_patterns(folder_path=DEFAULT_PATTERNS_FOLDER):
+    """Yield (file name, line number, pattern) for every pattern in the folder's .txt files."""
+    for file_path in sorted(glob.glob(os.path.join(folder_path, "*.txt"))):
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                lines = list(f)
+        except Exception as e:
+            print(f"  Error reading {file_path}: {e}")
+            continue
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield os.path.basename(file_path), number, line
+
+
+def has_patterns(folder_path=DEFAULT_PATTERNS_FOLDER):
+    return bool(glob.glob(os.path.join(folder_path, "*.txt")))
+
+
+def name_filter(min_length=None, max_length=None):
+    """Returns a function telling whether a generated name is worth checking."""
+    if min_length is None:
+        min_length = int(os.getenv('DOMAIN_CHECKER_NAME_MIN_LENGTH', str(MIN_LENGTH)))
+    if max_length is None:
+        max_length = int(os.getenv('DOMAIN_CHECKER_NAME_MAX_LENGTH', str(MAX_LENGTH)))
+    min_length, max_length = max(1, min_length), min(MAX_LENGTH, max_length)
+    match = VALID_NAME.fullmatch
+
+    def accept(name):
+        return min_length <= len(name) <= max_length and match(name) is not None
+
+    return accept
+
+
+def iter_generated_names(patterns_folder=DEFAULT_PATTERNS_FOLDER, wordlists_folder=DEFAULT_WORDLISTS_FOLDER,
+                         accept=None):
+    """Lazily yield the candidate names of every pattern that pass the cheap filters."""
+    accept = accept or name_filter()
+    wordlists = load_wordlists(wordlists_folder)
+    patterns = []
+    for file_name, number, pattern in read_patterns(patterns_folder):
+        try:
+            parts = parse_pattern(pattern, wordlists)
+        except ValueError as e:
+            print(f"  ⚠️  Skipping pattern {file_name}:{number} '{pattern}': {e}")
+            continue
+        patterns.append((pattern, parts))
+    if patterns:
+        total = sum(count_combinations(parts) for _, parts in patterns)
+        print(f"Generating names from {len(patterns)} pattern(s) in {patterns_folder} "
+              f"(up to {total} candidates, {len(wordlists)} word list(s))")
+
+    for pattern, parts in patterns:
+        generated = 0
+        rejected = 0
+        for name in iter_combinations(parts):
+            if accept(name):
+                generated += 1
+                yield name
+            else:
+                rejected += 1
+        print(f"  Pattern '{pattern}': {generated} names ({rejected} filtered out)")
@@ -0,0 +1,196 @@
+"""
+Batched Namecheap availability checks.
+
+namecheap.domains.check accepts a comma-separated DomainList, so instead
+of one HTTP request per domain the workers hand their domains to a
+NamecheapBatcher. It collects up to BATCH_SIZE domains (or whatever
+arrived within BATCH_WAIT seconds), sends a single request over a pooled
+requests.Session and parses the <DomainCheckResult> element of every
+domain in the response.
+
+Requires environment variables:
+- NAMECHEAP_API_KEY
+- NAMECHEAP_API_USER
+- NAMECHEAP_USERNAME
+- NAMECHEAP_CLIENT_IP
+"""
+import os
+import queue
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import Future
+
+from rate_limiter import rate_limiter, is_throttle_message
+from concurrency import concurrency
+
+# Use sandbox for testing: https://api.sandbox.namecheap.com/xml.response
+# Use production: https://api.namecheap.com/xml.response
+NAMECHEAP_API_URL = "https://api.namecheap.com/xml.response"
+NAMECHEAP_API_HOST = 'api.namecheap.com'
+
+BATCH_SIZE = 50     # Namecheap accepts up to 50 domains per domains.check call
+BATCH_WAIT = 0.5    # seconds to wait for a batch to fill up
+API_TIMEOUT = 10
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_credentials():
+    """Return the API credentials from the environment, or None if any are missing."""
+    credentials = {
+        'ApiUser': os.getenv('NAMECHEAP_API_USER'),
+        'ApiKey': os.getenv('NAMECHEAP_API_KEY'),
+        'UserName': os.getenv('NAMECHEAP_USERNAME'),
+        'ClientIp': os.getenv('NAMECHEAP_CLIENT_IP'),
+    }
+    if not all(credentials.values()):
+        return None
+    return credentials
+
+
+def get_session():
+    """Shared HTTP session so batches reuse the same TLS connection."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            # requests is imported on first use so that importing this module stays cheap
+            import requests
+            from requests.adapters import HTTPAdapter
+            _session = requests.Session()
+            _session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+    return _session
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1].lower()
+
+
+def parse_check_response(content, domains):
+    """
+    Parse a namecheap.domains.check XML response.
+    Returns dict: domain -> 'AVAILABLE', 'TAKEN', 'PREMIUM', 'ERROR_API' or 'ERROR_PARSE'
+    """
+    try:
+        root = ET.fromstring(content)
+    except ET.ParseError:
+        print(f"    ⚠️  Could not parse API response for {len(domains)} domain(s)")
+        return {domain: 'ERROR_PARSE' for domain in domains}
+
+    if root.get('Status', '').upper() == 'ERROR':
+        errors = [el.text.strip() for el in root.iter() if _local_name(el.tag) == 'error' and el.text]
+        error_msg = '; '.join(errors) or 'Check credentials/IP whitelist'
+        print(f"    ❌ Namecheap API Error for {', '.join(domains[:3])}{'...' if len(domains) > 3 else ''}: {error_msg}")
+        return {domain: 'ERROR_API' for domain in domains}
+
+    results = {}
+    for el in root.iter():
+        if _local_name(el.tag) != 'domaincheckresult':
+            continue
+        domain = (el.get('Domain') or '').lower()
+        if el.get('ErrorNo', '0') != '0':
+            results[domain] = 'ERROR_API'
+        elif el.get('Available', '').lower() == 'true':
+            results[domain] = 'PREMIUM' if el.get('IsPremiumName', '').lower() == 'true' else 'AVAILABLE'
+        elif el.get('Available', '').lower() == 'false':
+            results[domain] = 'TAKEN'
+        else:
+            results[domain] = 'ERROR_PARSE'
+
+    for domain in domains:
+        if domain not in results:
+            print(f"    ⚠️  Could not parse API response for {domain}")
+            results[domain] = 'ERROR_PARSE'
+    return {domain: results[domain] for domain in domains}
+
+
+def check_domains(domains):
+    """
+    Check a list of domains (at most BATCH_SIZE) with a single API request.
+    Returns dict: domain -> status string (see check_namecheap_availability in main.py)
+    """
+    domains = [domain.lower() for domain in domains]
+    credentials = get_credentials()
+    if credentials is None:
+        return {domain: 'ERROR_NO_CREDENTIALS' for domain in domains}
+
+    import requests
+    try:
+        params = dict(credentials)
+        params['Command'] = 'namecheap.domains.check'
+        params['DomainList'] = ','.join(domains)
+
+        # Per-endpoint rate limiting and adaptive concurrency (shared by all workers)
+        with concurrency.slot(NAMECHEAP_API_HOST) as slot:
+            rate_limiter.acquire(NAMECHEAP_API_HOST)
+            slot.start()
+            response = get_session().get(NAMECHEAP_API_URL, params=params, timeout=API_TIMEOUT)
+
+            # Let the rate limiter back off if Namecheap starts refusing calls
+            throttled = response.status_code == 429 or is_throttle_message(response.text)
+            rate_limiter.report(NAMECHEAP_API_HOST, throttled)
+            if throttled:
+                slot.outcome = 'throttled'
+            elif response.status_code >= 500:
+                slot.outcome = 'error'
+
+        if response.status_code != 200:
+            print(f"    ❌ HTTP Error {response.status_code} for batch of {len(domains)} domain(s)")
+            return {domain: 'ERROR_HTTP' for domain in domains}
+
+        return parse_check_response(response.content, domains)
+
+    except requests.exceptions.Timeout:
+        return {domain: 'ERROR_TIMEOUT' for domain in domains}
+    except Exception as e:
+        print(f"    Namecheap API exception for batch of {len(domains)} domain(s): {type(e).__name__}")
+        return {domain: 'ERROR' for domain in domains}
+
+
+class NamecheapBatcher:
+    """Collects single-domain requests from many workers into batched API calls."""
+
+    def __init__(self, batch_size=BATCH_SIZE, batch_wait=BATCH_WAIT, check=check_domains):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.check = check
+        self.pending = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, domain):
+        """Queue a domain for checking. Returns a concurrent.futures.Future with its status."""
+        future = Future()
+        self.pending.put((domain.lower(), future))
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='namecheap-batcher', daemon=True)
+                self.thread.start()
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # The same domain may be waited on by several workers
+            domains = list(dict.fromkeys(domain for domain, _ in batch))
+            try:
+                results = self.check(domains)
+            except Exception:
+                results = {}
+            for domain, future in batch:
+                future.set_result(results.get(domain, 'ERROR'))
+
+
+# Shared batcher used by all workers in this process
+batcher = NamecheapBatcher()
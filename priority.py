@@ -0,0 +1,119 @@
+"""
+Priority scheduling of the checks, and "stop after K available per name".
+
+Tasks are handed to the workers best first instead of in name-major
+input order, so the interesting results turn up early in a long run:
+
+1. TLD priority: `priority=N` after the TLD in input/top_level_domain
+   (higher first, default 0)
+2. the estimated chance that the domain is available, from the results
+   of previous runs in the result cache:
+
+       rate(tld) * rate(name length) / overall rate
+
+   (each rate Laplace-smoothed, so TLDs and lengths without history
+   score like an average one)
+
+Ties keep their input order, so without history and priorities nothing
+changes. Names are streamed, so the order is best first within a sliding
+window of WINDOW tasks (DOMAIN_CHECKER_PRIORITY_WINDOW, 0 = input order):
+the window is filled, then every new task pushes out the best one.
+
+With a StopTracker (--stop-after K), a name that has K AVAILABLE results
+gets its remaining TLD checks cancelled: they are reported as SKIPPED
+without a lookup.
+"""
+import heapq
+import os
+import threading
+
+WINDOW = 10000
+
+
+class AvailabilityModel:
+    """Chance of a domain being available, estimated from previous results."""
+
+    def __init__(self, counts=None):
+        self.by_tld = {}
+        self.by_length = {}
+        self.available = 0
+        self.total = 0
+        for (tld, length), (available, total) in (counts or {}).items():
+            for table, key in ((self.by_tld, tld), (self.by_length, length)):
+                seen = table.get(key, (0, 0))
+                table[key] = (seen[0] + available, seen[1] + total)
+            self.available += available
+            self.total += total
+
+    @classmethod
+    def from_cache(cls, cache):
+        """Model built from a ResultCache (an empty model without one)."""
+        if cache is None:
+            return cls()
+        return cls(cache.status_counts())
+
+    @staticmethod
+    def _rate(counts):
+        available, total = counts
+        return (available + 1) / (total + 2)
+
+    def score(self, name, tld):
+        overall = self._rate((self.available, self.total))
+        by_tld = self._rate(self.by_tld.get(tld, (0, 0)))
+        by_length = self._rate(self.by_length.get(len(name), (0, 0)))
+        return by_tld * by_length / overall
+
+
+def task_key(model, tld_priorities=None):
+    """Sort key of a (name, tld) task: smaller is checked first."""
+    tld_priorities = tld_priorities or {}
+
+    def key(task):
+        name, tld = task[0], task[1]
+        return -tld_priorities.get(tld, 0), -model.score(name, tld)
+
+    return key
+
+
+def prioritize(tasks, key, window=None):
+    """Lazily yield tasks best first (smallest key) within a sliding window of window tasks."""
+    if window is None:
+        window = int(os.getenv('DOMAIN_CHECKER_PRIORITY_WINDOW', str(WINDOW)))
+    if window <= 1:
+        yield from tasks
+        return
+    heap = []
+    for number, task in enumerate(tasks):
+        item = (key(task), number, task)
+        if len(heap) < window:
+            heapq.heappush(heap, item)
+        else:
+            yield heapq.heappushpop(heap, item)[2]
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+
+class StopTracker:
+    """Counts AVAILABLE results per name and cancels the rest of a name's checks at limit. Thread-safe."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.hits = {}       # name -> AVAILABLE results so far (only names with hits)
+        self.skipped = 0
+        self.lock = threading.Lock()
+
+    def record(self, result):
+        """Account a finished result (call once per result)."""
+        if result[7] == 'AVAILABLE':
+            name = result[0].lower()
+            with self.lock:
+                self.hits[name] = self.hits.get(name, 0) + 1
+
+    def skip(self, name, tld):
+        """A SKIPPED result tuple if name already has enough hits, else None."""
+        if self.hits.get(name.lower(), 0) < self.limit:
+            return None
+        with self.lock:
+            self.skipped += 1
+        return (name, tld, False, 'N/A', False, {}, False, 'SKIPPED', 'N/A', 'NOT_CHECKED', 0,
+                f"stopped after {self.limit} available for this name")
@@ -0,0 +1,199 @@
+"""
+Shared rate limiting for WHOIS servers and registrar APIs.
+
+Every upstream (a WHOIS server host, the Namecheap API endpoint, ...)
+gets its own token bucket, so lookups that go to different registries
+never throttle each other. Rates can be configured per server or per TLD
+in input/rate_limits.txt:
+
+    # key              requests/second  [burst]
+    .de                1                1
+    whois.nic.uk       2                4
+    api.namecheap.com  0.33             1
+
+Keys starting with '.' are TLDs and apply to the server that TLD uses;
+anything else is a server/endpoint host name.
+
+When a server answers with a throttle message the bucket backs off:
+its rate is halved and further requests wait for a cool-down period that
+doubles on each consecutive throttle. Successful responses slowly bring
+the rate back to the configured value.
+
+Local shard processes (`main.py --processes N`) share one machine's
+allowance: each of them runs with 1/N of every rate (and burst), set
+through DOMAIN_CHECKER_LOCAL_PROCESSES.
+"""
+import asyncio
+import os
+import threading
+import time
+
+DEFAULT_RATE = 3.0          # requests per second per server
+DEFAULT_BURST = 5
+DEFAULT_LIMITS_FILE = os.path.join('input', 'rate_limits.txt')
+
+# Built-in limits for known endpoints (Namecheap allows 20 calls/minute)
+DEFAULT_LIMITS = {
+    'api.namecheap.com': (20 / 60, 1),
+    'api.sandbox.namecheap.com': (20 / 60, 1),
+}
+
+MIN_RATE_FACTOR = 1 / 32
+MAX_COOLDOWN = 300.0
+INITIAL_COOLDOWN = 5.0
+
+# Phrases servers use when they start refusing us
+THROTTLE_PHRASES = [
+    'rate limit',
+    'limit exceeded',
+    'query limit',
+    'quota exceeded',
+    'too many',
+    'try again later',
+    'exceeded the maximum',
+    'temporarily blocked',
+]
+
+
+def is_throttle_message(text):
+    """Return True if a server response or error message looks like a throttle notice."""
+    text = (text or '').lower()
+    return any(phrase in text for phrase in THROTTLE_PHRASES)
+
+
+class TokenBucket:
+    """Token bucket with adaptive backoff. Thread-safe."""
+
+    def __init__(self, rate, burst):
+        self.base_rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.rate_factor = 1.0
+        self.cooldown = 0.0
+        self.blocked_until = 0.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self.base_rate * self.rate_factor
+
+    def reserve(self):
+        """Take one token and return how many seconds the caller must wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.blocked_until - now)
+
+    def throttled(self):
+        """Server refused us: halve the rate and block for a growing cool-down."""
+        with self.lock:
+            self.rate_factor = max(MIN_RATE_FACTOR, self.rate_factor / 2)
+            self.cooldown = min(MAX_COOLDOWN, self.cooldown * 2 if self.cooldown else INITIAL_COOLDOWN)
+            self.blocked_until = time.monotonic() + self.cooldown
+            self.tokens = min(self.tokens, 0.0)
+
+    def succeeded(self):
+        """Server answered normally: recover the rate gradually."""
+        with self.lock:
+            if self.rate_factor < 1.0:
+                self.rate_factor = min(1.0, self.rate_factor * 1.1)
+            else:
+                self.cooldown = 0.0
+
+
+class RateLimiter:
+    """Token buckets keyed by upstream server."""
+
+    def __init__(self, default_rate=DEFAULT_RATE, default_burst=DEFAULT_BURST):
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self.host_limits = dict(DEFAULT_LIMITS)
+        self.tld_limits = {}
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.limits_loaded = False
+        self.processes = 1
+
+    def load_limits(self, file_path=DEFAULT_LIMITS_FILE):
+        """Read per-server / per-TLD limits from a file. Returns the number of entries loaded."""
+        self.limits_loaded = True
+        self.processes = max(1, int(os.getenv('DOMAIN_CHECKER_LOCAL_PROCESSES', '1')))
+        if not os.path.exists(file_path):
+            return 0
+
+        loaded = 0
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.split('#', 1)[0].split()
+                if len(parts) < 2:
+                    continue
+                try:
+                    rate = float(parts[1])
+                    burst = int(parts[2]) if len(parts) > 2 else max(1, int(rate))
+                except ValueError:
+                    print(f"  Ignoring invalid rate limit line: {line.strip()}")
+                    continue
+                key = parts[0].lower()
+                if key.startswith('.'):
+                    self.tld_limits[key.lstrip('.')] = (rate, burst)
+                else:
+                    self.host_limits[key] = (rate, burst)
+                loaded += 1
+        return loaded
+
+    def bucket(self, key, tld=None):
+        """Return the bucket for an upstream server, creating it on first use."""
+        if not self.limits_loaded:
+            # Threads arriving meanwhile wait for the limits (at the bucket
+            # lock below) instead of creating buckets with the defaults
+            with self.lock:
+                if not self.limits_loaded:
+                    self.load_limits()
+        key = key.lower()
+        tld = tld.lstrip('.').lower() if tld else None
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            with self.lock:
+                bucket = self.buckets.get(key)
+                if bucket is None:
+                    rate, burst = self.host_limits.get(key) or self.tld_limits.get(tld) or (self.default_rate, self.default_burst)
+                    bucket = TokenBucket(rate / self.processes, burst // self.processes)
+                    self.buckets[key] = bucket
+        if tld in self.tld_limits and key not in self.host_limits:
+            # Several TLDs can share one server - the strictest limit wins
+            rate, burst = self.tld_limits[tld]
+            rate, burst = rate / self.processes, burst // self.processes
+            if rate < bucket.base_rate:
+                with bucket.lock:
+                    bucket.base_rate = rate
+                    bucket.burst = min(bucket.burst, max(1, burst))
+        return bucket
+
+    def acquire(self, key, tld=None):
+        """Block until a request to this server is allowed."""
+        wait = self.bucket(key, tld).reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def async_acquire(self, key, tld=None):
+        """Non-blocking equivalent of acquire."""
+        wait = self.bucket(key, tld).reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def report(self, key, throttled):
+        """Feed the outcome of a request back into the server's bucket."""
+        bucket = self.bucket(key)
+        if throttled:
+            print(f"    ⏳ {key} is throttling requests - backing off to {bucket.rate / 2:.2f} req/s")
+            bucket.throttled()
+        else:
+            bucket.succeeded()
+
+
+# Shared instance used by all checks in this process
+rate_limiter = RateLimiter()
@@ -0,0 +1,119 @@
+"""
+Persistent result cache so repeat runs skip domains checked recently.
+
+Results are stored in a SQLite database keyed by full domain. Each entry
+holds the complete result tuple produced by domain_checker_worker plus
+the time it was checked. Whether an entry is still fresh depends on its
+status: a TAKEN domain with HIGH confidence will not become available
+overnight, but an AVAILABLE one can be registered at any moment.
+
+The database runs in WAL mode with one connection per thread, so it can
+be shared by all worker threads (and by several processes).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join('cache', 'domain_results.sqlite3')
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# (status, confidence) -> seconds a cached result stays valid.
+# Lookups fall back to (status, None), then to DEFAULT_TTL.
+CACHE_TTLS = {
+    ('TAKEN', 'VERY HIGH'): 30 * DAY,
+    ('TAKEN', 'HIGH'): 30 * DAY,
+    ('TAKEN', 'LOW'): 1 * HOUR,     # WHOIS failed on every attempt
+    ('TAKEN', None): 1 * DAY,
+    ('PREMIUM', None): 7 * DAY,
+    ('RESTRICTED/PREMIUM', None): 7 * DAY,
+    ('AVAILABLE', None): 6 * HOUR,
+    ('POSSIBLY AVAILABLE', None): 6 * HOUR,
+}
+DEFAULT_TTL = 1 * DAY
+
+
+def ttl_for(status, confidence):
+    """How long a result with this status/confidence may be served from the cache."""
+    ttl = CACHE_TTLS.get((status, confidence))
+    if ttl is None:
+        ttl = CACHE_TTLS.get((status, None), DEFAULT_TTL)
+    return ttl
+
+
+class ResultCache:
+    """On-disk cache of result tuples keyed by full domain."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.local = threading.local()
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            ' domain TEXT PRIMARY KEY,'
+            ' status TEXT NOT NULL,'
+            ' confidence TEXT NOT NULL,'
+            ' result TEXT NOT NULL,'
+            ' checked_at REAL NOT NULL)'
+        )
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA busy_timeout=30000')
+            self.local.conn = conn
+        return conn
+
+    def get(self, domain, now=None):
+        """
+        Return the cached result tuple for a domain, or None if it is
+        missing or older than its status allows.
+        """
+        row = self._connection().execute(
+            'SELECT status, confidence, result, checked_at FROM results WHERE domain = ?',
+            (domain.lower(),)
+        ).fetchone()
+        if row is None:
+            return None
+
+        status, confidence, result, checked_at = row
+        if (now or time.time()) - checked_at > ttl_for(status, confidence):
+            return None
+        return tuple(json.loads(result))
+
+    def put(self, domain, result, checked_at=None):
+        """Store a result tuple (as produced by domain_checker_worker)."""
+        status, confidence = result[7], result[8]
+        conn = self._connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO results (domain, status, confidence, result, checked_at) VALUES (?, ?, ?, ?, ?)',
+            (domain.lower(), status, confidence, json.dumps(list(result)), checked_at or time.time())
+        )
+        conn.commit()
+
+    def status_counts(self):
+        """
+        Returns dict: (tld, name length) -> (available, total) over every
+        stored result, expired ones included (the history used by priority.py).
+        """
+        rows = self._connection().execute(
+            "SELECT substr(domain, instr(domain, '.')), instr(domain, '.') - 1,"
+            " SUM(status IN ('AVAILABLE', 'POSSIBLY AVAILABLE')), COUNT(*)"
+            " FROM results GROUP BY 1, 2"
+        ).fetchall()
+        return {(tld, length): (available, total) for tld, length, available, total in rows}
+
+    def close(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
@@ -0,0 +1,139 @@
+"""
+Deferred retries for checks that failed for transient reasons.
+
+A WHOIS timeout or connection error ends up as a LOW confidence result,
+and API errors as an ERROR status; recorded as they are, such checks
+would show up as wrong answers (usually TAKEN). Instead of retrying
+inline (which would stall the worker), the check is put aside and
+re-queued after a delay, while the workers carry on with other domains:
+
+    delay = BASE_DELAY * 2 ** (attempt - 1 + failures of the server)
+
+capped at MAX_DELAY and with random jitter, so retries for one server
+do not all come back at the same moment. The failure streak is tracked
+per upstream server (WHOIS host or API endpoint) and reset by the next
+successful check, so a server that keeps failing is given more and more
+time. After MAX_ATTEMPTS attempts the last result is recorded as it is.
+"""
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+from namecheap_api import NAMECHEAP_API_HOST
+from whois_client import known_server_host
+
+MAX_ATTEMPTS = 4
+BASE_DELAY = 2.0
+MAX_DELAY = 120.0
+MAX_STREAK = 3       # so one bad burst does not push every delay to MAX_DELAY
+
+# Namecheap statuses worth another try (not credential/whitelist errors)
+RETRYABLE_API_STATUSES = {'API_ERROR', 'ERROR', 'ERROR_TIMEOUT', 'ERROR_HTTP', 'ERROR_PARSE'}
+API_ANSWERS = {'AVAILABLE', 'TAKEN', 'PREMIUM'}
+
+
+def failure_reason(whois_confidence, registrar_status):
+    """Return 'whois' or 'api' if a check result came from a transient failure, else None."""
+    if whois_confidence == 'LOW':
+        return 'whois'
+    if registrar_status in RETRYABLE_API_STATUSES:
+        return 'api'
+    return None
+
+
+def upstream_of(tld, reason):
+    """The server a failure of this kind is blamed on."""
+    if reason == 'api':
+        return NAMECHEAP_API_HOST
+    return known_server_host(tld) or 'whois' + tld
+
+
+class RetryPolicy:
+    """Backoff delays with a failure streak per upstream server. Thread-safe."""
+
+    def __init__(self, max_attempts=None, base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+        if max_attempts is None:
+            max_attempts = int(os.getenv('DOMAIN_CHECKER_MAX_ATTEMPTS', str(MAX_ATTEMPTS)))
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.streaks = {}
+        self.lock = threading.Lock()
+
+    def retry_delay(self, tld, whois_confidence, registrar_status, attempt):
+        """
+        Account a finished check (attempt 1, 2, ...) to its servers.
+        Returns (reason, delay) if it should be retried after delay seconds,
+        else None (record the result as it is).
+        """
+        reason = failure_reason(whois_confidence, registrar_status)
+        if reason != 'whois' and whois_confidence != 'NOT_CHECKED':
+            self.succeeded(upstream_of(tld, 'whois'))
+        if registrar_status in API_ANSWERS:
+            self.succeeded(upstream_of(tld, 'api'))
+        if reason is None:
+            return None
+        delay = self.failed(upstream_of(tld, reason), attempt)
+        if attempt >= self.max_attempts:
+            return None
+        return reason, delay
+
+    def failed(self, server, attempt):
+        """Record a failure on a server and return the delay before the next attempt."""
+        with self.lock:
+            streak = self.streaks.get(server, 0)
+            self.streaks[server] = min(MAX_STREAK, streak + 1)
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1 + streak))
+        return delay * random.uniform(0.5, 1.0)
+
+    def succeeded(self, server):
+        if server in self.streaks:
+            with self.lock:
+                self.streaks.pop(server, None)
+
+
+class RetryScheduler:
+    """
+    Holds failed checks until their retry is due, then hands them to
+    dispatch (e.g. task_queue.put) from a background thread.
+    """
+
+    def __init__(self, dispatch):
+        self.dispatch = dispatch
+        self.heap = []
+        self.counter = itertools.count()
+        self.pending = 0          # scheduled but not dispatched yet
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def schedule(self, task, delay):
+        with self.condition:
+            heapq.heappush(self.heap, (time.monotonic() + delay, next(self.counter), task))
+            self.pending += 1
+            self.condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.heap or self.heap[0][0] > time.monotonic():
+                    timeout = self.heap[0][0] - time.monotonic() if self.heap else None
+                    self.condition.wait(timeout)
+                _, _, task = heapq.heappop(self.heap)
+            self.dispatch(task)
+            with self.condition:
+                self.pending -= 1
+                self.condition.notify_all()
+
+    def wait_dispatched(self):
+        """Block until every scheduled retry has been handed to dispatch."""
+        with self.condition:
+            while self.pending:
+                self.condition.wait()
+
+    def pending_count(self):
+        with self.condition:
+            return self.pending
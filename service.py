@@ -0,0 +1,362 @@
+"""
+Long-running check service with a job queue and a local HTTP/JSON API.
+
+`python main.py --serve` starts one process that stays up and takes
+check jobs over HTTP, so DNS resolvers, pooled HTTP sessions, WHOIS
+referrals, rate limiters, the adaptive concurrency limits and the result
+cache stay warm between requests instead of being set up for every run.
+
+API (bound to 127.0.0.1):
+
+    POST /jobs               {"domains": ["foo.com", ...]} or
+                             {"names": ["foo", ...], "tlds": [".com", ...]},
+                             optional "refresh": true to bypass the cache
+                             -> 202 {"id": ..., "total": N}
+    POST /jobs?stream=1      same, but the response streams the results
+                             back as JSON lines as they finish
+    GET  /jobs/ID            job state and the results so far
+    GET  /jobs/ID/results    JSON lines stream of the job's results (from
+                             the first one) that ends when the job is done
+    GET  /check?domain=D     check one domain and wait for its result
+    GET  /health             {"status": "ok", ...}
+    GET  /metrics            Prometheus metrics (see metrics.py)
+
+Names that can't be registered under their TLD (see tld_policy.py) and
+domains in the zone index or with a fresh cached result are answered
+right away, without touching the queue. Everything else is checked by a
+pool of worker threads that run the same check as a batch run, with the
+shared per-server rate limiting, adaptive concurrency, retries and
+single-flight de-duplication. Single-domain jobs go ahead of queued
+batch work so an interactive lookup does not wait behind a large batch.
+Finished jobs are kept for JOB_RETENTION seconds.
+"""
+import itertools
+import json
+import queue
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from check_pipeline import FAILED_CHECK, decision_note
+from metrics import metrics
+from retry import RetryScheduler
+from singleflight import checks_in_flight, lookup_key
+
+DEFAULT_PORT = 8053
+MAX_JOB_DOMAINS = 100000
+JOB_RETENTION = 3600        # seconds a finished job stays available
+CHECK_TIMEOUT = 120         # how long GET /check waits for its result
+STREAM_HEARTBEAT = 15       # seconds between keep-alive newlines of a stream
+
+INTERACTIVE, BATCH = 0, 1   # queue priorities
+
+
+def parse_domain(domain):
+    """Split 'foo.co.uk' into ('foo', '.co.uk'). Raises ValueError."""
+    if not isinstance(domain, str):
+        raise ValueError(f"Not a domain: {domain!r}")
+    domain = domain.strip().lower().rstrip('.')
+    name, dot, tld = domain.partition('.')
+    if not name or not tld or ' ' in domain:
+        raise ValueError(f"Not a domain: {domain!r}")
+    return name, dot + tld
+
+
+def _string_list(body, key):
+    """body[key], which must be a list of strings. Raises ValueError."""
+    value = body[key]
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f'"{key}" must be a list of strings')
+    return value
+
+
+def parse_job(body):
+    """The (name, tld) pairs of a POST /jobs body. Raises ValueError."""
+    if not isinstance(body, dict):
+        raise ValueError("Expected a JSON object")
+    if 'domains' in body:
+        tasks = [parse_domain(domain) for domain in _string_list(body, 'domains')]
+    elif 'names' in body and 'tlds' in body:
+        tlds = ['.' + tld.strip().lower().lstrip('.') for tld in _string_list(body, 'tlds')]
+        names = [name.strip() for name in _string_list(body, 'names') if name.strip()]
+        if len(names) * len(tlds) > MAX_JOB_DOMAINS:
+            raise ValueError(f"Too many domains in one job (at most {MAX_JOB_DOMAINS})")
+        tasks = [parse_domain(name + tld) for name in names for tld in tlds]
+    else:
+        raise ValueError('Expected "domains", or "names" and "tlds"')
+    if not tasks:
+        raise ValueError("No domains to check")
+    if len(tasks) > MAX_JOB_DOMAINS:
+        raise ValueError(f"Too many domains in one job (at most {MAX_JOB_DOMAINS})")
+    return tasks
+
+
+def result_to_dict(result, source):
+    """JSON form of a result tuple; source is 'check', 'cache', 'zone' or 'validation'."""
+    name, tld = result[0], result[1]
+    return {
+        'domain': name.lower() + tld,
+        'status': result[7],
+        'confidence': result[8],
+        'whois_available': result[2] if result[3] != 'NOT_CHECKED' else None,
+        'whois_confidence': result[3],
+        'dns_active': result[4],
+        'dns_records': [record for record, present in result[5].items() if present],
+        'http_active': result[6],
+        'registrar_status': result[9],
+        'attempts': result[10] if len(result) > 10 else 1,
+        'note': (result[11] if len(result) > 11 else None) or '',
+        'source': source,
+    }
+
+
+class Job:
+    """The results of one submitted job, filled in as the checks finish."""
+
+    def __init__(self, total):
+        self.id = uuid.uuid4().hex[:16]
+        self.total = total
+        self.results = []
+        self.created = time.time()
+        self.finished = None
+        self.condition = threading.Condition()
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    def add(self, result):
+        with self.condition:
+            self.results.append(result)
+            if len(self.results) >= self.total:
+                self.finished = time.time()
+            self.condition.notify_all()
+
+    def wait(self, start, timeout=None):
+        """
+        Block until there are results after index start (or the job is
+        done, or timeout passes). Returns the new results.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.results) > start or self.done, timeout)
+            return self.results[start:]
+
+    def to_dict(self, results=True):
+        with self.condition:
+            state = {
+                'id': self.id,
+                'total': self.total,
+                'completed': len(self.results),
+                'done': self.done,
+                'created': self.created,
+                'finished': self.finished,
+            }
+            if results:
+                state['results'] = list(self.results)
+            return state
+
+
+class CheckService:
+    """
+    Job queue in front of a pool of check workers.
+
+    check(full_domain) is the availability check (main.enhanced_availability_check),
+    decide(...) turns its result into (status, confidence) (main.determine_final_status),
+    validate(name, tld) returns a result tuple for a name that can't be registered, else None,
+    lookup(name, tld) returns a known result tuple or None (zone index, cache)
+    and store(result) is called with every finished check (cache it).
+    """
+
+    def __init__(self, check, decide, validate=None, lookup=None, store=None, workers=50, retry_policy=None):
+        self.check = check
+        self.decide = decide
+        self.validate = validate
+        self.lookup = lookup
+        self.store = store
+        self.worker_count = max(1, workers)
+        self.retry_policy = retry_policy
+        self.retry_scheduler = None
+        self.queue = queue.PriorityQueue()
+        self.counter = itertools.count()
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def start(self):
+        if self.retry_policy is not None:
+            self.retry_scheduler = RetryScheduler(self._put)
+            metrics.gauge('retries_pending', self.retry_scheduler.pending_count)
+        for _ in range(self.worker_count):
+            threading.Thread(target=self._worker, daemon=True).start()
+        metrics.gauge('task_queue_depth', self.queue.qsize)
+        metrics.gauge('jobs', lambda: len(self.jobs))
+        return self
+
+    def _put(self, task):
+        job = task[0]
+        priority = INTERACTIVE if job.total == 1 else BATCH
+        self.queue.put((priority, next(self.counter), task))
+
+    def submit(self, tasks, refresh=False):
+        """Start a job for the (name, tld) pairs. Returns the Job."""
+        job = Job(len(tasks))
+        with self.lock:
+            self._forget_old_jobs()
+            self.jobs[job.id] = job
+        for name, tld in tasks:
+            rejected = self.validate(name, tld) if self.validate is not None else None
+            if rejected is not None:
+                metrics.task_skipped()
+                job.add(result_to_dict(rejected, 'validation'))
+                continue
+            known = None if refresh or self.lookup is None else self.lookup(name, tld)
+            if known is not None:
+                metrics.task_skipped()
+                # Zone index results are the only ones with 0 attempts
+                job.add(result_to_dict(known, 'zone' if known[10:11] == (0,) else 'cache'))
+            else:
+                metrics.task_queued()
+                self._put((job, name, tld, 1))
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def _forget_old_jobs(self):
+        cutoff = time.time() - JOB_RETENTION
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.done and job.finished < cutoff]:
+            del self.jobs[job_id]
+
+    def _worker(self):
+        while True:
+            _, _, (job, name, tld, attempt) = self.queue.get()
+            full_domain = name.lower() + tld
+            metrics.check_started()
+            try:
+                checked = checks_in_flight.do(lookup_key(full_domain), self.check, full_domain)
+            except Exception as e:
+                print(f"    ⚠️  Check of {full_domain} failed: {e}")
+                checked = FAILED_CHECK
+            whois_available, confidence, dns_active, dns_details, http_active, registrar_status, decision = checked
+
+            retry = None
+            if self.retry_scheduler is not None:
+                retry = self.retry_policy.retry_delay(tld, confidence, registrar_status, attempt)
+            if retry is not None:
+                reason, delay = retry
+                print(f"  -> {full_domain} {reason.upper()} lookup failed - retrying in {delay:.0f}s")
+                self.retry_scheduler.schedule((job, name, tld, attempt + 1), delay)
+            else:
+                status, final_confidence = self.decide(
+                    full_domain, whois_available, confidence, dns_active, dns_details, http_active, registrar_status,
+                    decision
+                )
+                result = (name, tld, whois_available, confidence, dns_active, dns_details, http_active,
+                          status, final_confidence, registrar_status, attempt, decision_note(decision))
+                if self.store is not None:
+                    self.store(result)
+                job.add(result_to_dict(result, 'check'))
+            metrics.check_finished()
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    @property
+    def service(self):
+        return self.server.service
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        if url.path == '/health':
+            self._send_json(200, {'status': 'ok', 'jobs': len(self.service.jobs),
+                                  'queued': self.service.queue.qsize()})
+        elif url.path == '/metrics':
+            self._send(200, metrics.prometheus(), 'text/plain; version=0.0.4')
+        elif url.path == '/check':
+            self._check(parse_qs(url.query).get('domain', [''])[0])
+        elif len(parts) in (2, 3) and parts[0] == 'jobs':
+            job = self.service.get(parts[1])
+            if job is None:
+                self._send_json(404, {'error': f"No job {parts[1]}"})
+            elif len(parts) == 2:
+                self._send_json(200, job.to_dict())
+            elif parts[2] == 'results':
+                self._stream(job)
+            else:
+                self._send_json(404, {'error': 'Not found'})
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/jobs':
+            self._send_json(404, {'error': 'Not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+            tasks = parse_job(body)
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        job = self.service.submit(tasks, refresh=bool(body.get('refresh')))
+        if parse_qs(url.query).get('stream', ['0'])[0] not in ('', '0', 'false'):
+            self._stream(job)
+        else:
+            self._send_json(202, job.to_dict(results=False))
+
+    def _check(self, domain):
+        try:
+            task = parse_domain(domain)
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        job = self.service.submit([task])
+        results = job.wait(0, CHECK_TIMEOUT)
+        if results:
+            self._send_json(200, results[0])
+        else:
+            self._send_json(504, {'error': 'Check still running', 'job': job.id})
+
+    def _stream(self, job):
+        """Send the job's results as JSON lines until it is done (HTTP/1.0: the end of the body is the close)."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('X-Job-Id', job.id)
+        self.end_headers()
+        sent = 0
+        try:
+            while sent < job.total:
+                results = job.wait(sent, STREAM_HEARTBEAT)
+                if results:
+                    self.wfile.write(''.join(json.dumps(result) + '\n' for result in results).encode('utf-8'))
+                    sent += len(results)
+                else:
+                    self.wfile.write(b'\n')  # keeps proxies and idle timeouts from closing the stream
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client went away; the job carries on and stays available
+
+    def _send_json(self, code, data):
+        self._send(code, json.dumps(data), 'application/json')
+
+    def _send(self, code, body, content_type):
+        data = body.encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # keep the console for the check output
+
+
+def serve_api(service, port=DEFAULT_PORT, host='127.0.0.1'):
+    """Create the HTTP server for a started CheckService; call serve_forever() on it."""
+    server = ThreadingHTTPServer((host, port), _ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
@@ -0,0 +1,136 @@
+"""
+Sharded execution across processes or machines.
+
+The NAMES x TLDS space is split by a stable hash of the full domain, so
+every process (or machine) started with `--shard i/N` checks a disjoint,
+evenly sized part of it and always the same part for the same input.
+Each shard writes the three standard CSV files into its own folder under
+output/shards/, and merge_shards combines them into the normal output:
+
+- domain_results.csv: every shard writes one row per name (in input
+  order) with only its own cells filled in, so the rows line up and are
+  merged cell by cell
+- domain_results_detailed.csv / available_domains.csv: shard files are
+  concatenated
+- domain_results.dcr (binary results, if the shards wrote it): merged
+  the same way, see binary_results.merge_binary
+
+    python main.py --shard 1/4          # on machine 1 (then 2/4, 3/4, 4/4)
+    python main.py --merge 4            # combine the four shard folders
+    python main.py --processes 4        # all of the above in one go, locally
+"""
+import csv
+import glob
+import hashlib
+import os
+import re
+from itertools import zip_longest
+
+from csv_output import SUMMARY_FILE, DETAILED_FILE, AVAILABLE_FILE
+from binary_results import BINARY_FILE, merge_binary
+
+SHARDS_DIR = os.path.join('output', 'shards')
+
+
+def parse_shard(spec):
+    """Parse 'i/N' (1-based) into (i, N)."""
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', spec or '')
+    if not match:
+        raise ValueError(f"Invalid shard '{spec}' - expected i/N, e.g. 1/4")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{spec}' - i must be between 1 and N")
+    return index, count
+
+
+def shard_of(full_domain, count):
+    """Stable 1-based shard number of a full domain (same on every machine and run)."""
+    digest = hashlib.blake2b(full_domain.lower().encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count + 1
+
+
+def shard_dir(index, count, base=SHARDS_DIR):
+    """Output folder of one shard."""
+    return os.path.join(base, f"shard-{index}-of-{count}")
+
+
+def find_shard_dirs(count, base=SHARDS_DIR):
+    """Return the folders of shards 1..count; raises if any is missing."""
+    dirs = [shard_dir(i, count, base) for i in range(1, count + 1)]
+    missing = [d for d in dirs if not os.path.exists(os.path.join(d, SUMMARY_FILE))]
+    if missing:
+        found = sorted(glob.glob(os.path.join(base, 'shard-*')))
+        raise FileNotFoundError(
+            f"Missing shard output in: {', '.join(missing)}"
+            + (f" (found: {', '.join(found)})" if found else "")
+        )
+    return dirs
+
+
+def _merge_summary(shard_dirs, output_path):
+    files = [open(os.path.join(d, SUMMARY_FILE), newline='', encoding='utf-8') for d in shard_dirs]
+    try:
+        readers = [csv.reader(f) for f in files]
+        headers = [next(reader, None) for reader in readers]
+        if any(header != headers[0] for header in headers):
+            raise ValueError("Shard summary files have different TLD columns - were they run with the same input?")
+
+        with open(output_path, "w", newline='', encoding='utf-8') as out:
+            writer = csv.writer(out)
+            writer.writerow(headers[0])
+            for rows in zip_longest(*readers):
+                if None in rows:
+                    raise ValueError("Shard summary files have different numbers of rows - is a shard incomplete?")
+                if any(row[0] != rows[0][0] for row in rows):
+                    raise ValueError(f"Shard summary rows are out of step at '{rows[0][0]}' - were they run with the same input?")
+                merged = [rows[0][0]]
+                for column in range(1, len(headers[0])):
+                    cell = next((row[column] for row in rows if column < len(row) and row[column]), 'ERROR')
+                    merged.append(cell)
+                writer.writerow(merged)
+    finally:
+        for f in files:
+            f.close()
+
+
+def _concatenate(shard_dirs, file_name, output_path):
+    rows = 0
+    with open(output_path, "w", newline='', encoding='utf-8') as out:
+        writer = csv.writer(out)
+        header_written = False
+        for directory in shard_dirs:
+            with open(os.path.join(directory, file_name), newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if header and not header_written:
+                    writer.writerow(header)
+                    header_written = True
+                for row in reader:
+                    writer.writerow(row)
+                    rows += 1
+    return rows
+
+
+def merge_shards(shard_dirs, output_dir):
+    """
+    Combine per-shard CSV files into the three standard output files.
+    Returns dict with 'total', 'available' and 'possibly_available' counts.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    _merge_summary(shard_dirs, os.path.join(output_dir, SUMMARY_FILE))
+    total = _concatenate(shard_dirs, DETAILED_FILE, os.path.join(output_dir, DETAILED_FILE))
+    _concatenate(shard_dirs, AVAILABLE_FILE, os.path.join(output_dir, AVAILABLE_FILE))
+    binary_paths = [os.path.join(d, BINARY_FILE) for d in shard_dirs]
+    if all(os.path.exists(path) for path in binary_paths):
+        merge_binary(binary_paths, os.path.join(output_dir, BINARY_FILE))
+
+    available = possibly_available = 0
+    with open(os.path.join(output_dir, DETAILED_FILE), newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if row[3] == 'AVAILABLE':
+                available += 1
+            elif row[3] == 'POSSIBLY AVAILABLE':
+                possibly_available += 1
+    return {'total': total, 'available': available, 'possibly_available': possibly_available}
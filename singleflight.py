@@ -0,0 +1,84 @@
+"""
+In-flight de-duplication of lookups ("single-flight").
+
+When a lookup for a key is already running, a second request for the
+same key does not start another one: it waits for the running lookup
+and gets the same result (or exception). Keys are only held while the
+lookup runs, so this coalesces concurrent work without caching anything
+(result_cache.py and dns_cache.py do the caching).
+
+Works across threads and asyncio: the running lookup is tracked as a
+concurrent.futures.Future, which threads wait on directly and coroutines
+through asyncio.wrap_future. A coroutine never blocks the event loop
+waiting for a thread and vice versa.
+
+Domains are keyed by lookup_key(): lowercased, stripped and IDNA-encoded,
+so "Foo.com", "foo.com " and "foo.com." share one lookup.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+
+from zone_index import normalize_domain
+
+
+def lookup_key(domain):
+    """The normalised form of a domain that identifies one network lookup."""
+    return normalize_domain(domain)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one call. Thread-safe."""
+
+    def __init__(self):
+        self.calls = {}    # key -> Future of the running call
+        self.lock = threading.Lock()
+        self.shared = 0    # calls answered by another caller's lookup
+
+    def _join(self, key):
+        """Returns (future, leader): leader is True if the caller has to run the call."""
+        with self.lock:
+            future = self.calls.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+            future = self.calls[key] = Future()
+            return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        with self.lock:
+            del self.calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, func, *args, **kwargs):
+        """Return func(*args, **kwargs), or the result of the identical call already running."""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def async_do(self, key, coroutine_func, *args, **kwargs):
+        """Non-blocking equivalent of do for coroutine functions."""
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await coroutine_func(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+
+# Shared by every check in the process: one running check per domain
+checks_in_flight = SingleFlight()
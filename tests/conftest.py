@@ -0,0 +1,17 @@
+"""
+Shared fixtures of the unit tests.
+"""
+import pytest
+
+
+def _make_result(name, tld, status='TAKEN', confidence='HIGH', attempts=1, note=None):
+    """A result tuple as the check workers record it."""
+    result = (name, tld, status == 'AVAILABLE', confidence, False, {}, False, status, confidence,
+              'API_NOT_CONFIGURED', attempts)
+    return result if note is None else result + (note,)
+
+
+@pytest.fixture
+def make_result():
+    """make_result(name, tld, status='TAKEN', confidence='HIGH', attempts=1, note=None) -> result tuple."""
+    return _make_result
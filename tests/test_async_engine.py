@@ -0,0 +1,54 @@
+"""
+The asyncio engine's worker pool, with the availability check replaced.
+"""
+import async_engine
+from retry import RetryPolicy
+
+TAKEN_CHECK = (False, 'HIGH', True, {'NS': True}, False, 'API_NOT_CONFIGURED', None)
+
+
+def decide(full_domain, whois_available, confidence, dns_active, dns_details, http_active, registrar_status,
+           decision=None):
+    return ('AVAILABLE', confidence) if whois_available else ('TAKEN', confidence)
+
+
+def test_every_task_is_recorded(monkeypatch):
+    async def check(domain, *args, **kwargs):
+        return TAKEN_CHECK
+
+    monkeypatch.setattr(async_engine, 'async_availability_check', check)
+    recorded = []
+    async_engine.run_async_checks([('alpha', '.com'), ('beta', '.io')], recorded.append, decide, concurrency=2)
+    assert sorted((result[0], result[1], result[7], result[10]) for result in recorded) == [
+        ('alpha', '.com', 'TAKEN', 1), ('beta', '.io', 'TAKEN', 1)]
+
+
+def test_check_that_raises_is_recorded_as_failed(monkeypatch):
+    async def check(domain, *args, **kwargs):
+        if domain == 'broken.com':
+            raise RuntimeError('unexpected reply')
+        return TAKEN_CHECK
+
+    monkeypatch.setattr(async_engine, 'async_availability_check', check)
+    recorded = []
+    async_engine.run_async_checks([('broken', '.com'), ('fine', '.com')], recorded.append, decide, concurrency=1)
+    failed = [result for result in recorded if result[0] == 'broken']
+    assert len(recorded) == 2 and len(failed) == 1
+    assert (failed[0][3], failed[0][7], failed[0][9]) == ('LOW', 'TAKEN', 'NOT_CHECKED')
+
+
+def test_check_that_raises_is_retried(monkeypatch):
+    calls = []
+
+    async def check(domain, *args, **kwargs):
+        calls.append(domain)
+        if len(calls) == 1:
+            raise OSError('connection reset')
+        return TAKEN_CHECK
+
+    monkeypatch.setattr(async_engine, 'async_availability_check', check)
+    recorded = []
+    async_engine.run_async_checks([('alpha', '.example')], recorded.append, decide, concurrency=1,
+                                  retry_policy=RetryPolicy(max_attempts=3, base_delay=0.01))
+    assert calls == ['alpha.example', 'alpha.example']
+    assert [(result[3], result[10]) for result in recorded] == [('HIGH', 2)]
@@ -0,0 +1,63 @@
+"""
+Round trip of the DCRES2 binary results format.
+"""
+import os
+
+from binary_results import BinaryResultsWriter, BinaryResultsReader, MAGIC
+
+TLDS = ['.com', '.io']
+
+RESULTS = [
+    ('alpha', '.com', False, 'HIGH', True, {'NS': True, 'A': True}, True, 'TAKEN', 'HIGH', 'API_NOT_CONFIGURED', 1, None),
+    ('alpha', '.io', True, 'HIGH', False, {}, False, 'AVAILABLE', 'HIGH', 'AVAILABLE', 2, None),
+    ('beta', '.com', False, 'NOT_CHECKED', True, {'NS': True}, False, 'TAKEN', 'HIGH', 'API_NOT_CONFIGURED', 1,
+     'decided by DNS'),
+    ('beta', '.io', False, 'N/A', False, {}, False, 'INVALID', 'VERY HIGH', 'NOT_CHECKED', 0, 'reserved name'),
+]
+
+
+def write(path, chunk_rows=1000, summary=True):
+    writer = BinaryResultsWriter(path, TLDS, chunk_rows=chunk_rows)
+    for result in RESULTS:
+        writer.append(result)
+    if summary:
+        writer.add_summary_row('alpha', ['TAKEN', 'AVAILABLE'])
+        writer.add_summary_row('beta', ['TAKEN', ''])
+    writer.close()
+
+
+def test_round_trip(tmp_path):
+    path = os.path.join(tmp_path, 'results.dcr')
+    write(path)
+    with open(path, 'rb') as f:
+        assert f.read(len(MAGIC)) == MAGIC
+    with BinaryResultsReader(path) as reader:
+        assert reader.tlds == TLDS
+        assert len(reader) == len(RESULTS)
+        assert list(reader.results()) == RESULTS
+        assert list(reader.summary_rows()) == [('alpha', ['TAKEN', 'AVAILABLE']), ('beta', ['TAKEN', ''])]
+
+
+def test_round_trip_across_chunks(tmp_path):
+    path = os.path.join(tmp_path, 'results.dcr')
+    write(path, chunk_rows=1)
+    with BinaryResultsReader(path) as reader:
+        assert len(list(reader.chunks())) > 1
+        assert list(reader.results()) == RESULTS
+
+
+def test_filters(tmp_path):
+    path = os.path.join(tmp_path, 'results.dcr')
+    write(path)
+    with BinaryResultsReader(path) as reader:
+        assert [r[:2] for r in reader.results(status='TAKEN')] == [('alpha', '.com'), ('beta', '.com')]
+        assert [r[:2] for r in reader.results(tld='.io', confidence='HIGH')] == [('alpha', '.io')]
+
+
+def test_torn_last_chunk_is_ignored(tmp_path):
+    path = os.path.join(tmp_path, 'results.dcr')
+    write(path, chunk_rows=2, summary=False)
+    with open(path, 'rb+') as f:
+        f.truncate(os.path.getsize(path) - 3)
+    with BinaryResultsReader(path) as reader:
+        assert list(reader.results()) == RESULTS[:2]
@@ -0,0 +1,86 @@
+"""
+Stage order parsing and the early-exit policy of the check pipeline.
+"""
+import pytest
+
+from check_pipeline import (DEFAULT_PIPELINE, LEGACY_PIPELINE, decision_note, new_state,
+                            parse_min_confidence, parse_pipeline, result_tuple, settle,
+                            stage_applicable)
+
+
+def test_parse_pipeline():
+    assert parse_pipeline(None) == DEFAULT_PIPELINE
+    assert parse_pipeline(' Legacy ') == LEGACY_PIPELINE
+    assert parse_pipeline('WHOIS, dns,whois') == ['whois', 'dns']
+
+
+@pytest.mark.parametrize('spec', ['dns,whois,ftp', 'dns,api', ','])
+def test_parse_pipeline_rejects_bad_specs(spec):
+    with pytest.raises(ValueError):
+        parse_pipeline(spec)
+
+
+def test_parse_min_confidence():
+    assert parse_min_confidence('very_high') == 'VERY HIGH'
+    assert parse_min_confidence(' medium') == 'MEDIUM'
+    with pytest.raises(ValueError):
+        parse_min_confidence('certain')
+
+
+def test_delegated_name_is_settled_by_dns():
+    state = new_state()
+    state['dns_details'] = {'NS': ['ns1.example.net']}
+    assert settle('dns', state, 'HIGH')
+    assert result_tuple(state) == (False, 'NOT_CHECKED', False, {'NS': ['ns1.example.net']}, False,
+                                   'API_NOT_CONFIGURED', ('dns', 'TAKEN', 'HIGH'))
+    assert decision_note(state['decision']) == 'decided by DNS'
+
+
+def test_dns_verdict_below_the_minimum_confidence_keeps_going():
+    state = new_state()
+    state['dns_details'] = {'SOA': ['ns1.example.net']}
+    assert not settle('dns', state, 'VERY HIGH')
+    assert state['decision'] is None
+
+
+def test_dns_does_not_override_a_whois_answer():
+    state = new_state()
+    state.update(whois_available=True, confidence='HIGH', dns_details={'NS': ['ns1.example.net']})
+    assert not settle('dns', state, 'LOW')
+
+
+def test_whois_taken_stops_without_a_decision():
+    state = new_state()
+    state.update(whois_available=False, confidence='HIGH')
+    assert settle('whois', state, 'HIGH')
+    assert result_tuple(state)[6] is None
+    assert decision_note(None) is None
+
+
+def test_api_answer_settles_the_check():
+    state = new_state()
+    state.update(whois_available=True, confidence='MEDIUM', registrar_status='PREMIUM')
+    assert settle('api', state, 'HIGH')
+    assert state['decision'] == ('api', 'PREMIUM', 'HIGH')
+    assert result_tuple(state)[:2] == (True, 'MEDIUM')
+
+
+def test_stage_applicable():
+    state = new_state()
+    assert not stage_applicable('http', state, api_configured=True)
+    assert stage_applicable('api', state, api_configured=True)
+    assert not stage_applicable('api', state, api_configured=False)
+
+    state.update(dns_active=True, whois_available=True, confidence='MEDIUM')
+    assert stage_applicable('http', state, api_configured=True)
+    assert not stage_applicable('api', state, api_configured=True)
+    state['confidence'] = 'HIGH'
+    assert stage_applicable('api', state, api_configured=True)
+
+    state['whois_available'] = False
+    assert not stage_applicable('http', state, api_configured=True)
+    assert not stage_applicable('api', state, api_configured=True)
+
+
+def test_unsettled_check_without_whois_is_low_confidence():
+    assert result_tuple(new_state())[:2] == (False, 'LOW')
@@ -0,0 +1,49 @@
+"""
+Checkpoint writing and --resume.
+"""
+import json
+import os
+
+from checkpoint import Checkpoint
+
+
+def test_resume_returns_finished_checks(tmp_path, make_result):
+    path = os.path.join(tmp_path, 'output', 'checkpoint.jsonl')
+    checkpoint = Checkpoint(path)
+    assert checkpoint.open() == {}
+    checkpoint.append(make_result('Alpha', '.com'))
+    checkpoint.append(make_result('beta', '.io', 'AVAILABLE'))
+    checkpoint.close()
+
+    checkpoint = Checkpoint(path)
+    completed = checkpoint.open(resume=True)
+    checkpoint.close()
+    assert set(completed) == {'alpha.com', 'beta.io'}
+    assert completed['beta.io'][7] == 'AVAILABLE'
+    assert completed['alpha.com'] == make_result('Alpha', '.com')
+
+
+def test_torn_last_line_is_ignored_and_closed_off(tmp_path, make_result):
+    path = os.path.join(tmp_path, 'checkpoint.jsonl')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(list(make_result('alpha', '.com'))) + '\n')
+        f.write('["beta", ".com", fal')
+
+    checkpoint = Checkpoint(path)
+    assert set(checkpoint.open(resume=True)) == {'alpha.com'}
+    checkpoint.append(make_result('gamma', '.com'))
+    checkpoint.close()
+    assert set(Checkpoint.load(path)) == {'alpha.com', 'gamma.com'}
+
+
+def test_normal_run_starts_fresh(tmp_path, make_result):
+    path = os.path.join(tmp_path, 'checkpoint.jsonl')
+    checkpoint = Checkpoint(path)
+    checkpoint.open()
+    checkpoint.append(make_result('alpha', '.com'))
+    checkpoint.close()
+
+    checkpoint = Checkpoint(path)
+    assert checkpoint.open() == {}
+    checkpoint.close()
+    assert Checkpoint.load(path) == {}
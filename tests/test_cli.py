@@ -0,0 +1,64 @@
+"""
+Settings validation and exit codes of the command line entry point.
+"""
+import importlib
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def fresh_settings(monkeypatch, tmp_path):
+    """Run from an empty folder (no .env) and restore the settings afterwards."""
+    monkeypatch.chdir(tmp_path)
+    yield
+    monkeypatch.undo()
+    main.load_settings()
+
+
+@pytest.mark.parametrize('variable, value', [
+    ('DOMAIN_CHECKER_PIPELINE', 'dns,ftp'),
+    ('DOMAIN_CHECKER_HTTP_MODE', 'slow'),
+    ('DOMAIN_CHECKER_DNS_MODE', 'bogus'),
+    ('DOMAIN_CHECKER_MODE', 'bogus'),
+    ('DOMAIN_CHECKER_MAX_WORKERS', 'ten'),
+])
+def test_invalid_setting_is_rejected_by_cli_only(monkeypatch, fresh_settings, capsys, variable, value):
+    monkeypatch.setenv(variable, value)
+    importlib.reload(main)
+    assert (main.EXECUTION_MODE, main.DNS_CHECK_MODE, main.HTTP_CHECK_MODE) == ('threaded', 'full', 'full')
+    assert main.NUM_WORKERS == 50
+
+    assert main.cli(['--merge', '1']) == 2
+    assert variable in capsys.readouterr().out
+
+    with pytest.raises(SystemExit) as exit:
+        main.cli(['--help'])
+    assert exit.value.code == 0
+
+
+def test_valid_settings_are_read(monkeypatch, fresh_settings):
+    monkeypatch.setenv('DOMAIN_CHECKER_DNS_MODE', 'FAST')
+    monkeypatch.setenv('DOMAIN_CHECKER_MODE', 'async')
+    main.load_settings()
+    assert (main.DNS_CHECK_MODE, main.EXECUTION_MODE) == ('fast', 'async')
+
+
+def test_failed_shard_process_fails_the_run(monkeypatch, fresh_settings):
+    class Process:
+        def __init__(self, command, env):
+            self.status = 1 if command[command.index('--shard') + 1] == '2/3' else 0
+
+        def wait(self):
+            return self.status
+
+    monkeypatch.setattr(main.subprocess, 'Popen', Process)
+    monkeypatch.setattr(main, 'merge', lambda count: pytest.fail('nothing to merge after a failed shard'))
+    assert main.cli(['--processes', '3']) == 1
+
+    monkeypatch.setattr(main.subprocess, 'Popen', lambda command, env: Process(['--shard', '1/3'], env))
+    monkeypatch.setattr(main, 'merge', lambda count: False)
+    assert main.cli(['--processes', '3']) == 1
+    monkeypatch.setattr(main, 'merge', lambda count: True)
+    assert main.cli(['--processes', '3']) == 0
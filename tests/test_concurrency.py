@@ -0,0 +1,96 @@
+"""
+Adaptive (AIMD) per-upstream concurrency limits.
+"""
+import asyncio
+import threading
+
+import concurrency
+from concurrency import AIMDLimiter, ConcurrencyController, INITIAL_LIMIT
+
+
+def run_requests(limiter, count, latency=0.01, outcome='ok'):
+    for _ in range(count):
+        limiter.acquire()
+        limiter.release(latency, outcome)
+
+
+def test_slow_start_grows_by_one_per_response():
+    limiter = AIMDLimiter('whois.example', ceiling=32)
+    run_requests(limiter, 5)
+    assert limiter.allowed == INITIAL_LIMIT + 5
+
+
+def test_limit_never_exceeds_the_ceiling():
+    limiter = AIMDLimiter('whois.example', ceiling=4)
+    run_requests(limiter, 50)
+    assert limiter.allowed == 4
+
+
+def test_error_halves_the_limit_and_ends_slow_start():
+    limiter = AIMDLimiter('whois.example', ceiling=32, initial=16)
+    run_requests(limiter, 1, outcome='throttled')
+    assert limiter.allowed == 8
+    assert not limiter.slow_start
+    run_requests(limiter, 9)
+    assert limiter.allowed == 9   # additive increase: about one per round trip of 8-9 requests
+
+
+def test_decreases_are_held_off(monkeypatch):
+    limiter = AIMDLimiter('whois.example', ceiling=32, initial=16)
+    run_requests(limiter, 3, outcome='error')
+    assert limiter.allowed == 8
+    monkeypatch.setattr(concurrency, 'DECREASE_HOLDOFF', 0.0)
+    run_requests(limiter, 1, outcome='error')
+    assert limiter.allowed == 4
+
+
+def test_slow_response_shrinks_the_limit():
+    limiter = AIMDLimiter('whois.example', ceiling=32, initial=10)
+    run_requests(limiter, 1, latency=0.1)
+    run_requests(limiter, 1, latency=1.0)
+    assert limiter.allowed == 9   # 11 * 0.9
+
+
+def test_acquire_waits_for_a_free_slot():
+    limiter = AIMDLimiter('whois.example', ceiling=1, initial=1)
+    limiter.acquire()
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.1)
+    limiter.release(0.01)
+    assert acquired.wait(2)
+    thread.join()
+
+
+def test_async_acquire_waits_for_a_free_slot():
+    async def scenario():
+        limiter = AIMDLimiter('whois.example', ceiling=1, initial=1)
+        await limiter.async_acquire()
+        waiting = asyncio.ensure_future(limiter.async_acquire())
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        limiter.release(0.01)
+        await asyncio.wait_for(waiting, 2)
+        assert limiter.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_slot_reports_exceptions_as_errors():
+    controller = ConcurrencyController(ceiling=32)
+    for _ in range(3):
+        with controller.slot('Whois.Example'):
+            pass
+    try:
+        with controller.slot('whois.example'):
+            raise OSError('connection refused')
+    except OSError:
+        pass
+    assert controller.limits() == {'whois.example': (INITIAL_LIMIT + 3) // 2}
+
+
+def test_ceiling_is_split_between_local_processes(monkeypatch):
+    monkeypatch.setenv('DOMAIN_CHECKER_MAX_PER_SERVER', '32')
+    monkeypatch.setenv('DOMAIN_CHECKER_LOCAL_PROCESSES', '4')
+    assert ConcurrencyController().limiter('whois.example').ceiling == 8
@@ -0,0 +1,195 @@
+"""
+The caching DNS resolver: negative caching, TTLs and upstream failover,
+with the upstream resolvers replaced by scripted answers.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import dns.exception
+import dns.message
+import dns.name
+import dns.resolver
+import dns.rrset
+import pytest
+
+import dns_cache
+from dns_cache import CachingResolver, is_upstream_failure, negative_ttl, parse_upstreams
+
+
+class ScriptedResolver:
+    """Stands in for dns.resolver.Resolver: answers from a dict, counts queries."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.queries = []
+
+    def resolve(self, qname, rdtype):
+        self.queries.append((qname, rdtype))
+        answer = self.answers[(qname, rdtype)]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+class AsyncScriptedResolver(ScriptedResolver):
+    async def resolve(self, qname, rdtype):
+        return ScriptedResolver.resolve(self, qname, rdtype)
+
+
+def soa_response(qname, soa_ttl, minimum):
+    response = dns.message.make_response(dns.message.make_query(qname, 'A'))
+    response.authority.append(dns.rrset.from_text(
+        qname.split('.', 1)[-1] + '.', soa_ttl, 'IN', 'SOA',
+        f'a.nic.example. hostmaster.nic.example. 1 1800 900 604800 {minimum}'))
+    return response
+
+
+def nxdomain(qname, response=None):
+    name = dns.name.from_text(qname)
+    return dns.resolver.NXDOMAIN(qnames=[name], responses={name: response} if response else None)
+
+
+def answer(ttl):
+    return SimpleNamespace(rrset=SimpleNamespace(ttl=ttl))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(dns_cache.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def make_resolver(*scripts, **kwargs):
+    resolver = CachingResolver(upstreams=[(f'192.0.2.{i + 1}', 53) for i in range(len(scripts))], **kwargs)
+    resolver._configure()
+    for upstream, answers in zip(resolver.upstreams, scripts):
+        upstream.resolver = ScriptedResolver(answers)
+        upstream.async_resolver = AsyncScriptedResolver(answers)
+    return resolver
+
+
+def test_parse_upstreams():
+    assert parse_upstreams('1.1.1.1, 9.9.9.9:5353,[2606:4700::1111]:53,2001:db8::1') == [
+        ('1.1.1.1', 53), ('9.9.9.9', 5353), ('2606:4700::1111', 53), ('2001:db8::1', 53)]
+    assert parse_upstreams('') == []
+
+
+def test_negative_ttl_is_the_smaller_of_soa_ttl_and_minimum():
+    assert negative_ttl(soa_response('foo.example', 3600, 120)) == 120
+    assert negative_ttl(soa_response('foo.example', 60, 900)) == 60
+    assert negative_ttl(dns.message.make_response(dns.message.make_query('foo.example', 'A'))) \
+        == dns_cache.NEGATIVE_TTL
+    assert negative_ttl(None) == dns_cache.NEGATIVE_TTL
+
+
+def test_positive_answer_is_cached_for_its_ttl(clock):
+    resolver = make_resolver({('foo.example', 'A'): answer(30)})
+    first = resolver.resolve('Foo.Example.')
+    assert resolver.resolve('foo.example') is first
+    clock[0] += 31
+    resolver.resolve('foo.example')
+    assert len(resolver.upstreams[0].resolver.queries) == 2
+    assert (resolver.hits, resolver.misses) == (1, 2)
+
+
+def test_nxdomain_is_cached_for_the_negative_ttl_and_all_record_types(clock):
+    resolver = make_resolver({('gone.example', 'A'): nxdomain('gone.example', soa_response('gone.example', 3600, 90))})
+    with pytest.raises(dns.resolver.NXDOMAIN):
+        resolver.resolve('gone.example')
+    with pytest.raises(dns.resolver.NXDOMAIN):
+        resolver.resolve('gone.example', 'MX')
+    assert resolver.upstreams[0].resolver.queries == [('gone.example', 'A')]
+
+    clock[0] += 91
+    with pytest.raises(dns.resolver.NXDOMAIN):
+        resolver.resolve('gone.example')
+    assert len(resolver.upstreams[0].resolver.queries) == 2
+
+
+def test_nxdomain_without_soa_uses_the_default_negative_ttl(clock):
+    resolver = make_resolver({('gone.example', 'A'): nxdomain('gone.example')})
+    with pytest.raises(dns.resolver.NXDOMAIN):
+        resolver.resolve('gone.example')
+    expires = resolver.cache[('gone.example', dns_cache.NXDOMAIN_KEY)][0]
+    assert expires == clock[0] + dns_cache.NEGATIVE_TTL
+
+
+def test_no_answer_is_cached_only_for_its_record_type(clock):
+    resolver = make_resolver({
+        ('mail.example', 'MX'): dns.resolver.NoAnswer(response=soa_response('mail.example', 600, 600)),
+        ('mail.example', 'A'): answer(300),
+    })
+    for _ in range(2):
+        with pytest.raises(dns.resolver.NoAnswer):
+            resolver.resolve('mail.example', 'MX')
+    resolver.resolve('mail.example', 'A')
+    assert resolver.upstreams[0].resolver.queries == [('mail.example', 'MX'), ('mail.example', 'A')]
+
+
+def test_timeouts_are_not_cached_and_fail_over(clock):
+    resolver = make_resolver({('foo.example', 'A'): dns.exception.Timeout()},
+                             {('foo.example', 'A'): answer(60)})
+    assert resolver.resolve('foo.example').rrset.ttl == 60
+    assert resolver.upstreams[0].failures == 1
+    assert resolver.upstreams[1].failures == 0
+
+
+def test_timeout_on_every_upstream_is_raised_and_not_cached(clock):
+    failing = {('foo.example', 'A'): dns.exception.Timeout()}
+    resolver = make_resolver(failing, failing)
+    with pytest.raises(dns.exception.Timeout):
+        resolver.resolve('foo.example')
+    assert resolver.cache == {}
+
+
+def test_failing_upstream_is_skipped_for_a_while(clock, capsys):
+    names = [f'n{i}.example' for i in range(dns_cache.FAILURE_THRESHOLD + 2)]
+    resolver = make_resolver({(name, 'A'): dns.exception.Timeout() for name in names},
+                             {(name, 'A'): answer(60) for name in names})
+    failing = resolver.upstreams[0]
+    for name in names[:dns_cache.FAILURE_THRESHOLD]:
+        resolver.resolve(name)
+    assert failing.down_until == clock[0] + dns_cache.DOWN_TIME
+    assert 'is not answering' in capsys.readouterr().out
+
+    resolver.resolve(names[-2])
+    assert len(failing.resolver.queries) == dns_cache.FAILURE_THRESHOLD
+    clock[0] += dns_cache.DOWN_TIME
+    resolver.resolve(names[-1])
+    assert len(failing.resolver.queries) == dns_cache.FAILURE_THRESHOLD + 1
+
+
+def test_servfail_is_not_an_upstream_failure():
+    query = dns.message.make_query('foo.example', 'A')
+    servfail = dns.message.make_response(query)
+    answered = dns.resolver.NoNameservers(request=query, errors=[('192.0.2.1', False, 53, 'SERVFAIL', servfail)])
+    silent = dns.resolver.NoNameservers(request=query, errors=[('192.0.2.1', False, 53, dns.exception.Timeout(), None)])
+    assert not is_upstream_failure(answered)
+    assert is_upstream_failure(silent)
+    assert is_upstream_failure(dns.exception.Timeout())
+    assert not is_upstream_failure(nxdomain('foo.example'))
+
+
+def test_least_recently_used_entries_are_evicted(clock):
+    resolver = make_resolver({(name, 'A'): answer(300) for name in ('a.example', 'b.example', 'c.example')},
+                             max_entries=2)
+    resolver.resolve('a.example')
+    resolver.resolve('b.example')
+    resolver.resolve('a.example')
+    resolver.resolve('c.example')
+    assert list(resolver.cache) == [('a.example', 'A'), ('c.example', 'A')]
+
+
+def test_async_lookups_share_the_cache(clock):
+    resolver = make_resolver({('gone.example', 'A'): nxdomain('gone.example')})
+
+    async def main():
+        for rdtype in ('A', 'AAAA'):
+            with pytest.raises(dns.resolver.NXDOMAIN):
+                await resolver.async_resolve('gone.example', rdtype)
+
+    asyncio.run(main())
+    with pytest.raises(dns.resolver.NXDOMAIN):
+        resolver.resolve('gone.example')
+    assert resolver.upstreams[0].async_resolver.queries == [('gone.example', 'A')]
@@ -0,0 +1,76 @@
+"""
+Candidate names from pattern specs and word lists.
+"""
+import os
+
+import pytest
+
+from name_generator import (pluralize, parse_pattern, iter_combinations, count_combinations, name_filter,
+                            iter_generated_names)
+
+WORDLISTS = {'nouns': ['box', 'city', 'app'], 'adjectives': ['fast', 'blue']}
+
+
+def generate(pattern):
+    return list(iter_combinations(parse_pattern(pattern, WORDLISTS)))
+
+
+@pytest.mark.parametrize('word, plural', [('box', 'boxes'), ('city', 'cities'), ('day', 'days'), ('app', 'apps')])
+def test_pluralize(word, plural):
+    assert pluralize(word) == plural
+
+
+def test_word_lists_and_alternatives():
+    assert generate('(get|try){nouns}') == ['getbox', 'getcity', 'getapp', 'trybox', 'trycity', 'tryapp']
+    assert generate('{adjectives}(|-)hub') == ['fasthub', 'fast-hub', 'bluehub', 'blue-hub']
+    assert generate('{nouns:plural}') == ['boxes', 'cities', 'apps']
+    assert generate('plain') == ['plain']
+
+
+def test_count_combinations():
+    assert count_combinations(parse_pattern('{adjectives}(|-){nouns}', WORDLISTS)) == 12
+
+
+def test_unknown_list_or_modifier():
+    with pytest.raises(ValueError):
+        parse_pattern('{verbs}', WORDLISTS)
+    with pytest.raises(ValueError):
+        parse_pattern('{nouns:upper}', WORDLISTS)
+
+
+def test_name_filter():
+    accept = name_filter(min_length=3, max_length=8)
+    assert accept('box')
+    assert not accept('ab')
+    assert not accept('toolongname')
+    assert not accept('-box')
+    assert not accept('box-')
+    assert not accept('bo_x')
+
+
+def test_iter_generated_names(tmp_path):
+    patterns, wordlists = os.path.join(tmp_path, 'patterns'), os.path.join(tmp_path, 'wordlists')
+    os.makedirs(patterns)
+    os.makedirs(wordlists)
+    with open(os.path.join(wordlists, 'nouns.txt'), 'w', encoding='utf-8') as f:
+        f.write("# comment\nBox\ncity\nbox\n")
+    with open(os.path.join(patterns, 'a.txt'), 'w', encoding='utf-8') as f:
+        f.write("# comment\n(my|){nouns}\n{verbs}\n{nouns}_x\n")
+    names = list(iter_generated_names(patterns, wordlists, accept=name_filter(min_length=4)))
+    assert names == ['mybox', 'mycity', 'city']
+
+
+def test_literal_text_is_lowercased_but_list_names_are_kept(tmp_path):
+    assert list(iter_combinations(parse_pattern('(Get|MY){Nouns:Plural}HQ', {'Nouns': ['box']}))) == [
+        'getboxeshq', 'myboxeshq']
+    with pytest.raises(ValueError):
+        parse_pattern('{NOUNS}', WORDLISTS)
+
+    patterns, wordlists = os.path.join(tmp_path, 'patterns'), os.path.join(tmp_path, 'wordlists')
+    os.makedirs(patterns)
+    os.makedirs(wordlists)
+    with open(os.path.join(wordlists, 'TechWords.txt'), 'w', encoding='utf-8') as f:
+        f.write("Cloud\n")
+    with open(os.path.join(patterns, 'a.txt'), 'w', encoding='utf-8') as f:
+        f.write("Get{TechWords}\n")
+    assert list(iter_generated_names(patterns, wordlists)) == ['getcloud']
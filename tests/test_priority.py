@@ -0,0 +1,67 @@
+"""
+Best-first task order and --stop-after.
+"""
+from priority import AvailabilityModel, StopTracker, prioritize, task_key
+
+
+def test_model_without_history_scores_every_domain_alike():
+    model = AvailabilityModel()
+    assert model.score('alpha', '.com') == model.score('x', '.io') == 0.5
+
+
+def test_model_prefers_tlds_and_lengths_that_were_available():
+    model = AvailabilityModel({
+        ('.com', 5): (0, 50),
+        ('.io', 5): (20, 50),
+        ('.io', 12): (40, 50),
+    })
+    assert model.score('abcde', '.io') > model.score('abcde', '.com')
+    assert model.score('abcdefghijkl', '.io') > model.score('abcde', '.io')
+    # an unseen TLD scores between the good and the bad one
+    assert model.score('abcde', '.com') < model.score('abcde', '.net') < model.score('abcde', '.io')
+
+
+def test_model_from_cache():
+    class Cache:
+        def status_counts(self):
+            return {('.io', 3): (1, 1)}
+
+    assert AvailabilityModel.from_cache(Cache()).by_tld == {'.io': (1, 1)}
+    assert AvailabilityModel.from_cache(None).total == 0
+
+
+def test_tld_priority_comes_before_the_model():
+    model = AvailabilityModel({('.io', 4): (10, 10), ('.com', 4): (0, 10)})
+    key = task_key(model, {'.com': 1})
+    assert sorted([('beta', '.io'), ('beta', '.com')], key=key) == [('beta', '.com'), ('beta', '.io')]
+
+
+def test_prioritize_without_differences_keeps_input_order():
+    tasks = [(name, '.com') for name in 'abcdef']
+    assert list(prioritize(iter(tasks), task_key(AvailabilityModel()), window=3)) == tasks
+
+
+def test_prioritize_orders_within_the_window_only():
+    tasks = [5, 4, 3, 2, 1, 0]
+    assert list(prioritize(iter(tasks), lambda task: task, window=3)) == [2, 1, 0, 3, 4, 5]
+    assert list(prioritize(iter(tasks), lambda task: task, window=100)) == sorted(tasks)
+
+
+def test_prioritize_window_from_environment(monkeypatch):
+    monkeypatch.setenv('DOMAIN_CHECKER_PRIORITY_WINDOW', '0')
+    assert list(prioritize(iter([2, 1]), lambda task: task)) == [2, 1]
+
+
+def test_stop_tracker_skips_a_name_after_the_limit(make_result):
+    tracker = StopTracker(2)
+    tracker.record(make_result('Alpha', '.com', 'AVAILABLE'))
+    tracker.record(make_result('alpha', '.net', 'TAKEN'))
+    assert tracker.skip('alpha', '.io') is None
+
+    tracker.record(make_result('alpha', '.org', 'AVAILABLE'))
+    skipped = tracker.skip('ALPHA', '.io')
+    assert skipped[:2] == ('ALPHA', '.io')
+    assert skipped[7] == 'SKIPPED' and skipped[10] == 0
+    assert len(skipped) == len(make_result('alpha', '.io', note='n'))
+    assert tracker.skip('beta', '.io') is None
+    assert tracker.skipped == 1
@@ -0,0 +1,110 @@
+"""
+Per-server token buckets with throttle backoff.
+"""
+import os
+import threading
+import time
+
+import pytest
+
+import rate_limiter
+from rate_limiter import TokenBucket, RateLimiter, is_throttle_message, INITIAL_COOLDOWN
+
+
+@pytest.fixture
+def limits_file(tmp_path):
+    path = os.path.join(tmp_path, rate_limiter.DEFAULT_LIMITS_FILE)
+    os.makedirs(os.path.dirname(path))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("# key  rate  burst\n"
+                ".de            1   1\n"
+                "whois.nic.uk   2   4\n"
+                "whois.bad      x\n")
+    return path
+
+
+def test_throttle_messages():
+    assert is_throttle_message('%% Query rate limit exceeded, try again later')
+    assert is_throttle_message('WHOIS LIMIT EXCEEDED')
+    assert not is_throttle_message('Domain Name: EXAMPLE.COM')
+    assert not is_throttle_message(None)
+
+
+def test_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(rate=10, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    wait = bucket.reserve()
+    assert 0.05 < wait <= 0.1
+
+
+def test_throttle_halves_the_rate_and_blocks():
+    bucket = TokenBucket(rate=4, burst=1)
+    bucket.throttled()
+    assert bucket.rate == 2
+    assert bucket.reserve() >= INITIAL_COOLDOWN - 0.1
+    bucket.throttled()
+    assert bucket.rate == 1
+    assert bucket.cooldown == INITIAL_COOLDOWN * 2
+
+
+def test_rate_recovers_after_successes():
+    bucket = TokenBucket(rate=4, burst=1)
+    bucket.throttled()
+    for _ in range(10):
+        bucket.succeeded()
+    assert bucket.rate == 4
+    bucket.succeeded()
+    assert bucket.cooldown == 0.0
+
+
+def test_limits_file(limits_file, capsys):
+    limiter = RateLimiter()
+    assert limiter.load_limits(limits_file) == 2
+    assert 'Ignoring invalid rate limit line' in capsys.readouterr().out
+    assert limiter.bucket('whois.nic.uk').base_rate == 2
+    assert limiter.bucket('whois.denic.de', 'de').base_rate == 1
+    assert limiter.bucket('whois.other').base_rate == rate_limiter.DEFAULT_RATE
+    assert limiter.bucket('api.namecheap.com').base_rate == pytest.approx(20 / 60)
+
+
+def test_strictest_tld_limit_wins_on_a_shared_server(limits_file):
+    limiter = RateLimiter()
+    limiter.load_limits(limits_file)
+    assert limiter.bucket('whois.shared', 'com').base_rate == rate_limiter.DEFAULT_RATE
+    assert limiter.bucket('whois.shared', '.de').base_rate == 1
+
+
+def test_limits_are_split_between_local_processes(limits_file, monkeypatch):
+    monkeypatch.setenv('DOMAIN_CHECKER_LOCAL_PROCESSES', '2')
+    limiter = RateLimiter()
+    limiter.load_limits(limits_file)
+    bucket = limiter.bucket('whois.nic.uk')
+    assert (bucket.base_rate, bucket.burst) == (1, 2)
+
+
+def test_report_backs_off_a_throttling_server(capsys):
+    limiter = RateLimiter()
+    limiter.limits_loaded = True
+    limiter.report('whois.example', throttled=True)
+    assert limiter.bucket('whois.example').rate == rate_limiter.DEFAULT_RATE / 2
+    assert 'throttling' in capsys.readouterr().out
+
+
+def test_buckets_wait_for_the_limits_file(limits_file, monkeypatch):
+    exists = os.path.exists
+
+    def slow_exists(path):
+        time.sleep(0.1)   # a slow disk: other threads ask for buckets meanwhile
+        return exists(path)
+
+    monkeypatch.chdir(os.path.dirname(os.path.dirname(limits_file)))
+    monkeypatch.setattr(rate_limiter.os.path, 'exists', slow_exists)
+    limiter = RateLimiter()
+    rates = []
+    threads = [threading.Thread(target=lambda: rates.append(limiter.bucket('whois.nic.uk').base_rate))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert rates == [2] * 5
@@ -0,0 +1,77 @@
+"""
+Deferred retries: backoff per upstream server and the retry scheduler.
+"""
+import threading
+
+import retry
+from retry import RetryPolicy, RetryScheduler, failure_reason
+
+
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(retry.random, 'uniform', lambda low, high: high)
+
+
+def test_failure_reason():
+    assert failure_reason('LOW', 'API_NOT_CONFIGURED') == 'whois'
+    assert failure_reason('HIGH', 'ERROR_TIMEOUT') == 'api'
+    assert failure_reason('HIGH', 'TAKEN') is None
+    assert failure_reason('MEDIUM', 'API_AUTH_ERROR') is None
+
+
+def test_delay_grows_with_attempt_and_server_streak(monkeypatch):
+    no_jitter(monkeypatch)
+    policy = RetryPolicy(max_attempts=10, base_delay=1.0, max_delay=100.0)
+    assert policy.retry_delay('.example', 'LOW', 'NOT_CHECKED', 1) == ('whois', 1.0)
+    # a second domain on the same server already starts with a streak of one
+    assert policy.retry_delay('.example', 'LOW', 'NOT_CHECKED', 1) == ('whois', 2.0)
+    assert policy.retry_delay('.example', 'LOW', 'NOT_CHECKED', 2) == ('whois', 8.0)
+    # the streak is capped, the delay by max_delay
+    assert policy.retry_delay('.example', 'LOW', 'NOT_CHECKED', 8) == ('whois', 100.0)
+
+
+def test_success_resets_the_streak(monkeypatch):
+    no_jitter(monkeypatch)
+    policy = RetryPolicy(max_attempts=10, base_delay=1.0)
+    policy.retry_delay('.example', 'LOW', 'NOT_CHECKED', 1)
+    policy.retry_delay('.example', 'LOW', 'NOT_CHECKED', 1)
+    assert policy.retry_delay('.example', 'HIGH', 'NOT_CHECKED', 1) is None
+    assert policy.retry_delay('.example', 'LOW', 'NOT_CHECKED', 1) == ('whois', 1.0)
+
+
+def test_api_failures_are_tracked_apart_from_whois(monkeypatch):
+    no_jitter(monkeypatch)
+    policy = RetryPolicy(max_attempts=10, base_delay=1.0)
+    policy.retry_delay('.example', 'LOW', 'NOT_CHECKED', 1)
+    assert policy.retry_delay('.example', 'HIGH', 'ERROR_HTTP', 1) == ('api', 1.0)
+    assert policy.streaks == {'api.namecheap.com': 1}
+
+
+def test_last_attempt_is_recorded_as_it_is():
+    policy = RetryPolicy(max_attempts=2)
+    assert policy.retry_delay('.example', 'LOW', 'NOT_CHECKED', 1) is not None
+    assert policy.retry_delay('.example', 'LOW', 'NOT_CHECKED', 2) is None
+
+
+def test_max_attempts_from_environment(monkeypatch):
+    monkeypatch.setenv('DOMAIN_CHECKER_MAX_ATTEMPTS', '0')
+    assert RetryPolicy().max_attempts == 1
+
+
+def test_scheduler_dispatches_in_due_order():
+    dispatched = []
+    scheduler = RetryScheduler(dispatched.append)
+    scheduler.schedule('late', 0.2)
+    scheduler.schedule('early', 0.05)
+    assert scheduler.pending_count() == 2
+    scheduler.wait_dispatched()
+    assert dispatched == ['early', 'late']
+    assert scheduler.pending_count() == 0
+
+
+def test_scheduler_wakes_up_for_an_earlier_task():
+    dispatched = threading.Event()
+    scheduler = RetryScheduler(lambda task: dispatched.set())
+    scheduler.schedule('far', 60)
+    scheduler.schedule('near', 0.01)
+    assert dispatched.wait(5)
+    assert scheduler.pending_count() == 1
@@ -0,0 +1,124 @@
+"""
+The check service: job parsing, the worker pool and the HTTP API, with
+fake check and decide functions instead of network lookups.
+"""
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from retry import RetryPolicy
+from service import CheckService, parse_domain, parse_job, result_to_dict, serve_api
+
+TAKEN_CHECK = (False, 'HIGH', True, {'A': True, 'MX': False}, False, 'API_NOT_CONFIGURED', None)
+
+
+def decide(full_domain, whois_available, confidence, dns_active, dns_details, http_active, registrar_status,
+           decision=None):
+    return ('AVAILABLE', confidence) if whois_available else ('TAKEN', confidence)
+
+
+def test_parse_domain():
+    assert parse_domain(' Foo.Co.UK. ') == ('foo', '.co.uk')
+    for bad in ('foo', '.com', 'foo bar.com', 42):
+        with pytest.raises(ValueError):
+            parse_domain(bad)
+
+
+def test_parse_job():
+    assert parse_job({'domains': ['a.com', 'b.io']}) == [('a', '.com'), ('b', '.io')]
+    assert parse_job({'names': ['a', ' '], 'tlds': ['com', '.IO']}) == [('a', '.com'), ('a', '.io')]
+
+
+@pytest.mark.parametrize('body', [[], {}, {'domains': []}, {'domains': 'a.com'}, {'names': ['a']},
+                                  {'names': ['a'], 'tlds': [1]}])
+def test_parse_job_rejects_bad_bodies(body):
+    with pytest.raises(ValueError):
+        parse_job(body)
+
+
+def test_result_to_dict(make_result):
+    result = ('Foo', '.com', False, 'NOT_CHECKED', True, {'NS': True, 'A': False}, False, 'TAKEN', 'HIGH',
+              'API_NOT_CONFIGURED', 1, 'decided by DNS')
+    assert result_to_dict(result, 'check') == {
+        'domain': 'foo.com', 'status': 'TAKEN', 'confidence': 'HIGH', 'whois_available': None,
+        'whois_confidence': 'NOT_CHECKED', 'dns_active': True, 'dns_records': ['NS'], 'http_active': False,
+        'registrar_status': 'API_NOT_CONFIGURED', 'attempts': 1, 'note': 'decided by DNS', 'source': 'check',
+    }
+    assert result_to_dict(make_result('foo', '.com'), 'cache')['note'] == ''
+
+
+def test_job_is_checked_by_the_workers():
+    stored = []
+    service = CheckService(lambda domain: TAKEN_CHECK, decide, store=stored.append, workers=2).start()
+    job = service.submit([('alpha', '.com'), ('beta', '.com')])
+    while not job.done:
+        job.wait(len(job.results), 5)
+    assert sorted(result['domain'] for result in job.results) == ['alpha.com', 'beta.com']
+    assert {result['status'] for result in job.results} == {'TAKEN'}
+    assert len(stored) == 2
+    assert service.get(job.id) is job
+
+
+def test_rejected_and_known_domains_skip_the_queue(make_result):
+    def check(domain):
+        raise AssertionError('no lookup expected')
+
+    service = CheckService(check, decide,
+                           validate=lambda name, tld: make_result(name, tld, 'INVALID') if name == 'a' else None,
+                           lookup=lambda name, tld: make_result(name, tld, attempts=0))
+    job = service.submit([('a', '.com'), ('bb', '.com')])
+    assert job.done
+    assert [(result['status'], result['source']) for result in job.results] == [('INVALID', 'validation'),
+                                                                               ('TAKEN', 'zone')]
+
+
+def test_refresh_bypasses_the_lookup(make_result):
+    service = CheckService(lambda domain: TAKEN_CHECK, decide, workers=1,
+                           lookup=lambda name, tld: make_result(name, tld)).start()
+    job = service.submit([('alpha', '.com')], refresh=True)
+    assert job.wait(0, 5)[0]['source'] == 'check'
+
+
+def test_failed_check_is_retried_then_recorded():
+    calls = []
+
+    def check(domain):
+        calls.append(domain)
+        raise OSError('connection reset')
+
+    service = CheckService(check, decide, workers=1,
+                           retry_policy=RetryPolicy(max_attempts=2, base_delay=0.01)).start()
+    result = service.submit([('alpha', '.example')]).wait(0, 5)[0]
+    assert calls == ['alpha.example', 'alpha.example']
+    assert (result['status'], result['whois_confidence'], result['attempts']) == ('TAKEN', 'LOW', 2)
+
+
+def test_http_api():
+    service = CheckService(lambda domain: TAKEN_CHECK, decide, workers=1).start()
+    server = serve_api(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(base + '/check?domain=alpha.com', timeout=5) as response:
+            assert json.load(response)['status'] == 'TAKEN'
+
+        request = urllib.request.Request(base + '/jobs?stream=1', data=json.dumps({'domains': ['b.com', 'c.io']}).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            job_id = response.headers['X-Job-Id']
+            lines = [json.loads(line) for line in response.read().splitlines() if line.strip()]
+        assert sorted(line['domain'] for line in lines) == ['b.com', 'c.io']
+
+        with urllib.request.urlopen(f"{base}/jobs/{job_id}", timeout=5) as response:
+            assert json.load(response)['done'] is True
+
+        request = urllib.request.Request(base + '/jobs', data=b'{"domains": []}')
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(request, timeout=5)
+        assert error.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,91 @@
+"""
+Shard assignment and merging of shard output.
+"""
+import csv
+import os
+
+import pytest
+
+from csv_output import StreamingCSVWriter, SUMMARY_FILE, DETAILED_FILE, AVAILABLE_FILE
+from binary_results import BINARY_FILE, BinaryResultsReader, merge_binary
+from sharding import parse_shard, shard_of, shard_dir, find_shard_dirs, merge_shards
+
+TLDS = ['.com', '.net', '.org']
+NAMES = ['alpha', 'beta', 'gamma', 'delta', 'epsilon']
+
+
+def status_of(name):
+    return 'AVAILABLE' if len(name) % 2 else 'TAKEN'
+
+
+def write_shard(base, index, count, make_result, names=NAMES):
+    writer = StreamingCSVWriter(shard_dir(index, count, base), TLDS, binary=True)
+    for name in names:
+        tlds = [tld for tld in TLDS if shard_of(name + tld, count) == index]
+        writer.add_name(name, tlds)
+        for tld in tlds:
+            writer.write(make_result(name, tld, status_of(name)))
+    writer.close()
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def test_parse_shard():
+    assert parse_shard('2/4') == (2, 4)
+    for spec in ('0/4', '5/4', '1-4', ''):
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+
+def test_shards_are_disjoint_and_complete():
+    domains = [name + tld for name in NAMES for tld in TLDS]
+    shards = [shard_of(domain, 3) for domain in domains]
+    assert all(1 <= shard <= 3 for shard in shards)
+    assert shards == [shard_of(domain.upper(), 3) for domain in domains]
+
+
+def test_merge(tmp_path, make_result):
+    base = os.path.join(tmp_path, 'shards')
+    for index in (1, 2, 3):
+        write_shard(base, index, 3, make_result)
+    output = os.path.join(tmp_path, 'output')
+    counts = merge_shards(find_shard_dirs(3, base), output)
+
+    expected = [make_result(name, tld, status_of(name)) for name in NAMES for tld in TLDS]
+    assert counts['total'] == len(expected)
+    assert counts['available'] == sum(1 for r in expected if r[7] == 'AVAILABLE')
+
+    summary = read_csv(os.path.join(output, SUMMARY_FILE))
+    assert summary[0] == ['Domain Name'] + TLDS
+    assert summary[1:] == [[name] + [status_of(name)] * len(TLDS) for name in NAMES]
+    detailed = read_csv(os.path.join(output, DETAILED_FILE))
+    assert sorted(row[2] for row in detailed[1:]) == sorted(name + tld for name in NAMES for tld in TLDS)
+    assert len(read_csv(os.path.join(output, AVAILABLE_FILE))) == counts['available'] + 1
+
+    with BinaryResultsReader(os.path.join(output, BINARY_FILE)) as reader:
+        assert sorted(r[:2] for r in reader.results()) == sorted(r[:2] for r in expected)
+        assert [(name, cells) for name, cells in reader.summary_rows()] == [
+            (name, [status_of(name)] * len(TLDS)) for name in NAMES
+        ]
+
+
+def test_missing_shard(tmp_path, make_result):
+    base = os.path.join(tmp_path, 'shards')
+    write_shard(base, 1, 2, make_result)
+    with pytest.raises(FileNotFoundError):
+        find_shard_dirs(2, base)
+
+
+def test_truncated_shard_fails_the_merge(tmp_path, make_result):
+    base = os.path.join(tmp_path, 'shards')
+    write_shard(base, 1, 2, make_result)
+    write_shard(base, 2, 2, make_result, names=NAMES[:-1])
+    shard_dirs = find_shard_dirs(2, base)
+    with pytest.raises(ValueError, match='different numbers of rows'):
+        merge_shards(shard_dirs, os.path.join(tmp_path, 'output'))
+    with pytest.raises(ValueError, match='different numbers of summary rows'):
+        merge_binary([os.path.join(d, BINARY_FILE) for d in reversed(shard_dirs)],
+                     os.path.join(tmp_path, BINARY_FILE))
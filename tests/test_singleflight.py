@@ -0,0 +1,124 @@
+"""
+Single-flight de-duplication of concurrent lookups.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight, lookup_key
+
+
+def test_lookup_key_normalises_the_domain():
+    assert lookup_key('Foo.COM') == lookup_key(' foo.com.') == 'foo.com'
+
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def lookup(domain):
+        calls.append(domain)
+        started.set()
+        release.wait(5)
+        return domain + ' is taken'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('foo.com', lookup, 'foo.com')))
+    leader.start()
+    assert started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do('foo.com', lookup, 'foo.com')))
+                 for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while flight.shared < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert calls == ['foo.com']
+    assert results == ['foo.com is taken'] * 4
+    assert flight.calls == {}
+
+
+def test_exception_reaches_every_waiter_and_is_not_kept():
+    flight = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def failing():
+        release.wait(5)
+        raise TimeoutError('whois timed out')
+
+    def call():
+        try:
+            flight.do('foo.com', failing)
+        except TimeoutError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while flight.shared < 2:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(errors) == 3 and len(set(map(id, errors))) == 1
+    assert flight.do('foo.com', lambda: 'retried') == 'retried'
+
+
+def test_sequential_calls_are_not_cached():
+    flight = SingleFlight()
+    assert flight.do('foo.com', lambda: 1) == 1
+    assert flight.do('foo.com', lambda: 2) == 2
+    assert flight.shared == 0
+
+
+def test_coroutines_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def lookup(domain):
+        calls.append(domain)
+        await asyncio.sleep(0.05)
+        return domain + ' is free'
+
+    async def main():
+        return await asyncio.gather(*[flight.async_do('bar.io', lookup, 'bar.io') for _ in range(4)])
+
+    assert asyncio.run(main()) == ['bar.io is free'] * 4
+    assert calls == ['bar.io']
+
+
+def test_coroutine_waits_for_a_thread_without_blocking_the_loop():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def lookup():
+        started.set()
+        release.wait(5)
+        return 'from thread'
+
+    thread = threading.Thread(target=lambda: flight.do('baz.net', lookup))
+    thread.start()
+    assert started.wait(5)
+
+    async def never_called():
+        pytest.fail('the running lookup should have been joined')
+
+    async def main():
+        waiter = asyncio.ensure_future(flight.async_do('baz.net', never_called))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        release.set()
+        return await waiter
+
+    assert asyncio.run(main()) == 'from thread'
+    thread.join(5)
@@ -0,0 +1,56 @@
+"""
+The threaded worker pool of main.py, with the availability check replaced.
+"""
+import threading
+
+import pytest
+
+import main
+
+TAKEN_CHECK = (False, 'HIGH', True, {'NS': True}, False, 'API_NOT_CONFIGURED', None)
+
+
+@pytest.fixture
+def threaded(monkeypatch):
+    """Two worker threads, no stage preloading; returns the recorded results."""
+    recorded = []
+    monkeypatch.setattr(main, 'EXECUTION_MODE', 'threaded')
+    monkeypatch.setattr(main, 'NUM_WORKERS', 2)
+    monkeypatch.setattr(main, 'stop_tracker', None)
+    monkeypatch.setattr(main, 'preload_stage_modules', lambda api_configured: None)
+    monkeypatch.setattr(main, 'record_result', recorded.append)
+    return recorded
+
+
+def run_checks(tasks):
+    """main.run_checks, failing the test instead of hanging if a task is never finished."""
+    thread = threading.Thread(target=main.run_checks, args=(tasks, False), daemon=True)
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive(), 'run_checks is still waiting for a task'
+
+
+def test_check_that_raises_is_recorded_as_failed(monkeypatch, threaded):
+    monkeypatch.setenv('DOMAIN_CHECKER_MAX_ATTEMPTS', '1')
+
+    def check(domain):
+        if domain == 'broken.com':
+            raise RuntimeError('unexpected reply')
+        return TAKEN_CHECK
+
+    monkeypatch.setattr(main, 'enhanced_availability_check', check)
+    run_checks([('broken', '.com'), ('fine', '.com')])
+    assert sorted((result[0], result[3], result[7]) for result in threaded) == [
+        ('broken', 'LOW', 'TAKEN'), ('fine', 'HIGH', 'TAKEN')]
+
+
+def test_worker_survives_a_failure_to_record(monkeypatch, threaded):
+    def record_result(result):
+        if result[0] == 'alpha':
+            raise OSError('disk full')
+        threaded.append(result)
+
+    monkeypatch.setattr(main, 'enhanced_availability_check', lambda domain: TAKEN_CHECK)
+    monkeypatch.setattr(main, 'record_result', record_result)
+    run_checks([('alpha', '.com'), ('beta', '.com'), ('gamma', '.com')])
+    assert sorted(result[0] for result in threaded) == ['beta', 'gamma']
@@ -0,0 +1,68 @@
+"""
+Rejection of names that can't be registered under a TLD.
+"""
+import pytest
+
+from tld_policy import parse_tld_line, check_label, TLDPolicy, PolicyTable, rejected_result
+
+
+def test_parse_tld_line():
+    tld, options = parse_tld_line('.de  min_length=2 idn=yes reserved=nic,Whois priority=3')
+    assert tld == '.de'
+    assert options == {'min_length': 2, 'idn': True, 'reserved': frozenset({'nic', 'whois'}), 'priority': 3}
+    with pytest.raises(ValueError):
+        parse_tld_line('.de colour=blue')
+    with pytest.raises(ValueError):
+        parse_tld_line('.de min_length')
+
+
+@pytest.mark.parametrize('name, reason', [
+    ('good-name', None),
+    ('xn--bcher-kva', None),
+    ('', 'empty name'),
+    ('a' * 64, 'longer than 63 characters'),
+    ('under_score', 'invalid characters (only letters, digits and hyphens)'),
+    ('-dash', 'starts or ends with a hyphen'),
+    ('ab--cd', "'--' in the 3rd and 4th position"),
+])
+def test_check_label(name, reason):
+    assert check_label(name)[2] == reason
+
+
+def test_idn_label_is_converted():
+    label, idn, reason = check_label('Bücher')
+    assert (label, idn, reason) == ('xn--bcher-kva', True, None)
+
+
+def test_policy_problems():
+    policy = TLDPolicy.for_tld('.io', {'min_length': 3, 'idn': False, 'reserved': frozenset({'shop'})})
+    assert policy.problem('ab', 'ab', False)[0] == 'INVALID'
+    assert policy.problem('bücher', 'xn--bcher-kva', True)[0] == 'INVALID'
+    assert policy.problem('shop', 'shop', False) == ('RESERVED', 'reserved name')
+    assert policy.problem('nic', 'nic', False) == ('RESERVED', 'reserved name')
+    assert policy.problem('fine', 'fine', False) is None
+
+
+def test_builtin_policy():
+    assert TLDPolicy.for_tld('.EU').min_length == 2
+    assert TLDPolicy.for_tld('.eu', {'min_length': 4}).min_length == 4
+
+
+def test_table_groups_tlds_with_the_same_policy():
+    table = PolicyTable(['.com', '.net', '.io'], {'.io': {'min_length': 3}})
+    assert len(table.groups) == 2
+    assert table.check('ab') == {'.io': ('INVALID', 'shorter than 3 characters (TLD minimum)')}
+    assert table.check('www') == dict.fromkeys(['.com', '.net', '.io'], ('RESERVED', 'reserved name'))
+    assert set(table.check('-bad')) == {'.com', '.net', '.io'}
+    assert table.check('fine') == {}
+
+
+def test_check_domain_outside_the_run():
+    table = PolicyTable(['.com'])
+    assert table.check_domain('a', '.eu')[0] == 'INVALID'
+    assert table.check_domain('ab', '.eu') is None
+
+
+def test_rejected_result_is_not_a_lookup():
+    result = rejected_result('www', '.com', 'RESERVED', 'reserved name')
+    assert result[7] == 'RESERVED' and result[10] == 0 and result[11] == 'reserved name'
@@ -0,0 +1,89 @@
+"""
+Parsing and interpretation of WHOIS responses, and keepalive connections.
+"""
+import whois_client
+from whois_client import WhoisServer, parse_whois_response, interpret_whois_result, _finish, _query
+
+SERVER = WhoisServer('whois.example.invalid', '{domain}', False, None)
+
+REGISTERED = """Domain Name: EXAMPLE.COM
+Registrar: Example Registrar, Inc.
+Creation Date: 1995-08-14T04:00:00Z
+Registry Expiry Date: 2030-08-13T04:00:00Z
+Name Server: A.IANA-SERVERS.NET
+
+NOTICE: if the queried object is not found, no match is returned.
+"""
+
+
+def interpret(raw, domain='example.com'):
+    return interpret_whois_result(parse_whois_response(domain, SERVER, raw))[:2]
+
+
+def test_registered_domain_is_taken():
+    result = parse_whois_response('example.com', SERVER, REGISTERED)
+    assert result.registered and not result.not_found
+    assert result.registrar == 'Example Registrar, Inc.'
+    assert interpret(REGISTERED) == (False, 'HIGH')
+
+
+def test_not_found_phrase_in_footer_does_not_override_parsed_fields():
+    raw = REGISTERED + "\n>>> No match for other domains. Object not found. <<<\n"
+    assert interpret(raw) == (False, 'HIGH')
+
+
+def test_not_found_on_first_line_is_available():
+    assert interpret('No match for "FREE-NAME.COM".\r\n>>> Last update of whois database <<<\r\n',
+                     'free-name.com') == (True, 'HIGH')
+
+
+def test_not_found_after_comment_header_is_available():
+    raw = "% Copyright (c) the registry\n% Restricted rights.\n\nDomain: free-name.de\nStatus: free\n"
+    assert interpret(raw, 'free-name.de') == (True, 'HIGH')
+
+
+def test_not_found_phrase_far_down_is_ignored():
+    raw = "Domain Name: taken.io\n" + "Remark: x\n" * 10 + "not found\n"
+    assert interpret(raw, 'taken.io') == (False, 'HIGH')
+
+
+def test_empty_response_is_an_error():
+    for raw in ('', '\r\n  \n'):
+        result = _finish('example.com', SERVER, 'com', raw)
+        assert result.error
+        assert interpret_whois_result(result)[:2] == (False, 'LOW')
+
+
+class FakeSocket:
+    """Records what is sent and answers with the given chunks, then EOF."""
+
+    def __init__(self, *chunks):
+        self.chunks = list(chunks)
+        self.sent = []
+        self.closed = False
+
+    def settimeout(self, timeout):
+        pass
+
+    def sendall(self, data):
+        self.sent.append(data)
+
+    def recv(self, size):
+        return self.chunks.pop(0) if self.chunks else b''
+
+    def close(self):
+        self.closed = True
+
+
+def test_stale_keepalive_connection_is_retried_as_a_plain_query(monkeypatch):
+    server = WhoisServer('whois.example.invalid', '-k {domain}', True, b'\n\n\n')
+    stale = FakeSocket()
+    fresh = FakeSocket(b'Domain: example.de\n', b'Status: connect\n')
+    monkeypatch.setattr(whois_client, '_pool', {server.host: [stale]})
+    monkeypatch.setattr(whois_client, '_resolve', lambda host: ('192.0.2.1', 43))
+    monkeypatch.setattr(whois_client.socket, 'create_connection', lambda address, timeout: fresh)
+
+    assert _query(server, 'example.de') == 'Domain: example.de\nStatus: connect\n'
+    assert stale.sent == [b'-k example.de\r\n'] and stale.closed
+    assert fresh.sent == [b'example.de\r\n'] and fresh.closed
+    assert whois_client._pool == {server.host: []}
@@ -0,0 +1,166 @@
+"""
+TLD-aware pre-validation of candidate domains.
+
+Some name + TLD pairs can never be registered: the label breaks the DNS
+rules (over 63 characters, leading or trailing hyphen, characters other
+than letters, digits and hyphens, '--' in the 3rd and 4th position of a
+non-IDN label), the name is shorter than the TLD's minimum length, it
+is reserved, or it is an IDN in a TLD that does not take IDNs. Checking
+them anyway costs a rate-limited WHOIS query that usually fails in a
+confusing way and ends up as TAKEN/LOW.
+
+PolicyTable rejects such pairs before they are queued. The checks that
+only depend on the name run once per name; TLDs with the same policy
+are grouped, so the per-TLD checks run once per distinct policy rather
+than once per TLD. Rejected pairs get the status INVALID or RESERVED
+and the reason, which ends up in the Note column of the detailed CSV.
+
+Policies come from BUILTIN_POLICIES, overridden by options after the
+TLD in the files of input/top_level_domain:
+
+    .io   min_length=3
+    .de   idn=yes reserved=nic,whois
+    .ca   min_length=2 max_length=63 idn=no
+
+min_length counts characters of the name as written (so IDNs are counted
+in Unicode characters), max_length the characters of its xn-- form.
+`priority=N` is read from the same lines but used by priority.py.
+"""
+import re
+
+MAX_LABEL_LENGTH = 63
+
+VALID_LABEL = re.compile(r'[a-z0-9-]+')
+
+# Reserved in every gTLD by the ICANN registry agreement (and unavailable
+# in practice everywhere else)
+DEFAULT_RESERVED = frozenset({'example', 'nic', 'whois', 'www'})
+
+# TLD -> policy options known without any configuration
+BUILTIN_POLICIES = {
+    '.eu': {'min_length': 2},
+    '.ca': {'min_length': 2},
+}
+
+OPTION_TYPES = {
+    'min_length': int,
+    'max_length': int,
+    'idn': lambda value: value.lower() in ('1', 'yes', 'true'),
+    'reserved': lambda value: frozenset(word.strip().lower() for word in value.split(',') if word.strip()),
+    'priority': int,
+}
+POLICY_OPTIONS = ('min_length', 'max_length', 'idn', 'reserved')
+
+
+def parse_tld_line(line):
+    """
+    Split a line of a TLD file into (tld, options).
+    Raises ValueError for an unknown or malformed option.
+    """
+    fields = line.split()
+    tld, options = fields[0], {}
+    for field in fields[1:]:
+        key, sep, value = field.partition('=')
+        if not sep or key not in OPTION_TYPES:
+            raise ValueError(f"unknown TLD option '{field}' (expected {', '.join(OPTION_TYPES)})")
+        options[key] = OPTION_TYPES[key](value)
+    return tld, options
+
+
+def check_label(name):
+    """
+    Check a name against the DNS label rules that hold in every TLD.
+    Returns (ascii_label, is_idn, reason); reason is None if the label is fine.
+    """
+    label = name.strip().lower()
+    idn = not label.isascii()
+    if idn:
+        try:
+            label = label.encode('idna').decode('ascii')
+        except UnicodeError:
+            return label, idn, 'not a valid internationalised name'
+    if not label:
+        return label, idn, 'empty name'
+    if len(label) > MAX_LABEL_LENGTH:
+        return label, idn, f"longer than {MAX_LABEL_LENGTH} characters"
+    if VALID_LABEL.fullmatch(label) is None:
+        return label, idn, 'invalid characters (only letters, digits and hyphens)'
+    if label[0] == '-' or label[-1] == '-':
+        return label, idn, 'starts or ends with a hyphen'
+    if label[2:4] == '--':
+        if not label.startswith('xn--'):
+            return label, idn, "'--' in the 3rd and 4th position"
+        idn = True
+    return label, idn, None
+
+
+class TLDPolicy:
+    """Registration rules of one TLD."""
+
+    def __init__(self, min_length=1, max_length=MAX_LABEL_LENGTH, idn=True, reserved=DEFAULT_RESERVED):
+        self.min_length = min_length
+        self.max_length = min(max_length, MAX_LABEL_LENGTH)
+        self.idn = idn
+        self.reserved = reserved
+
+    @classmethod
+    def for_tld(cls, tld, options=None):
+        settings = dict(BUILTIN_POLICIES.get(tld.lower(), {}))
+        settings.update((key, value) for key, value in (options or {}).items() if key in POLICY_OPTIONS)
+        if 'reserved' in settings:
+            settings['reserved'] = DEFAULT_RESERVED | settings['reserved']
+        return cls(**settings)
+
+    def key(self):
+        return self.min_length, self.max_length, self.idn, self.reserved
+
+    def problem(self, name, label, idn):
+        """(status, reason) if a valid label can't be registered under this policy, else None."""
+        if len(name) < self.min_length:
+            return 'INVALID', f"shorter than {self.min_length} characters (TLD minimum)"
+        if len(label) > self.max_length:
+            return 'INVALID', f"longer than {self.max_length} characters (TLD maximum)"
+        if idn and not self.idn:
+            return 'INVALID', 'TLD does not accept internationalised names'
+        if label in self.reserved:
+            return 'RESERVED', 'reserved name'
+        return None
+
+
+class PolicyTable:
+    """Policies of the TLDs of a run; checks a name against all of them at once."""
+
+    def __init__(self, tlds, options=None):
+        options = options or {}
+        self.tlds = list(tlds)
+        self.policies = {tld: TLDPolicy.for_tld(tld, options.get(tld)) for tld in self.tlds}
+        groups = {}
+        for tld, policy in self.policies.items():
+            groups.setdefault(policy.key(), (policy, []))[1].append(tld)
+        self.groups = list(groups.values())
+
+    def check(self, name):
+        """Returns dict: tld -> (status, reason) for every TLD name can't be registered in."""
+        label, idn, reason = check_label(name)
+        if reason is not None:
+            return dict.fromkeys(self.tlds, ('INVALID', reason))
+        rejected = {}
+        for policy, tlds in self.groups:
+            problem = policy.problem(name.strip(), label, idn)
+            if problem is not None:
+                for tld in tlds:
+                    rejected[tld] = problem
+        return rejected
+
+    def check_domain(self, name, tld):
+        """(status, reason) if name can't be registered under tld (any TLD, not only the run's), else None."""
+        label, idn, reason = check_label(name)
+        if reason is not None:
+            return 'INVALID', reason
+        policy = self.policies.get(tld) or TLDPolicy.for_tld(tld)
+        return policy.problem(name.strip(), label, idn)
+
+
+def rejected_result(name, tld, status, reason):
+    """Result tuple of a candidate rejected without a lookup (12th field: the reason)."""
+    return (name, tld, False, 'N/A', False, {}, False, status, 'VERY HIGH', 'NOT_CHECKED', 0, reason)
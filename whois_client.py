@@ -0,0 +1,448 @@
+"""
+Built-in WHOIS client that talks to port 43 directly.
+
+Instead of letting python-whois work out the referral server on every
+call, the client keeps a TLD -> WHOIS server map:
+
+- a built-in table for common TLDs
+- optionally extended/overridden from a local IANA-style file
+  (input/whois_servers.txt, see load_whois_servers)
+- unknown TLDs are asked from whois.iana.org once and memoised for the
+  run; concurrent lookups of the same new TLD share one IANA query
+
+Servers that allow it (marked 'keepalive' in the server file) get their
+connections pooled and reused for several queries; every other server
+gets one short-lived connection per query, as the WHOIS protocol expects.
+
+Every query first takes a token from the shared per-server rate limiter
+(rate_limiter.py); throttle notices in a response make that server back off.
+The number of queries in flight per server is adapted by the shared AIMD
+controller (concurrency.py).
+
+Responses are parsed into a WhoisResult with an explicit not_found flag.
+The registration fields decide first; the not-found phrases only count
+when they are missing, and only in the first lines of the response (so
+a disclaimer saying "no match" further down does not make a registered
+domain available). An empty response is an error, not an answer.
+"""
+import asyncio
+import os
+import socket
+import threading
+from collections import namedtuple
+
+from rate_limiter import rate_limiter, is_throttle_message
+from concurrency import concurrency
+from singleflight import SingleFlight
+
+WHOIS_PORT = 43
+WHOIS_TIMEOUT = 10
+IANA_WHOIS_SERVER = 'whois.iana.org'
+DEFAULT_SERVER_FILE = os.path.join('input', 'whois_servers.txt')
+
+# How a server wants to be queried:
+# - query_format: text sent for a domain ({domain} is replaced)
+# - keepalive: connection may be reused for further queries
+# - terminator: end-of-response marker on kept-alive connections
+WhoisServer = namedtuple('WhoisServer', ['host', 'query_format', 'keepalive', 'terminator'])
+
+WhoisResult = namedtuple('WhoisResult', [
+    'domain', 'server', 'not_found', 'registered', 'registrar',
+    'creation_date', 'expiration_date', 'name_servers', 'raw', 'error', 'throttled'
+])
+
+# Built-in TLD -> WHOIS server map
+DEFAULT_WHOIS_SERVERS = {
+    'com': 'whois.verisign-grs.com',
+    'net': 'whois.verisign-grs.com',
+    'org': 'whois.publicinterestregistry.org',
+    'info': 'whois.identity.digital',
+    'biz': 'whois.nic.biz',
+    'io': 'whois.nic.io',
+    'co': 'whois.nic.co',
+    'ai': 'whois.nic.ai',
+    'me': 'whois.nic.me',
+    'us': 'whois.nic.us',
+    'xyz': 'whois.nic.xyz',
+    'online': 'whois.nic.online',
+    'site': 'whois.nic.site',
+    'store': 'whois.nic.store',
+    'shop': 'whois.nic.shop',
+    'tech': 'whois.nic.tech',
+    'company': 'whois.nic.company',
+    'agency': 'whois.nic.agency',
+    'app': 'whois.nic.google',
+    'dev': 'whois.nic.google',
+    'uk': 'whois.nic.uk',
+    'de': 'whois.denic.de',
+    'eu': 'whois.eu',
+    'nl': 'whois.domain-registry.nl',
+    'fr': 'whois.nic.fr',
+    'ca': 'whois.cira.ca',
+    'au': 'whois.auda.org.au',
+    'in': 'whois.registry.in',
+}
+
+# Servers that need a special query syntax
+QUERY_FORMATS = {
+    'whois.verisign-grs.com': 'domain {domain}',  # avoid partial/host matches
+    'whois.denic.de': '-T dn,ace {domain}',
+}
+
+# Phrases in a WHOIS response that mean the domain is not registered
+NOT_FOUND_PHRASES = [
+    'domain not found',
+    'no match',
+    'not found',
+    'no entries found',
+    'no data found',
+    'status: free',
+    'status: available',
+    'not registered',
+    'available for registration',
+    'the queried object does not exist',
+]
+# Not-found phrases are only looked for in this many leading lines
+# (comment lines starting with % or # are skipped)
+NOT_FOUND_SCAN_LINES = 5
+
+REGISTRAR_KEYS = ('registrar', 'sponsoring registrar', 'registrar name')
+CREATION_KEYS = ('creation date', 'created', 'created on', 'registered', 'registered on', 'domain registration date')
+EXPIRATION_KEYS = ('registry expiry date', 'expiry date', 'expiration date', 'expires', 'expires on', 'paid-till')
+NAME_SERVER_KEYS = ('name server', 'nserver', 'name servers')
+DOMAIN_KEYS = ('domain name', 'domain')
+
+_servers = {tld: WhoisServer(host, QUERY_FORMATS.get(host, '{domain}'), False, None)
+            for tld, host in DEFAULT_WHOIS_SERVERS.items()}
+_servers_lock = threading.Lock()
+_server_file_loaded = False
+_server_file_lock = threading.Lock()
+
+# host -> resolved address, so each query does not pay for a DNS lookup
+_addresses = {}
+
+# IANA referrals and server address lookups in progress
+_referrals = SingleFlight()
+
+# host -> idle sockets (keepalive servers only)
+_pool = {}
+_pool_lock = threading.Lock()
+
+
+def load_whois_servers(file_path=DEFAULT_SERVER_FILE):
+    """
+    Load TLD -> WHOIS server entries from a local file.
+
+    Two formats are accepted and can be mixed:
+
+    - one entry per line: "tld server [keepalive]"
+    - IANA record blocks with "domain:" and "whois:" lines
+
+    Lines starting with '#' are ignored. Returns the number of entries loaded.
+    """
+    if not os.path.exists(file_path):
+        return 0
+
+    loaded = 0
+    iana_domain = None
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            key, sep, value = line.partition(':')
+            if sep and key.strip().lower() in ('domain', 'whois'):
+                # IANA record block
+                if key.strip().lower() == 'domain':
+                    iana_domain = value.strip()
+                elif iana_domain and value.strip():
+                    set_whois_server(iana_domain, value.strip())
+                    loaded += 1
+                    iana_domain = None
+                continue
+
+            parts = line.split()
+            if len(parts) >= 2:
+                set_whois_server(parts[0], parts[1], keepalive='keepalive' in parts[2:])
+                loaded += 1
+    return loaded
+
+
+def set_whois_server(tld, host, keepalive=False):
+    """Register (or override) the WHOIS server used for a TLD."""
+    tld = tld.lstrip('.').lower()
+    host = host.lower()
+    query_format = QUERY_FORMATS.get(host, '{domain}')
+    terminator = None
+    if keepalive:
+        # RIPE-style persistent mode: '-k' prefix, responses end with two blank lines
+        query_format = '-k ' + query_format
+        terminator = b'\n\n\n'
+    with _servers_lock:
+        _servers[tld] = WhoisServer(host, query_format, keepalive, terminator)
+
+
+def _ensure_server_file():
+    global _server_file_loaded
+    if not _server_file_loaded:
+        # Other threads wait for the file instead of asking IANA meanwhile
+        with _server_file_lock:
+            if not _server_file_loaded:
+                load_whois_servers()
+                _server_file_loaded = True
+
+
+def _parse_iana_referral(response):
+    for line in response.splitlines():
+        key, _, value = line.partition(':')
+        if key.strip().lower() in ('refer', 'whois') and value.strip():
+            return value.strip()
+    return None
+
+
+def get_whois_server(tld):
+    """Return the WhoisServer for a TLD, asking IANA once if it is not known yet."""
+    _ensure_server_file()
+    tld = tld.lstrip('.').lower()
+    server = _servers.get(tld)
+    if server is not None or tld in _servers:
+        return server
+    return _referrals.do(('iana', tld), _ask_iana, tld)
+
+
+def _ask_iana(tld):
+    if tld in _servers:
+        return _servers[tld]  # answered while this caller was waiting
+    rate_limiter.acquire(IANA_WHOIS_SERVER)
+    host = _parse_iana_referral(_query(WhoisServer(IANA_WHOIS_SERVER, '{domain}', False, None), tld))
+    if host:
+        set_whois_server(tld, host)
+    else:
+        with _servers_lock:
+            _servers[tld] = None
+    return _servers[tld]
+
+
+def known_server_host(tld):
+    """Host of the WHOIS server already known for a TLD, or None (never queries IANA)."""
+    server = _servers.get(tld.lstrip('.').lower())
+    return server.host if server else None
+
+
+def _resolve(host):
+    address = _addresses.get(host)
+    if address is None:
+        address = _referrals.do(('address', host), _lookup_address, host)
+    return address
+
+
+def _lookup_address(host):
+    address = socket.getaddrinfo(host, WHOIS_PORT, type=socket.SOCK_STREAM)[0][4]
+    _addresses[host] = address
+    return address
+
+
+def _read_response(sock, terminator):
+    chunks = []
+    while True:
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        if terminator and b''.join(chunks[-2:]).endswith(terminator):
+            break
+    return b''.join(chunks).decode('utf-8', errors='replace')
+
+
+def _query(server, query, timeout=WHOIS_TIMEOUT):
+    """Send one query to a WHOIS server and return the raw response text."""
+    payload = server.query_format.format(domain=query).encode('idna') + b'\r\n'
+
+    sock = None
+    if server.keepalive:
+        with _pool_lock:
+            idle = _pool.get(server.host)
+            if idle:
+                sock = idle.pop()
+
+    reused = sock is not None
+    try:
+        if sock is None:
+            sock = socket.create_connection(_resolve(server.host), timeout=timeout)
+        sock.settimeout(timeout)
+        sock.sendall(payload)
+        response = _read_response(sock, server.terminator)
+        if reused and not response:
+            # An idle connection the server has closed reads as empty
+            raise ConnectionResetError('stale keepalive connection')
+    except OSError:
+        if sock is not None:
+            sock.close()
+        if reused:
+            # Server closed an idle connection - retry once on a fresh one,
+            # as a plain query (no '-k') that the server answers and closes
+            plain = server._replace(query_format=QUERY_FORMATS.get(server.host, '{domain}'),
+                                    keepalive=False, terminator=None)
+            return _query(plain, query, timeout)
+        raise
+
+    if server.keepalive and response:
+        with _pool_lock:
+            _pool.setdefault(server.host, []).append(sock)
+    else:
+        sock.close()
+    return response
+
+
+def _says_not_found(raw):
+    """True if one of the leading lines of a response has a not-found phrase."""
+    lines = [line.strip().lower() for line in raw.splitlines()]
+    lines = [line for line in lines if line and not line.startswith(('%', '#'))][:NOT_FOUND_SCAN_LINES]
+    return any(phrase in line for line in lines for phrase in NOT_FOUND_PHRASES)
+
+
+def parse_whois_response(domain, server, raw):
+    """Turn a raw WHOIS response into a WhoisResult."""
+    fields = {}
+    name_servers = []
+    for line in raw.splitlines():
+        key, sep, value = line.partition(':')
+        key = key.strip().lower()
+        value = value.strip()
+        if not sep or not value:
+            continue
+        if key in NAME_SERVER_KEYS:
+            name_servers.append(value.lower())
+        else:
+            fields.setdefault(key, value)
+
+    def first(keys):
+        for key in keys:
+            if key in fields:
+                return fields[key]
+        return None
+
+    registrar = first(REGISTRAR_KEYS)
+    creation_date = first(CREATION_KEYS)
+    has_domain_name = first(DOMAIN_KEYS) is not None
+    # A registrar or creation date means registered, whatever else the text says;
+    # a bare domain line is echoed by some registries for free names too
+    not_found = not (registrar or creation_date) and _says_not_found(raw)
+    registered = bool(registrar or creation_date or (has_domain_name and not not_found))
+
+    return WhoisResult(
+        domain=domain,
+        server=server,
+        not_found=not_found,
+        registered=registered,
+        registrar=registrar,
+        creation_date=creation_date,
+        expiration_date=first(EXPIRATION_KEYS),
+        name_servers=name_servers,
+        raw=raw,
+        error=None,
+        throttled=False
+    )
+
+
+def _error_result(domain, server, error, throttled=False):
+    return WhoisResult(domain, server, False, False, None, None, None, [], '', error, throttled)
+
+
+def _finish(domain, server, tld, raw):
+    """Report the response to the rate limiter and parse it."""
+    throttled = is_throttle_message(raw)
+    rate_limiter.report(server.host, throttled)
+    if throttled:
+        return _error_result(domain, server.host, 'Rate limited by WHOIS server', throttled=True)
+    if not raw.strip():
+        # Connection closed without an answer - not a sign the domain is free
+        return _error_result(domain, server.host, 'Empty WHOIS response')
+    return parse_whois_response(domain, server.host, raw)
+
+
+def whois_lookup(domain, timeout=WHOIS_TIMEOUT):
+    """
+    Look up a domain on its TLD's WHOIS server.
+    Returns a WhoisResult; network problems are reported in result.error.
+    """
+    domain = domain.strip().lower()
+    server = None
+    try:
+        tld = domain.rsplit('.', 1)[-1]
+        server = get_whois_server(tld)
+        if server is None:
+            return _error_result(domain, None, 'No WHOIS server known for this TLD')
+        with concurrency.slot(server.host) as slot:
+            rate_limiter.acquire(server.host, tld)
+            slot.start()
+            result = _finish(domain, server, tld, _query(server, domain, timeout))
+            if result.throttled:
+                slot.outcome = 'throttled'
+        return result
+    except Exception as e:
+        return _error_result(domain, server.host if server else None, str(e) or type(e).__name__)
+
+
+async def async_whois_lookup(domain, timeout=WHOIS_TIMEOUT):
+    """Non-blocking equivalent of whois_lookup using asyncio streams."""
+    domain = domain.strip().lower()
+    server = None
+    try:
+        _ensure_server_file()
+        tld = domain.rsplit('.', 1)[-1]
+        server = _servers.get(tld)
+        if server is None:
+            # Unknown TLD: the (memoised) IANA lookup runs once in a thread
+            server = await asyncio.to_thread(get_whois_server, tld)
+        if server is None:
+            return _error_result(domain, None, 'No WHOIS server known for this TLD')
+        async with concurrency.slot(server.host) as slot:
+            await rate_limiter.async_acquire(server.host, tld)
+            slot.start()
+
+            payload = server.query_format.format(domain=domain).encode('idna') + b'\r\n'
+            host, port = _addresses.get(server.host, (server.host, WHOIS_PORT))[:2]
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=timeout)
+            try:
+                writer.write(payload)
+                await writer.drain()
+                if server.terminator:
+                    data = await asyncio.wait_for(reader.readuntil(server.terminator), timeout=timeout)
+                else:
+                    data = await asyncio.wait_for(reader.read(), timeout=timeout)
+            finally:
+                writer.close()
+            result = _finish(domain, server, tld, data.decode('utf-8', errors='replace'))
+            if result.throttled:
+                slot.outcome = 'throttled'
+        return result
+    except Exception as e:
+        return _error_result(domain, server.host if server else None, str(e) or type(e).__name__)
+
+
+def interpret_whois_result(result):
+    """
+    Map a WhoisResult to the (is_available, confidence_level, details) tuple
+    used by the rest of the checker.
+    """
+    if result.error:
+        # If we can't determine, be conservative
+        return False, 'LOW', {'error': result.error[:100]}
+
+    if result.not_found:
+        # Registry explicitly says the domain does not exist
+        return True, 'HIGH', {'whois_message': 'Domain not found'}
+
+    if result.registered:
+        return False, 'HIGH', {
+            'domain_name': True,
+            'registrar': bool(result.registrar),
+            'creation_date': bool(result.creation_date),
+            'expiration_date': bool(result.expiration_date),
+            'name_servers': bool(result.name_servers)
+        }
+
+    # If no clear indicators, likely available
+    return True, 'MEDIUM', {}
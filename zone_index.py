@@ -0,0 +1,216 @@
+"""
+Preloaded index of registered domains, built from zone files.
+
+Registries publish their zones (e.g. the gTLD zone files from ICANN CZDS)
+and many bulk "registered domains" lists exist. `python main.py
+--import-zone FILE...` reads them into a compact index, and every domain
+found in it is reported as TAKEN with VERY HIGH confidence without any
+network I/O, so only the misses go to the live checks.
+
+The index is a sorted table of 64-bit hashes of the domain names
+(8 bytes per domain, about 800 MB for 100 million names). It is opened
+with mmap, so only the pages touched by the binary search are read and
+the index is shared between processes (see sharding.py). Two domains
+hashing to the same 64-bit value could make a free domain look taken;
+even with a billion names in the index the chance of that for a given
+lookup is below one in ten billion.
+
+Building sorts the hashes in chunks of BUILD_CHUNK_SIZE and merges the
+sorted runs from temporary files, so the input can be much larger than
+the available memory.
+
+Accepted input (plain or .gz):
+- zone files: the owner name (first column) of every record, with
+  $ORIGIN and relative names handled
+- domain lists: one domain per line
+"""
+import bisect
+import glob
+import gzip
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+
+DEFAULT_INDEX_PATH = os.path.join('cache', 'zone_index.idx')
+BUILD_CHUNK_SIZE = 5_000_000
+
+MAGIC = b'DCZONE1' + (b'L' if sys.byteorder == 'little' else b'B')
+HEADER = struct.Struct('=8sQd')  # magic, domain count, build time
+
+
+def normalize_domain(domain):
+    """Lowercase, strip the trailing dot and convert IDNs to their xn-- form."""
+    domain = domain.strip().rstrip('.').lower()
+    if not domain.isascii():
+        try:
+            domain = domain.encode('idna').decode('ascii')
+        except UnicodeError:
+            pass
+    return domain
+
+
+def domain_hash(domain):
+    digest = hashlib.blake2b(domain.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+def iter_zone_names(path):
+    """Yield the normalised domain names of a zone file or domain list."""
+    origin = ''
+    last_owner = None
+    with _open_text(path) as f:
+        for line in f:
+            if not line.strip() or line.lstrip().startswith(';') or line.startswith('#'):
+                continue
+            if line.startswith('$'):
+                parts = line.split()
+                if parts[0].upper() == '$ORIGIN' and len(parts) > 1:
+                    origin = normalize_domain(parts[1])
+                continue
+            if line[0].isspace():
+                continue  # record for the previous owner name
+
+            owner = line.split(None, 1)[0]
+            if owner == '@':
+                continue  # the zone apex, i.e. the TLD itself
+            if not owner.endswith('.') and origin:
+                owner = owner + '.' + origin  # relative name in a zone file
+            domain = normalize_domain(owner)
+            if domain and '.' in domain and domain != last_owner:
+                last_owner = domain  # records of one owner are usually adjacent
+                yield domain
+
+
+def iter_input_files(paths):
+    """Expand folders into the files they contain."""
+    for path in paths:
+        if os.path.isdir(path):
+            for file_path in sorted(glob.glob(os.path.join(path, '*'))):
+                if os.path.isfile(file_path):
+                    yield file_path
+        else:
+            yield path
+
+
+def _write_run(hashes, directory):
+    hashes = array('Q', sorted(hashes))
+    f = tempfile.TemporaryFile(dir=directory)
+    hashes.tofile(f)
+    f.seek(0)
+    return f
+
+
+def _iter_run(f, block=65536):
+    while True:
+        chunk = array('Q')
+        try:
+            chunk.fromfile(f, block)
+        except EOFError:
+            pass  # last, partial block
+        if not chunk:
+            return
+        yield from chunk
+
+
+def build_index(paths, index_path=DEFAULT_INDEX_PATH, chunk_size=BUILD_CHUNK_SIZE):
+    """
+    Build the index from zone files / domain lists (files or folders).
+    Returns the number of distinct domains in the index.
+    """
+    directory = os.path.dirname(index_path) or '.'
+    os.makedirs(directory, exist_ok=True)
+
+    runs = []
+    try:
+        chunk = array('Q')
+        for path in iter_input_files(paths):
+            read = 0
+            for domain in iter_zone_names(path):
+                chunk.append(domain_hash(domain))
+                read += 1
+                if len(chunk) >= chunk_size:
+                    runs.append(_write_run(chunk, directory))
+                    chunk = array('Q')
+            print(f"  Read {read} domain names from {os.path.basename(path)}")
+        if chunk:
+            runs.append(_write_run(chunk, directory))
+
+        # Merge the sorted runs into the final table, dropping duplicates
+        tmp_path = index_path + '.tmp'
+        count = 0
+        with open(tmp_path, 'wb') as out:
+            out.write(HEADER.pack(MAGIC, 0, time.time()))
+            buffer = array('Q')
+            previous = None
+            for h in heapq.merge(*[_iter_run(f) for f in runs]):
+                if h == previous:
+                    continue
+                previous = h
+                buffer.append(h)
+                if len(buffer) >= 65536:
+                    buffer.tofile(out)
+                    count += len(buffer)
+                    buffer = array('Q')
+            buffer.tofile(out)
+            count += len(buffer)
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, count, time.time()))
+        os.replace(tmp_path, index_path)
+    finally:
+        for f in runs:
+            f.close()
+    return count
+
+
+class ZoneIndex:
+    """Read-only, memory-mapped view of an index built by build_index."""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            header = self.file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError(f"{path} is not a zone index")
+            magic, self.count, self.built_at = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a zone index (or was built on a machine with another byte order)")
+            if self.count:
+                self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.hashes = memoryview(self.map)[HEADER.size:HEADER.size + 8 * self.count].cast('Q')
+            else:
+                self.map = None
+                self.hashes = ()
+        except Exception:
+            self.file.close()
+            raise
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, domain):
+        h = domain_hash(normalize_domain(domain))
+        i = bisect.bisect_left(self.hashes, h)
+        return i < self.count and self.hashes[i] == h
+
+    def age_days(self):
+        return (time.time() - self.built_at) / 86400
+
+    def close(self):
+        if self.map is not None:
+            self.hashes.release()
+            self.map.close()
+            self.map = None
+        self.file.close()